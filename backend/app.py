@@ -3,9 +3,22 @@ from flask import Flask
 from routes.customers import customers_bp
 from flasgger import Swagger
 from routes.auth import auth_bp
+import perf
+import compression
+import read_routing
+from migrate import check_schema
+from db import PoolTimeout, error_response
+
+# Refuse to serve if the indexes the hot paths rely on are missing
+check_schema()
 
 app = Flask(__name__)
 Swagger(app)
+perf.init_app(app)
+compression.init_app(app)
+read_routing.init_app(app)
+# For routes without a catch-all of their own (see db.error_response)
+app.register_error_handler(PoolTimeout, error_response)
 from routes.tickets import tickets_bp
 
 app.register_blueprint(tickets_bp)
@@ -17,6 +30,12 @@ app.register_blueprint(dashboard_bp)
 app.register_blueprint(customers_bp)
 
 app.register_blueprint(auth_bp)
+from routes.metrics import metrics_bp
+
+app.register_blueprint(metrics_bp)
+from routes.admin import admin_bp
+
+app.register_blueprint(admin_bp)
 if __name__ == "__main__":
     app.run(debug=True)
     
\ No newline at end of file
@@ -0,0 +1,12 @@
+"""
+Async (ASGI) serving mode for the ticket, customer and dashboard APIs.
+
+Same routes and response shapes as the Flask blueprints, served by
+Starlette on aiomysql + redis.asyncio so a worker can keep many requests
+in flight while they wait on MySQL and Redis:
+
+    uvicorn asgi.app:app --workers 4
+
+Query building, validation and encoding are shared with the Flask routes;
+only the I/O differs.
+"""
@@ -0,0 +1,46 @@
+# asgi/app.py
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+
+from asgi import customers, dashboard, tickets
+from asgi.cache import client
+from asgi.db import close_pool, init_pool
+from asgi.read_routing import ReadYourWritesMiddleware
+from asgi.responses import error_response
+from compression import COMPRESS_MIN_BYTES, GZIP_LEVEL
+from db import PoolTimeout
+from migrate import check_schema
+from redis_client import ensure_invalidation_listener
+
+# Refuse to serve if the indexes the hot paths rely on are missing
+check_schema()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Runs once per worker process, after uvicorn/gunicorn has forked
+    await init_pool()
+    ensure_invalidation_listener()
+    yield
+    await close_pool()
+    await client.aclose()
+
+
+async def pool_timeout(request, exc):
+    # For routes without a catch-all of their own (see db.error_response)
+    return error_response(exc)
+
+
+app = Starlette(
+    routes=tickets.routes + customers.routes + dashboard.routes,
+    lifespan=lifespan,
+    exception_handlers={PoolTimeout: pool_timeout},
+    # gzip only: Starlette has no brotli middleware
+    middleware=[
+        Middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_BYTES, compresslevel=GZIP_LEVEL),
+        Middleware(ReadYourWritesMiddleware),
+    ],
+)
@@ -0,0 +1,119 @@
+# asgi/cache.py
+"""
+redis.asyncio counterparts of the redis_client and collection_versions
+helpers. Only the I/O lives here: keys, encoding, pipelines and the
+cached_read decisions are the sync modules' own helpers, so sync and
+async workers can serve the same Redis side by side.
+"""
+import asyncio
+import logging
+import time
+import uuid
+
+import redis.asyncio as aioredis
+
+from collection_versions import queue_bump, queue_missing_versions, recent_key, version_key
+from db import replicas
+from redis_client import (
+    REDIS_HOST, REDIS_PORT, RELEASE_LOCK_SCRIPT,
+    cache_entry, from_redis, local_cache, lock_key, lock_options,
+    queue_delete_cached, queue_set_cached, serve_as_is, unexpired
+)
+
+log = logging.getLogger(__name__)
+
+client = aioredis.Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+_release_lock = client.register_script(RELEASE_LOCK_SCRIPT)
+
+
+async def get_cached(key):
+    hit, value = local_cache.get(key)
+    if hit:
+        return value
+    return from_redis(key, await client.get(key))
+
+
+async def set_cached(key, value, ttl=60):
+    pipe = client.pipeline(transaction=False)
+    queue_set_cached(pipe, key, value, ttl)
+    await pipe.execute()
+    local_cache.set(key, value, ttl)
+
+
+async def delete_cached(key):
+    local_cache.delete(key)
+    pipe = client.pipeline(transaction=False)
+    queue_delete_cached(pipe, key)
+    await pipe.execute()
+
+
+async def _refresh(key, compute, soft_ttl, hard_ttl):
+    start = time.time()
+    value = await compute()
+    await set_cached(key, cache_entry(value, soft_ttl, time.time() - start), hard_ttl)
+    return value
+
+
+async def cached_read(key, compute, soft_ttl=30, hard_ttl=300, beta=1.0,
+                      lock_timeout=10, wait_timeout=2.0):
+    """Async redis_client.cached_read; `compute` is a coroutine function."""
+    lock = lock_key(key)
+    entry = await get_cached(key)
+
+    if entry:
+        if serve_as_is(entry, beta):
+            return entry["value"]
+
+        token = uuid.uuid4().hex
+        if not await client.set(lock, token, **lock_options(lock_timeout)):
+            return entry["value"]
+        try:
+            return await _refresh(key, compute, soft_ttl, hard_ttl)
+        finally:
+            await _release_lock(keys=[lock], args=[token])
+
+    deadline = time.time() + wait_timeout
+    while True:
+        token = uuid.uuid4().hex
+        if await client.set(lock, token, **lock_options(lock_timeout)):
+            try:
+                entry = await get_cached(key)
+                if unexpired(entry):
+                    return entry["value"]
+                return await _refresh(key, compute, soft_ttl, hard_ttl)
+            finally:
+                await _release_lock(keys=[lock], args=[token])
+
+        await asyncio.sleep(0.05)
+        entry = await get_cached(key)
+        if entry:
+            return entry["value"]
+        if time.time() > deadline:
+            return await compute()
+
+
+async def current_versions(*collections):
+    """Async collection_versions.current_versions (same keys)."""
+    keys = [version_key(c) for c in collections]
+    versions = await client.mget(keys)
+    pipe = client.pipeline(transaction=False)
+    if queue_missing_versions(pipe, keys, versions):
+        await pipe.execute()
+        versions = await client.mget(keys)
+    return versions
+
+
+async def recently_written(*collections):
+    """Async collection_versions.recently_written."""
+    if not replicas:
+        return False
+    return await client.exists(*[recent_key(c) for c in collections]) > 0
+
+
+async def bump_versions(*collections):
+    try:
+        pipe = client.pipeline(transaction=False)
+        queue_bump(pipe, collections)
+        await pipe.execute()
+    except Exception:
+        log.exception("Failed to bump collection versions %s", collections)
@@ -0,0 +1,72 @@
+# asgi/counters.py
+"""Async counterparts of dashboard_counters (same Redis hashes)."""
+import aiomysql
+from redis.exceptions import ResponseError
+
+from dashboard_counters import (
+    REBUILD_LOCK_KEY, REBUILD_LOCK_TTL, AGENT_WORKLOAD_SQL, PRIORITY_COUNTS_SQL, STATUS_COUNTS_SQL,
+    counts_from_replies, queue_read_counts, queue_swap, workload_from_rows
+)
+from jobs import JOB_STREAM
+import ticket_rollups
+from asgi.cache import client, recently_written
+from asgi.db import connection, read_connection
+
+
+async def stream_position():
+    """See jobs.stream_position."""
+    try:
+        return (await client.xinfo_stream(JOB_STREAM))["last-generated-id"]
+    except ResponseError:
+        return "0-0"
+
+
+async def rebuild():
+    """See dashboard_counters.rebuild (same lock and fence)."""
+    locked = await client.set(REBUILD_LOCK_KEY, 1, nx=True, px=int(REBUILD_LOCK_TTL * 1000))
+    try:
+        fence = await stream_position()
+        async with connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(STATUS_COUNTS_SQL)
+                status_counts = dict(await cursor.fetchall())
+                await cursor.execute(PRIORITY_COUNTS_SQL)
+                priority_counts = dict(await cursor.fetchall())
+    except BaseException:
+        if locked:
+            await client.delete(REBUILD_LOCK_KEY)
+        raise
+
+    if locked:
+        pipe = client.pipeline(transaction=True)
+        queue_swap(pipe, status_counts, priority_counts, fence)
+        await pipe.execute()
+
+    return status_counts, priority_counts
+
+
+async def read_counts():
+    """See dashboard_counters.read_counts."""
+    pipe = client.pipeline(transaction=False)
+    queue_read_counts(pipe)
+    counts = counts_from_replies(*await pipe.execute())
+    return counts if counts is not None else await rebuild()
+
+
+async def build_agent_workload():
+    # See dashboard_counters.workload_read_connection
+    try:
+        recent = await recently_written("tickets", "users")
+    except Exception:
+        recent = True
+    async with (connection() if recent else read_connection()) as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(AGENT_WORKLOAD_SQL)
+            return workload_from_rows(await cursor.fetchall())
+
+
+async def apply_rollup_events(cursor, events):
+    """ticket_rollups.apply_events on an aiomysql cursor."""
+    rows = ticket_rollups.rollup_rows(events)
+    if rows:
+        await cursor.executemany(ticket_rollups.UPSERT_SQL, rows)
@@ -0,0 +1,214 @@
+# asgi/customers.py
+from pydantic import ValidationError
+from starlette.routing import Route
+
+from asgi.counters import apply_rollup_events
+from asgi.db import connection, read_connection, transaction
+from asgi.cache import bump_versions
+from asgi.jobs import enqueue
+from asgi.responses import conditional_get, error_response, json_response
+from dashboard_counters import counters_job, workload_job
+from routes.customers import (
+    CUSTOMER_LIST_FORMATS, DEFAULT_SEARCH_LIMIT, IMPORT_CHUNK_SIZE, MAX_SEARCH_LIMIT, ImportParser,
+    customer_list_body, customer_search_query, dedupe_import_chunk, existing_emails_query,
+    import_insert_query, import_options, new_import_summary, validate_customer_rows,
+    validate_import_record
+)
+from schemas.customer import CustomerCreate
+import db
+import ticket_events
+import ticket_rollups
+
+
+async def create_customer(request):
+    try:
+        data = CustomerCreate(**await request.json())
+
+        async with transaction() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("""
+                INSERT INTO customers (name, email, company)
+                VALUES (%s, %s, %s)
+                """, (data.name, data.email, data.company))
+
+        await bump_versions("customers")
+        return json_response({"message": "Customer created"}, 201)
+
+    except ValidationError as e:
+        return json_response({"error": e.errors()}, 400)
+
+    except Exception as e:
+        if db.is_duplicate_key(e):
+            return json_response({"error": "A customer with this email already exists"}, 409)
+        return error_response(e)
+
+
+async def _search(cursor, term, limit):
+    query = customer_search_query(term, limit)
+    if not query:
+        return []
+    await cursor.execute(*query)
+    return await cursor.fetchall()
+
+
+@conditional_get("customers")
+async def get_customers(request):
+    try:
+        fmt = request.query_params.get("format", "objects")
+        if fmt not in CUSTOMER_LIST_FORMATS:
+            return json_response({"error": f"format must be one of {', '.join(CUSTOMER_LIST_FORMATS)}"}, 400)
+
+        async with read_connection() as conn:
+            async with conn.cursor() as cursor:
+                if 'customer_name' in request.query_params:
+                    rows = await _search(cursor, request.query_params['customer_name'], MAX_SEARCH_LIMIT)
+                else:
+                    await cursor.execute("""
+                        SELECT id, name, email, company, created_at
+                        FROM customers
+                        ORDER BY created_at DESC
+                    """)
+                    rows = await cursor.fetchall()
+
+        rows = validate_customer_rows(list(rows))
+
+        return json_response(customer_list_body(rows, fmt), 200)
+
+    except Exception as e:
+        return error_response(e)
+
+
+@conditional_get("customers")
+async def search_customers(request):
+    try:
+        try:
+            limit = int(request.query_params.get("limit", DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            return json_response({"error": "limit must be an integer"}, 400)
+        limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+
+        async with read_connection() as conn:
+            async with conn.cursor() as cursor:
+                rows = await _search(cursor, request.query_params.get("q", ""), limit)
+
+        rows = validate_customer_rows(list(rows))
+
+        return json_response(customer_list_body(rows), 200)
+
+    except Exception as e:
+        return error_response(e)
+
+
+async def _body_lines(request):
+    """Yield the request body line by line as it arrives."""
+    buffer = b""
+    async for piece in request.stream():
+        buffer += piece
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line + b"\n"
+    if buffer:
+        yield buffer
+
+
+async def _import_chunk(conn, chunk, on_duplicate, summary):
+    rows = dedupe_import_chunk(chunk, on_duplicate, summary)
+
+    await conn.begin()
+    try:
+        async with conn.cursor() as cursor:
+            await cursor.execute(*existing_emails_query(rows))
+            existing = {email.lower() for (email,) in await cursor.fetchall()}
+
+            insert = import_insert_query(rows, existing, on_duplicate, summary)
+            if insert:
+                await cursor.execute(*insert)
+    except BaseException:
+        await conn.rollback()
+        raise
+    await conn.commit()
+
+
+async def import_customers(request):
+    try:
+        fmt, on_duplicate = import_options(request.query_params, request.headers.get("content-type"))
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    summary = new_import_summary()
+    parser = ImportParser(fmt)
+
+    def collect(records, chunk):
+        for line_number, record in records:
+            summary["rows"] += 1
+            data = validate_import_record(line_number, record, summary)
+            if data:
+                chunk.append(data)
+
+    try:
+        async with connection() as conn:
+            chunk = []
+            async for line in _body_lines(request):
+                collect(parser.feed(line), chunk)
+                if len(chunk) >= IMPORT_CHUNK_SIZE:
+                    await _import_chunk(conn, chunk, on_duplicate, summary)
+                    chunk = []
+
+            collect(parser.finish(), chunk)
+            if chunk:
+                await _import_chunk(conn, chunk, on_duplicate, summary)
+
+        return json_response(summary, 200)
+
+    except Exception as e:
+        body, status, headers = db.error_response(e)
+        return json_response({**body, "summary": summary}, status, headers)
+
+    finally:
+        if summary["inserted"] or summary["updated"]:
+            await bump_versions("customers")
+
+
+async def delete_customer(request):
+    customer_id = request.path_params["id"]
+    try:
+        async with transaction() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT status, priority, assigned_to, created_at, closed_at, id"
+                    " FROM tickets WHERE customer_id=%s FOR UPDATE",
+                    (customer_id,)
+                )
+                cascaded = await cursor.fetchall()
+
+                await cursor.execute("DELETE FROM customers WHERE id=%s", (customer_id,))
+                if cursor.rowcount == 0:
+                    return json_response({"error": "Customer not found"}, 404)
+
+                await apply_rollup_events(cursor, [
+                    event for status, priority, _, created_at, closed_at, _ in cascaded
+                    for event in ticket_rollups.deleted(status, priority, created_at, closed_at)
+                ])
+
+        ticket_events.record(*(
+            ticket_events.deleted(ticket_id, status, assigned_to)
+            for status, _, assigned_to, _, _, ticket_id in cascaded
+        ))
+        await enqueue(
+            counters_job((ticket, None) for ticket in cascaded),
+            workload_job(any(ticket[2] for ticket in cascaded)),
+            bump=("customers", "tickets")
+        )
+        return json_response({"message": "Customer deleted"}, 200)
+
+    except Exception as e:
+        return error_response(e)
+
+
+routes = [
+    Route("/customers", create_customer, methods=["POST"]),
+    Route("/customers/import", import_customers, methods=["POST"]),
+    Route("/customers", get_customers, methods=["GET"]),
+    Route("/customers/search", search_customers, methods=["GET"]),
+    Route("/customers/{id:int}", delete_customer, methods=["DELETE"]),
+]
@@ -0,0 +1,93 @@
+# asgi/dashboard.py
+from starlette.routing import Route
+
+from asgi.cache import cached_read
+from asgi.counters import build_agent_workload, read_counts
+from asgi.responses import error_response, json_response
+from asgi.db import read_connection
+from dashboard_counters import AGENT_WORKLOAD_KEY, current_workload
+from ticket_events import resolution_from_rows, resolution_query
+from ticket_rollups import parse_range, trends_from_rows
+from routes.dashboard import resolution_args, resolution_key, summary_from_counts
+
+
+async def build_summary():
+    return summary_from_counts(*await read_counts())
+
+
+async def dashboard_summary(request):
+    try:
+        summary = await cached_read("dashboard:summary", build_summary, soft_ttl=5, hard_ttl=60)
+        return json_response(summary, 200)
+    except Exception as e:
+        return error_response(e)
+
+
+async def dashboard_agents(request):
+    try:
+        workload = await cached_read(AGENT_WORKLOAD_KEY, build_agent_workload, soft_ttl=30, hard_ttl=300)
+        return json_response(current_workload(workload), 200)
+    except Exception as e:
+        return error_response(e)
+
+
+async def read_trends(start, end, granularity):
+    async with read_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute("""
+                SELECT day, priority, opened, closed
+                FROM ticket_daily_rollups
+                WHERE day >= %s AND day <= %s
+            """, (start, end))
+            rows = await cursor.fetchall()
+    return trends_from_rows(rows, start, end, granularity)
+
+
+async def dashboard_trends(request):
+    try:
+        start, end, granularity = parse_range(request.query_params)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    try:
+        trends = await cached_read(
+            f"dashboard:trends:{start}:{end}:{granularity}",
+            lambda: read_trends(start, end, granularity),
+            soft_ttl=60, hard_ttl=600
+        )
+        return json_response(trends, 200)
+    except Exception as e:
+        return error_response(e)
+
+
+async def read_resolution_times(start, end, agent_id):
+    async with read_connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(*resolution_query(start, end, agent_id))
+            rows = await cursor.fetchall()
+    return resolution_from_rows(rows, start, end)
+
+
+async def dashboard_resolution_times(request):
+    try:
+        start, end, agent_id = resolution_args(request.query_params)
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+
+    try:
+        resolution = await cached_read(
+            resolution_key(start, end, agent_id),
+            lambda: read_resolution_times(start, end, agent_id),
+            soft_ttl=60, hard_ttl=600
+        )
+        return json_response(resolution, 200)
+    except Exception as e:
+        return error_response(e)
+
+
+routes = [
+    Route("/dashboard/summary", dashboard_summary, methods=["GET"]),
+    Route("/dashboard/agents", dashboard_agents, methods=["GET"]),
+    Route("/dashboard/trends", dashboard_trends, methods=["GET"]),
+    Route("/dashboard/resolution-times", dashboard_resolution_times, methods=["GET"]),
+]
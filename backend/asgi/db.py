@@ -0,0 +1,135 @@
+# asgi/db.py
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+import aiomysql
+
+from db import (
+    DB_CONFIG, POOL_SIZE, POOL_MAX_OVERFLOW, POOL_RECYCLE, POOL_TIMEOUT,
+    PoolTimeout, ensure_replica_monitor, replica_config, replicas
+)
+
+_pool = {"pool": None, "replicas": {}}
+_next_replica = itertools.count()
+# Set for the rest of a request (each request runs in its own task)
+_read_primary = ContextVar("read_primary", default=False)
+
+
+async def _create_pool(config):
+    return await aiomysql.create_pool(
+        host=config["host"],
+        port=config["port"],
+        user=config["user"],
+        password=config["password"],
+        db=config["database"],
+        minsize=POOL_SIZE,
+        maxsize=POOL_SIZE + POOL_MAX_OVERFLOW,
+        pool_recycle=POOL_RECYCLE,
+        # Plain reads never leave a transaction open on a pooled connection;
+        # writes opt in through transaction()
+        autocommit=True,
+    )
+
+
+async def init_pool():
+    """Create this worker's pools (called from the app lifespan, i.e. after fork)."""
+    _pool["pool"] = await _create_pool(DB_CONFIG)
+    # Replica health comes from db's monitor thread, shared with the sync app
+    for replica in replicas:
+        _pool["replicas"][replica.name] = await _create_pool(replica_config(replica.name))
+    ensure_replica_monitor()
+
+
+async def close_pool():
+    pools = [_pool["pool"], *_pool["replicas"].values()]
+    for pool in pools:
+        if pool is not None:
+            pool.close()
+            await pool.wait_closed()
+    _pool["pool"] = None
+    _pool["replicas"] = {}
+
+
+def get_pool():
+    return _pool["pool"]
+
+
+def pin_primary():
+    """Send the rest of this request's reads to the primary."""
+    _read_primary.set(True)
+
+
+def read_target():
+    """(replica, pool) for the next read; replica is None for the primary."""
+    if replicas and not _read_primary.get():
+        healthy = [replica for replica in replicas if replica.healthy]
+        if healthy:
+            replica = healthy[next(_next_replica) % len(healthy)]
+            return replica, _pool["replicas"][replica.name]
+    return None, get_pool()
+
+
+async def acquire(pool):
+    """
+    Check out a connection, waiting up to DB_POOL_TIMEOUT seconds like
+    the sync pool; raises db.PoolTimeout (a 503 from error_response).
+    """
+    try:
+        return await asyncio.wait_for(pool.acquire(), POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise PoolTimeout(
+            f"No database connection available within {POOL_TIMEOUT}s "
+            f"(size={POOL_SIZE}, overflow={POOL_MAX_OVERFLOW})"
+        ) from None
+
+
+@asynccontextmanager
+async def connection():
+    """Autocommit connection for reads."""
+    pool = get_pool()
+    conn = await acquire(pool)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+@asynccontextmanager
+async def read_connection():
+    """
+    Autocommit connection for reads that may be served by a replica;
+    same rules as db.get_read_connection.
+    """
+    replica, pool = read_target()
+    try:
+        conn = await acquire(pool)
+    except Exception as e:
+        if replica is None:
+            raise
+        if not isinstance(e, PoolTimeout):
+            replica.mark_down(str(e))  # busy, not broken, on a timeout
+        pool = get_pool()
+        conn = await acquire(pool)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+@asynccontextmanager
+async def transaction():
+    """Connection inside BEGIN; commits on normal exit, rolls back on error."""
+    pool = get_pool()
+    conn = await acquire(pool)
+    try:
+        await conn.begin()
+        try:
+            yield conn
+        except BaseException:
+            await conn.rollback()
+            raise
+        await conn.commit()
+    finally:
+        await pool.release(conn)
@@ -0,0 +1,23 @@
+# asgi/jobs.py
+"""Async counterpart of jobs.enqueue (same stream and job format)."""
+import logging
+
+from asgi.cache import client
+from collection_versions import queue_bump
+from jobs import JOB_WORKER_IN_PROCESS, ensure_worker, queue_jobs
+
+log = logging.getLogger(__name__)
+
+
+async def enqueue(*jobs, bump=()):
+    """Bump `bump` and queue `jobs` in one round trip; never raises."""
+    if JOB_WORKER_IN_PROCESS:
+        # The worker is the sync one, on its own thread
+        ensure_worker()
+    try:
+        pipe = client.pipeline(transaction=False)
+        queue_bump(pipe, bump)
+        queue_jobs(pipe, jobs)
+        await pipe.execute()
+    except Exception:
+        log.exception("Failed to enqueue jobs %s", [job[0] for job in jobs if job])
@@ -0,0 +1,43 @@
+# asgi/read_routing.py
+"""Starlette counterpart of read_routing: same marker cookie and header."""
+import math
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from werkzeug.http import dump_cookie
+
+from asgi.db import pin_primary
+from db import READ_YOUR_WRITES_WINDOW, replicas
+from read_routing import READ_PRIMARY_COOKIE, READ_PRIMARY_HEADER, SAFE_METHODS, marker_valid, new_marker
+
+
+class ReadYourWritesMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not replicas:
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        marker = connection.cookies.get(READ_PRIMARY_COOKIE) or connection.headers.get(READ_PRIMARY_HEADER)
+        if marker_valid(marker):
+            pin_primary()
+
+        if scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_marker(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                marker = new_marker()
+                headers = MutableHeaders(scope=message)
+                headers.append("set-cookie", dump_cookie(
+                    READ_PRIMARY_COOKIE, marker, max_age=math.ceil(READ_YOUR_WRITES_WINDOW),
+                    httponly=True, samesite="Lax"
+                ))
+                headers[READ_PRIMARY_HEADER] = marker
+            await send(message)
+
+        await self.app(scope, receive, send_with_marker)
@@ -0,0 +1,59 @@
+# asgi/responses.py
+import logging
+from functools import wraps
+
+from starlette.responses import Response
+from werkzeug.http import parse_etags
+
+import json_codec
+from asgi.cache import current_versions, recently_written
+from asgi.db import pin_primary
+from collection_versions import cache_headers, make_etag
+import db
+
+log = logging.getLogger(__name__)
+
+
+def dumps(data):
+    # Same codec as the Flask app's JSON provider, so both modes
+    # produce byte-for-byte comparable bodies
+    return json_codec.dumps(data)
+
+
+def json_response(data, status=200, headers=None):
+    return Response(dumps(data), status_code=status, media_type="application/json", headers=headers)
+
+
+def error_response(e):
+    """JSON response for a route's catch-all handler (see db.error_response)."""
+    return json_response(*db.error_response(e))
+
+
+def conditional_get(*collections):
+    """Starlette counterpart of collection_versions.conditional_get (same ETags)."""
+    def decorator(endpoint):
+        @wraps(endpoint)
+        async def wrapper(request):
+            try:
+                etag = make_etag(await current_versions(*collections), request.url.path,
+                                 sorted(request.query_params.multi_items()))
+            except Exception:
+                log.exception("Collection versions unavailable; serving without ETag")
+                return await endpoint(request)
+
+            if parse_etags(request.headers.get("if-none-match")).contains_weak(etag):
+                return cache_headers(Response(status_code=304), etag)
+
+            try:
+                if await recently_written(*collections):
+                    pin_primary()
+            except Exception:
+                log.exception("Collection recency unavailable; reading from the primary")
+                pin_primary()
+
+            response = await endpoint(request)
+            if response.status_code == 200:
+                cache_headers(response, etag)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,314 @@
+# asgi/tickets.py
+import aiomysql
+from pydantic import ValidationError
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from asgi.counters import apply_rollup_events
+from asgi.db import acquire, read_connection, read_target, transaction
+from asgi.jobs import enqueue
+from asgi.responses import conditional_get, error_response, json_response
+from dashboard_counters import counters_job, workload_job
+from routes.tickets import (
+    BULK_INSERT_CHUNK, EXPORT_BATCH_SIZE, EXPORT_FORMATS, MAX_BULK_TICKETS, SET_STATUS_SQL,
+    bulk_row, export_batch, export_header, export_query, inserted_ids, multi_row_insert, page_query, paginate,
+    validate_bulk_tickets, with_known_customers
+)
+from schemas.ticket import TicketCreate
+import ticket_events
+import ticket_rollups
+
+
+async def create_ticket(request):
+    try:
+        data = TicketCreate(**await request.json())
+
+        async with transaction() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    "SELECT id FROM customers WHERE id = %s",
+                    (data.customer_id,)
+                )
+                if not await cursor.fetchone():
+                    return json_response({"error": "Customer not found"}, 404)
+
+                await cursor.execute("""
+                    INSERT INTO tickets (customer_id, title, description, priority,assigned_to)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (
+                    data.customer_id,
+                    data.title,
+                    data.description,
+                    data.priority,
+                    data.assigned_to
+                ))
+                ticket_id = cursor.lastrowid
+                await apply_rollup_events(cursor, [ticket_rollups.opened(data.priority)])
+
+        ticket_events.record(ticket_events.created(ticket_id, data.assigned_to))
+        await enqueue(
+            counters_job([(None, ("OPEN", data.priority))]),
+            workload_job(bool(data.assigned_to)),
+            bump=("tickets",)
+        )
+
+        return json_response({"message": "Ticket created"}, 201)
+
+    except ValidationError as e:
+        return json_response({"error": e.errors()}, 400)
+
+    except Exception as e:
+        return error_response(e)
+
+
+async def create_tickets_bulk(request):
+    try:
+        items = await request.json()
+        if isinstance(items, dict):
+            items = items.get("tickets")
+        if not isinstance(items, list):
+            return json_response({"error": "Body must be a list of tickets"}, 400)
+        if len(items) > MAX_BULK_TICKETS:
+            return json_response({"error": f"At most {MAX_BULK_TICKETS} tickets per request"}, 413)
+
+        valid, errors = validate_bulk_tickets(items)
+
+        async with transaction() as conn:
+            async with conn.cursor() as cursor:
+                customer_ids = list({data.customer_id for _, data in valid})
+                existing = set()
+                if customer_ids:
+                    placeholders = ", ".join(["%s"] * len(customer_ids))
+                    await cursor.execute(
+                        f"SELECT id FROM customers WHERE id IN ({placeholders})",
+                        tuple(customer_ids)
+                    )
+                    existing = {row[0] for row in await cursor.fetchall()}
+
+                created = list(with_known_customers(valid, existing, errors))
+                if not created:
+                    return json_response({"created": 0, "errors": sorted(errors, key=lambda e: e["index"])}, 400)
+
+                rows = [bulk_row(data) for data in created]
+                ticket_ids = []
+                for start in range(0, len(rows), BULK_INSERT_CHUNK):
+                    chunk = rows[start:start + BULK_INSERT_CHUNK]
+                    await cursor.execute(*multi_row_insert(chunk))
+                    ticket_ids.extend(inserted_ids(cursor, chunk))
+                await apply_rollup_events(cursor, [ticket_rollups.opened(data.priority) for data in created])
+
+        ticket_events.record(*(
+            ticket_events.created(ticket_id, data.assigned_to)
+            for ticket_id, data in zip(ticket_ids, created)
+        ))
+        await enqueue(
+            counters_job((None, ("OPEN", data.priority)) for data in created),
+            workload_job(any(data.assigned_to for data in created)),
+            bump=("tickets",)
+        )
+
+        return json_response({
+            "created": len(rows),
+            "errors": sorted(errors, key=lambda e: e["index"])
+        }, 201)
+
+    except Exception as e:
+        return error_response(e)
+
+
+@conditional_get("tickets")
+async def get_tickets(request):
+    try:
+        try:
+            query, params, limit = page_query(request.query_params)
+        except ValueError as e:
+            return json_response({"error": str(e)}, 400)
+
+        async with read_connection() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(query, tuple(params))
+                rows = await cursor.fetchall()
+
+        return json_response(paginate(list(rows), limit), 200)
+
+    except Exception as e:
+        return error_response(e)
+
+
+@conditional_get("tickets")
+async def export_tickets(request):
+    fmt = request.query_params.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return json_response({"error": "format must be ndjson or csv"}, 400)
+
+    query, params = export_query(request.query_params)
+
+    # Not read_connection(): the connection outlives this function, it is
+    # released when the stream ends
+    _, pool = read_target()
+    try:
+        conn = await acquire(pool)
+    except Exception as e:
+        return error_response(e)
+    try:
+        # Server-side cursor: rows are pulled from MySQL batch by batch
+        cursor = await conn.cursor(aiomysql.SSCursor)
+        await cursor.execute(query, tuple(params))
+    except Exception as e:
+        conn.close()
+        await pool.release(conn)
+        return error_response(e)
+
+    async def generate():
+        finished = False
+        try:
+            yield export_header(fmt)
+            while True:
+                rows = await cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                yield export_batch(rows, fmt)
+            finished = True
+        finally:
+            if finished:
+                await cursor.close()
+            else:
+                # Client went away mid-stream: drop the connection rather
+                # than draining the rest of the result set
+                conn.close()
+            await pool.release(conn)
+
+    mimetype, filename = EXPORT_FORMATS[fmt]
+    return StreamingResponse(
+        generate(),
+        media_type=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
+async def update_ticket_status(request):
+    ticket_id = request.path_params["ticket_id"]
+    try:
+        body = await request.json()
+        new_status = body.get("status")
+        assigned_to = body.get("assigned_to")
+
+        if new_status not in ["OPEN", "IN_PROGRESS", "CLOSED"]:
+            return json_response({"error": "Invalid status"}, 400)
+
+        async with transaction() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute("SELECT status, priority, assigned_to FROM tickets WHERE id = %s FOR UPDATE", (ticket_id,))
+                ticket = await cursor.fetchone()
+
+                if not ticket:
+                    return json_response({"error": "Ticket not found"}, 404)
+
+                if ticket["status"] == "CLOSED" and new_status != "CLOSED":
+                    return json_response({"error": "Closed tickets cannot be reopened"}, 400)
+
+                await cursor.execute(SET_STATUS_SQL, (new_status, assigned_to, new_status, ticket_id))
+                if new_status == "CLOSED" and ticket["status"] != "CLOSED":
+                    await apply_rollup_events(cursor, [ticket_rollups.closed(ticket["priority"])])
+
+        ticket_events.record(ticket_events.changed(
+            ticket_id, ticket["status"], new_status, ticket["assigned_to"], assigned_to
+        ))
+        await enqueue(
+            counters_job([((ticket["status"], ticket["priority"]), (new_status, ticket["priority"]))]),
+            workload_job(bool(ticket["assigned_to"] or assigned_to)),
+            bump=("tickets",)
+        )
+
+        return json_response({"message": "Status updated"}, 200)
+
+    except Exception as e:
+        return error_response(e)
+
+
+async def assign_ticket(request):
+    ticket_id = request.path_params["ticket_id"]
+    data = await request.json()
+    assigned_to = data.get("assigned_to")
+
+    async with transaction() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute("SELECT id, status, assigned_to FROM tickets WHERE id=%s FOR UPDATE", (ticket_id,))
+            ticket = await cursor.fetchone()
+            if not ticket:
+                return json_response({"error": "Ticket not found"}, 404)
+
+            await cursor.execute("SELECT id, role FROM users WHERE id=%s", (assigned_to,))
+            user = await cursor.fetchone()
+            if not user or user["role"] != "agent":
+                return json_response({"error": "User must be a valid AGENT"}, 400)
+
+            await cursor.execute("""
+                UPDATE tickets
+                SET assigned_to=%s
+                WHERE id=%s
+            """, (assigned_to, ticket_id))
+
+    ticket_events.record(ticket_events.changed(
+        ticket_id, ticket["status"], ticket["status"], ticket["assigned_to"], assigned_to
+    ))
+    await enqueue(workload_job(), bump=("tickets",))
+    return json_response({"message": "Ticket assigned"}, 200)
+
+
+async def delete_ticket(request):
+    ticket_id = request.path_params["id"]
+    try:
+        async with transaction() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(
+                    "SELECT status, priority, assigned_to, created_at, closed_at FROM tickets WHERE id=%s FOR UPDATE",
+                    (ticket_id,)
+                )
+                ticket = await cursor.fetchone()
+                if not ticket:
+                    return json_response({"error": "Ticket not found"}, 404)
+
+                await cursor.execute("DELETE FROM tickets WHERE id=%s", (ticket_id,))
+                await apply_rollup_events(cursor, ticket_rollups.deleted(
+                    ticket["status"], ticket["priority"], ticket["created_at"], ticket["closed_at"]
+                ))
+
+        ticket_events.record(ticket_events.deleted(ticket_id, ticket["status"], ticket["assigned_to"]))
+        await enqueue(
+            counters_job([((ticket["status"], ticket["priority"]), None)]),
+            workload_job(bool(ticket["assigned_to"])),
+            bump=("tickets",)
+        )
+        return json_response({"message": "Ticket deleted"}, 200)
+
+    except Exception as e:
+        return error_response(e)
+
+
+async def get_ticket_events(request):
+    # No ETag, as in the Flask route: events land after the tickets version is bumped
+    ticket_id = request.path_params["ticket_id"]
+    try:
+        async with read_connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(ticket_events.TIMELINE_SQL, (ticket_id,))
+                events = [ticket_events.event_from_row(row) for row in await cursor.fetchall()]
+        if not events:
+            return json_response({"error": "No history for this ticket"}, 404)
+        return json_response({"ticket_id": ticket_id, "events": events}, 200)
+
+    except Exception as e:
+        return error_response(e)
+
+
+routes = [
+    Route("/tickets", create_ticket, methods=["POST"]),
+    Route("/tickets/bulk", create_tickets_bulk, methods=["POST"]),
+    Route("/tickets", get_tickets, methods=["GET"]),
+    Route("/tickets/export", export_tickets, methods=["GET"]),
+    Route("/tickets/{ticket_id:int}/update", update_ticket_status, methods=["PUT"]),
+    Route("/tickets/{ticket_id:int}/assign", assign_ticket, methods=["PUT"]),
+    Route("/tickets/{ticket_id:int}/events", get_ticket_events, methods=["GET"]),
+    Route("/tickets/{id:int}", delete_ticket, methods=["DELETE"]),
+]
@@ -0,0 +1,70 @@
+# bench/asgi_vs_wsgi.py
+"""
+Compare the WSGI (Flask) and ASGI (Starlette) serving modes under the
+same load, against the same MySQL and Redis.
+
+Start both servers with the same number of worker processes, e.g.
+
+    gunicorn -w 4 --threads 16 -b 127.0.0.1:5000 app:app
+    uvicorn asgi.app:app --workers 4 --port 8000
+
+then run from backend/:
+
+    python -m bench.asgi_vs_wsgi --concurrency 500 --duration 30 --output asgi_vs_wsgi.json
+"""
+import argparse
+import asyncio
+import json
+
+from bench.loadgen import run_load
+
+DEFAULT_PATHS = [
+    "/tickets?limit=50",
+    "/tickets?status=OPEN&limit=50",
+    "/customers/search?q=acme",
+    "/dashboard/summary",
+]
+
+
+async def compare(wsgi_url, asgi_url, paths, concurrency, duration, warmup):
+    results = {}
+    for path in paths:
+        results[path] = {}
+        for mode, base in (("wsgi", wsgi_url), ("asgi", asgi_url)):
+            if warmup:
+                await run_load(base + path, concurrency=min(concurrency, 20), duration=warmup)
+            results[path][mode] = await run_load(base + path, concurrency=concurrency, duration=duration)
+    return results
+
+
+def print_table(results):
+    print(f"{'path':40} {'mode':5} {'rps':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for path, modes in results.items():
+        for mode, r in modes.items():
+            print(f"{path:40} {mode:5} {r['rps']:>10} {r['p50_ms']!s:>10} {r['p99_ms']!s:>10} {r['errors']:>8}")
+        wsgi, asgi = modes["wsgi"], modes["asgi"]
+        if wsgi["rps"]:
+            print(f"{'':40} {'':5} {'x%.2f' % (asgi['rps'] / wsgi['rps']):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wsgi", default="http://127.0.0.1:5000")
+    parser.add_argument("--asgi", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", dest="paths", help="repeatable; defaults to the hot read paths")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--output", help="write the raw results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(compare(args.wsgi, args.asgi, args.paths or DEFAULT_PATHS,
+                                  args.concurrency, args.duration, args.warmup))
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# bench/compare.py
+"""
+Compare a bench/run.py result file against a baseline and exit non-zero
+on regressions, for CI:
+
+    python -m bench.compare bench-baseline.json bench-results.json --tolerance 0.15
+
+A scenario regresses when its throughput drops, or its p95/p99 latency
+grows, by more than --tolerance (latency changes under --min-ms are
+ignored as noise), when it starts returning errors or 5xx, or when it
+executes more DB queries per request than before. Query counts are
+deterministic, so any increase is flagged.
+"""
+import argparse
+import json
+import sys
+
+
+def _server_errors(result):
+    return result.get("errors", 0) + sum(n for status, n in result.get("statuses", {}).items()
+                                         if int(status) >= 500)
+
+
+def compare(baseline, current, tolerance=0.15, min_ms=1.0):
+    """Return (regressions, rows) where rows are per-scenario comparison lines."""
+    regressions = []
+    rows = []
+    for name, now in current["endpoints"].items():
+        before = baseline["endpoints"].get(name)
+        if before is None:
+            rows.append((name, "new scenario"))
+            continue
+
+        problems = []
+        if before["rps"] and now["rps"] < before["rps"] * (1 - tolerance):
+            problems.append(f"rps {before['rps']} -> {now['rps']}")
+        for key in ("p95_ms", "p99_ms"):
+            old, new = before.get(key), now.get(key)
+            if old is not None and new is not None and new - old > min_ms and new > old * (1 + tolerance):
+                problems.append(f"{key} {old} -> {new}")
+        old_q, new_q = before.get("db_queries_per_request"), now.get("db_queries_per_request")
+        if old_q is not None and new_q is not None and new_q > old_q + 1e-9:
+            problems.append(f"queries/request {old_q} -> {new_q}")
+        if _server_errors(now) > _server_errors(before):
+            problems.append(f"errors/5xx {_server_errors(before)} -> {_server_errors(now)}")
+
+        if problems:
+            regressions.append((name, problems))
+        rows.append((name, "; ".join(problems) or "ok"))
+
+    for name in baseline["endpoints"]:
+        if name not in current["endpoints"]:
+            rows.append((name, "missing from current run"))
+    return regressions, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore latency changes smaller than this")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions, rows = compare(baseline, current, args.tolerance, args.min_ms)
+    for name, verdict in rows:
+        print(f"{name:28} {verdict}")
+
+    if regressions:
+        print(f"\n{len(regressions)} scenario(s) regressed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# bench/customer_listing.py
+"""
+Cost of turning a GET /customers result set into a response body.
+
+Generates rows the way the cursor returns them (tuples in
+CUSTOMER_COLUMNS order, datetime created_at) and times, per size,
+
+- model:   one CustomerResponse(**row).dict() per row (the old path),
+- batch:   customer_rows_adapter over the whole result set,
+- sampled: CUSTOMER_VALIDATION=sampled (full check on a sample),
+- columns: batch validation with ?format=columns,
+
+split into validate / build / encode, plus the body size. The per-row
+model path is only run up to --model-max rows (~15s at 100k).
+No database or server needed:
+
+    cd backend
+    python -m bench.customer_listing --rows 1000 100000 1000000 --output customer_listing.json
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+import json_codec
+from routes.customers import customer_list_body, validate_customer_rows
+from schemas.customer import CUSTOMER_COLUMNS, CustomerResponse
+
+COMPANIES = ("Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", None)
+
+
+def customer_rows(n, rng):
+    now = datetime.now().replace(microsecond=0)
+    return [
+        (i, f"Customer {i}", f"customer-{i}@example.com", rng.choice(COMPANIES),
+         now - timedelta(minutes=rng.randrange(365 * 24 * 60)))
+        for i in range(n, 0, -1)
+    ]
+
+
+def model_path(rows):
+    return [CustomerResponse(**dict(zip(CUSTOMER_COLUMNS, row))).dict() for row in rows]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run_path(name, rows):
+    """{"validate", "build", "encode", "total" (ms), "bytes"} for one path over `rows`."""
+    if name == "model":
+        body, validate_ms = timed(model_path, rows)
+        build_ms = 0.0
+    else:
+        mode = "sampled" if name == "sampled" else "batch"
+        validated, validate_ms = timed(validate_customer_rows, rows, mode)
+        fmt = "columns" if name == "columns" else "objects"
+        body, build_ms = timed(customer_list_body, validated, fmt)
+    encoded, encode_ms = timed(json_codec.dumps, body)
+    return {
+        "validate": round(validate_ms, 2), "build": round(build_ms, 2), "encode": round(encode_ms, 2),
+        "total": round(validate_ms + build_ms + encode_ms, 2), "bytes": len(encoded),
+    }
+
+
+def best(name, rows, repeat):
+    runs = [run_path(name, rows) for _ in range(repeat)]
+    return min(runs, key=lambda r: r["total"])
+
+
+def print_table(results):
+    for size, paths in results.items():
+        print(f"\nGET /customers ({size} rows)")
+        print(f"  {'path':8} {'validate':>10} {'build':>9} {'encode':>9} {'total':>10} {'bytes':>14}")
+        for name, r in paths.items():
+            print(f"  {name:8} {r['validate']:10.1f} {r['build']:9.1f} {r['encode']:9.1f}"
+                  f" {r['total']:10.1f} {r['bytes']:>14,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--model-max", type=int, default=100000,
+                        help="largest size to run the per-row model path on")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    results = {}
+    for size in args.rows:
+        rows = customer_rows(size, rng)
+        paths = ["model"] if size <= args.model_max else []
+        paths += ["batch", "sampled", "columns"]
+        # The model path takes ~15s at 100k rows; one run is enough
+        results[size] = {
+            name: best(name, rows, 1 if name == "model" else args.repeat) for name in paths
+        }
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"encoder": json_codec.JSON_ENCODER, "results": results}, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
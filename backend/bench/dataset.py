@@ -0,0 +1,121 @@
+# bench/dataset.py
+"""
+Deterministic benchmark data, written through get_db_connection() so it
+works against the SQLite stand-in and a scratch MySQL database alike.
+
+seed() returns a manifest of the ids each scenario may touch. Rows that
+the DELETE scenarios consume are seeded separately ("disposable") so the
+read scenarios always see the same data set.
+"""
+import random
+from datetime import datetime, timedelta
+
+import migrate
+import ticket_rollups
+from db import get_db_connection
+from passwords import hasher
+
+ADMIN_EMAIL = "bench-admin@example.com"
+PASSWORD = "bench-password"
+PRIORITIES = ("LOW", "MEDIUM", "HIGH")
+STATUSES = ("OPEN", "IN_PROGRESS", "CLOSED")
+COMPANIES = ("Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", None)
+DISPOSABLE_TITLE = "bench-disposable"
+CHUNK = 1000
+
+
+def _insert_many(cursor, sql, rows):
+    for start in range(0, len(rows), CHUNK):
+        cursor.executemany(sql, rows[start:start + CHUNK])
+
+
+def _backfill_ticket_events(cursor):
+    """Run the history backfill from migration 0006 (the stand-in schema creates the table itself)."""
+    [migration] = [m for m in migrate.discover() if m.name == "ticket_events"]
+    for statement in migrate.split_statements(migration.read("up")):
+        if statement.upper().startswith("INSERT"):
+            cursor.execute(statement)
+
+
+def _ids(cursor, sql, params=()):
+    cursor.execute(sql, params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def seed(customers=2000, tickets=20000, agents=20, disposable=2000, seed_value=42):
+    rng = random.Random(seed_value)
+    now = datetime.now().replace(microsecond=0)
+    password_hash = hasher.hash(PASSWORD)  # one hash shared by every seeded user
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        _insert_many(cursor, "INSERT INTO users (name, email, password_hash, role) VALUES (%s, %s, %s, %s)",
+                     [("Bench Admin", ADMIN_EMAIL, password_hash, "admin")]
+                     + [(f"Agent {i}", f"bench-agent-{i}@example.com", password_hash, "agent")
+                        for i in range(agents)]
+                     + [(f"Disposable {i}", f"bench-user-del-{i}@example.com", password_hash, "agent")
+                        for i in range(disposable)])
+
+        customer_rows = []
+        for i in range(customers):
+            company = rng.choice(COMPANIES)
+            customer_rows.append((f"Customer {i}", f"bench-customer-{i}@example.com", company,
+                                  now - timedelta(minutes=rng.randrange(365 * 24 * 60))))
+        customer_rows += [(f"Disposable {i}", f"bench-customer-del-{i}@example.com", None, now)
+                          for i in range(disposable)]
+        _insert_many(cursor, "INSERT INTO customers (name, email, company, created_at) VALUES (%s, %s, %s, %s)",
+                     customer_rows)
+        conn.commit()
+
+        agent_ids = _ids(cursor, "SELECT id FROM users WHERE email LIKE %s", ("bench-agent-%",))
+        customer_ids = _ids(cursor, "SELECT id FROM customers WHERE email LIKE %s", ("bench-customer-%",))
+        doomed_customers = _ids(cursor, "SELECT id FROM customers WHERE email LIKE %s", ("bench-customer-del-%",))
+        customer_ids = sorted(set(customer_ids) - set(doomed_customers))
+
+        ticket_rows = []
+        for i in range(tickets):
+            created_at = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+            status = rng.choice(STATUSES)
+            # Worked tickets were last touched some time after they were opened
+            updated_at = created_at if status == "OPEN" else \
+                min(now, created_at + timedelta(minutes=rng.randrange(7 * 24 * 60)))
+            ticket_rows.append((
+                rng.choice(customer_ids), f"Ticket {i}", "Seeded by bench/dataset.py",
+                rng.choice(PRIORITIES), status,
+                rng.choice(agent_ids) if rng.random() < 0.8 else None,
+                created_at, updated_at, updated_at if status == "CLOSED" else None
+            ))
+        # Deleted customers cascade two tickets each
+        for customer_id in doomed_customers:
+            for _ in range(2):
+                ticket_rows.append((customer_id, "Cascaded", None, rng.choice(PRIORITIES), "OPEN",
+                                    None, now, now, None))
+        ticket_rows += [(rng.choice(customer_ids), DISPOSABLE_TITLE, None, rng.choice(PRIORITIES), "OPEN",
+                         None, now, now, None) for _ in range(disposable)]
+        _insert_many(cursor, """
+            INSERT INTO tickets
+                (customer_id, title, description, priority, status, assigned_to, created_at, updated_at, closed_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, ticket_rows)
+        _backfill_ticket_events(cursor)
+        conn.commit()
+        ticket_rollups.backfill()
+
+        return {
+            "admin": {"id": _ids(cursor, "SELECT id FROM users WHERE email = %s", (ADMIN_EMAIL,))[0],
+                      "email": ADMIN_EMAIL, "password": PASSWORD},
+            "agent_ids": agent_ids,
+            "customer_ids": customer_ids,
+            "open_ticket_ids": _ids(cursor, "SELECT id FROM tickets WHERE status <> %s AND title <> %s",
+                                    ("CLOSED", DISPOSABLE_TITLE)),
+            "ticket_ids": _ids(cursor, "SELECT id FROM tickets WHERE title <> %s", (DISPOSABLE_TITLE,)),
+            "disposable": {
+                "users": _ids(cursor, "SELECT id FROM users WHERE email LIKE %s", ("bench-user-del-%",)),
+                "customers": doomed_customers,
+                "tickets": _ids(cursor, "SELECT id FROM tickets WHERE title = %s", (DISPOSABLE_TITLE,)),
+            },
+        }
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,155 @@
+# bench/loadgen.py
+"""
+Minimal asyncio HTTP/1.1 load generator (keep-alive, no dependencies).
+
+`concurrency` clients each hold one connection and issue requests back to
+back for `duration` seconds (or until `max_requests` have been sent);
+latencies are recorded per request. The path, headers and body may be
+callables taking the request's sequence number, for endpoints that need
+a distinct payload or id on every request.
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, statuses, errors, header_values=None):
+    """Throughput and latency percentiles (milliseconds) for one run."""
+    latencies = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    header_mean = None
+    if header_values:
+        header_mean = round(sum(header_values) / len(header_values), 3)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": dict(statuses),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": ms(percentile(latencies, 50)),
+        "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+        "header_mean": header_mean,
+    }
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif status not in (204, 304):
+        await reader.read()  # body delimited by connection close
+        headers["connection"] = "close"
+
+    return status, headers
+
+
+def _build_request(method, path, host, headers, body):
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: keep-alive"]
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    payload = b""
+    if body is not None:
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+        if not any(k.lower() == "content-type" for k in (headers or {})):
+            lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(payload)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + payload
+
+
+def _resolve(value, seq):
+    return value(seq) if callable(value) else value
+
+
+async def run_load(url, concurrency=50, duration=10.0, method="GET", path=None,
+                   headers=None, body=None, max_requests=None, record_header=None):
+    """
+    Drive `url` with `concurrency` keep-alive clients for `duration` seconds.
+
+    `path` (default: the path of `url`), `headers` and `body` may be
+    callables of the request sequence number. With `record_header`, the
+    numeric value of that response header is averaged into `header_mean`.
+    """
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    if path is None:
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+    fixed_request = None
+    if not any(callable(v) for v in (path, headers, body)):
+        fixed_request = _build_request(method, path, parts.netloc, headers, body)
+
+    latencies = []
+    statuses = Counter()
+    header_values = []
+    errors = 0
+    sequence = itertools.count()
+    record_header = record_header.lower() if record_header else None
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            seq = next(sequence)
+            if max_requests is not None and seq >= max_requests:
+                break
+            request = fixed_request or _build_request(
+                method, _resolve(path, seq), parts.netloc,
+                _resolve(headers, seq), _resolve(body, seq)
+            )
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(host, port)
+                start = time.perf_counter()
+                writer.write(request)
+                await writer.drain()
+                status, response_headers = await _read_response(reader)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] += 1
+                if record_header and record_header in response_headers:
+                    header_values.append(float(response_headers[record_header]))
+                if response_headers.get("connection", "").lower() == "close":
+                    writer.close()
+                    writer = None
+            except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+                errors += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+                await asyncio.sleep(0.01)
+        if writer is not None:
+            writer.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, statuses, errors, header_values)
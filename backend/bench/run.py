@@ -0,0 +1,165 @@
+# bench/run.py
+"""
+Endpoint benchmark suite.
+
+Starts bench/server.py (the Flask app on SQLite + fakeredis stand-ins,
+or a scratch MySQL with --database mysql), then drives every route
+registered in app.py with the load generator and records throughput,
+p50/p95/p99 latency and DB queries per request for each scenario.
+
+    cd backend
+    python -m bench.run --duration 10 --concurrency 32 --output bench-results.json
+    python -m bench.run --only tickets. --only dashboard.
+    python -m bench.compare bench-baseline.json bench-results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+from bench import scenarios as bench_scenarios
+from bench.loadgen import run_load
+from bench.server import QUERY_HEADER
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_SECRET = "bench-secret-key-not-for-production-use"
+
+
+def start_server(args, manifest_path):
+    env = dict(os.environ, SECRET_KEY=BENCH_SECRET)
+    cmd = [
+        sys.executable, "-m", "bench.server",
+        "--port", str(args.port), "--manifest", manifest_path,
+        "--database", args.database,
+        "--customers", str(args.customers), "--tickets", str(args.tickets),
+        "--disposable", str(args.disposable),
+    ]
+    if args.sqlite_path:
+        cmd += ["--sqlite-path", args.sqlite_path]
+    if args.redis_url:
+        cmd += ["--redis-url", args.redis_url]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env)
+
+
+def wait_for_manifest(server, path, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"bench server exited with status {server.returncode}")
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        time.sleep(0.2)
+    raise SystemExit(f"bench server not ready after {timeout}s")
+
+
+def first_page_cursor(base_url):
+    with urllib.request.urlopen(f"{base_url}/tickets?limit=50") as response:
+        return json.load(response).get("next_cursor")
+
+
+def current_etags(base_url, paths):
+    """ETag the server issues right now for each path (for the 304 scenarios)."""
+    etags = {}
+    for path in paths:
+        with urllib.request.urlopen(f"{base_url}{path}") as response:
+            etags[path] = response.headers.get("ETag")
+    return etags
+
+
+async def run_all(base_url, selected, args):
+    results = {}
+    for scenario in selected:
+        concurrency = min(scenario.get("concurrency", args.concurrency), args.concurrency)
+        result = await run_load(
+            base_url, concurrency=concurrency, duration=args.duration,
+            method=scenario["method"], path=scenario["path"],
+            headers=scenario.get("headers"), body=scenario.get("body"),
+            max_requests=scenario.get("max_requests"), record_header=QUERY_HEADER,
+        )
+        result["db_queries_per_request"] = result.pop("header_mean")
+        result["concurrency"] = concurrency
+        results[scenario["name"]] = result
+        print(f"{scenario['name']:28} {result['rps']:>9} rps  p50 {result['p50_ms']!s:>9} ms  "
+              f"p95 {result['p95_ms']!s:>9} ms  p99 {result['p99_ms']!s:>9} ms  "
+              f"q/req {result['db_queries_per_request']!s:>6}  {result['statuses']}", flush=True)
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="clients per scenario (upper bound)")
+    parser.add_argument("--only", action="append", help="run scenarios whose name starts with this; repeatable")
+    parser.add_argument("--output", default="bench-results.json")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--database", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--sqlite-path", help="defaults to a temporary file")
+    parser.add_argument("--redis-url", help="use a real Redis instead of fakeredis")
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--disposable", type=int, default=2000)
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    manifest_path = os.path.join(workdir, "manifest.json")
+    if args.database == "sqlite" and not args.sqlite_path:
+        args.sqlite_path = os.path.join(workdir, "support_desk.sqlite3")
+
+    server = start_server(args, manifest_path)
+    try:
+        manifest = wait_for_manifest(server, manifest_path, args.startup_timeout)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+        all_scenarios = bench_scenarios.build(
+            manifest, BENCH_SECRET, first_page_cursor(base_url),
+            current_etags(base_url, bench_scenarios.CONDITIONAL_PATHS.values())
+        )
+        for route in bench_scenarios.uncovered_routes(all_scenarios, manifest["routes"]):
+            print(f"warning: no scenario covers {route}", file=sys.stderr)
+
+        selected = bench_scenarios.select(all_scenarios, args.only)
+        results = asyncio.run(run_all(base_url, selected, args))
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "database": args.database,
+            "redis": "real" if args.redis_url else "fakeredis",
+            "duration": args.duration,
+            "concurrency": args.concurrency,
+            "customers": args.customers,
+            "tickets": args.tickets,
+        },
+        "endpoints": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
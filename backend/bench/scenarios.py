@@ -0,0 +1,151 @@
+# bench/scenarios.py
+"""
+One load scenario per blueprint route (several for the hot read paths).
+
+Each scenario is a dict:
+    name          result key, "<blueprint>.<what>"
+    route         "METHOD /rule" as registered in app.py, for coverage
+    method, path  path may be a callable of the request sequence number
+    body, headers optional; body/headers may be callables too
+    max_requests  cap for scenarios that consume seeded rows (DELETEs)
+    concurrency   optional override (password hashing, big exports)
+
+Reads run before writes and DELETEs run last, so every read scenario
+sees the freshly seeded data set.
+"""
+import json
+import time
+import uuid
+from datetime import date, timedelta
+
+import jwt
+
+IMPORT_ROWS = 200
+BULK_TICKETS = 100
+# Revalidated with If-None-Match by the *.not_modified scenarios
+CONDITIONAL_PATHS = {"tickets.list": "/tickets?limit=50", "customers.list": "/customers", "users.list": "/users"}
+
+
+def _cycle(ids):
+    return lambda seq: ids[seq % len(ids)]
+
+
+def build(manifest, secret_key, first_page_cursor=None, etags=None):
+    nonce = uuid.uuid4().hex[:8]   # keeps created emails unique across runs on the same data
+    customer = _cycle(manifest["customer_ids"])
+    agent = _cycle(manifest["agent_ids"])
+    open_ticket = _cycle(manifest["open_ticket_ids"])
+    ticket = _cycle(manifest["ticket_ids"])
+    disposable = manifest["disposable"]
+    admin = manifest["admin"]
+
+    def fresh_token(seq):
+        token = jwt.encode(
+            {"id": admin["id"], "role": "admin", "exp": int(time.time()) + 3600, "jti": f"{nonce}-{seq}"},
+            secret_key, algorithm="HS256"
+        )
+        return {"Authorization": f"Bearer {token}"}
+
+    def import_body(seq):
+        lines = (
+            json.dumps({"name": f"Imported {seq}-{i}", "email": f"bench-import-{nonce}-{seq}-{i}@example.com",
+                        "company": "Acme Corp"})
+            for i in range(IMPORT_ROWS)
+        )
+        return ("\n".join(lines) + "\n").encode()
+
+    scenarios = [
+        # --- reads ---
+        {"name": "tickets.list", "route": "GET /tickets", "method": "GET", "path": "/tickets?limit=50"},
+        {"name": "tickets.list_filtered", "route": "GET /tickets", "method": "GET",
+         "path": "/tickets?status=OPEN&priority=HIGH&limit=50"},
+        {"name": "tickets.list_by_agent", "route": "GET /tickets", "method": "GET",
+         "path": lambda seq: f"/tickets?assigned_to={agent(seq)}&status=IN_PROGRESS&limit=50"},
+        {"name": "tickets.export", "route": "GET /tickets/export", "method": "GET",
+         "path": "/tickets/export?format=csv&status=CLOSED", "concurrency": 4},
+        {"name": "customers.list", "route": "GET /customers", "method": "GET", "path": "/customers"},
+        {"name": "customers.list_columns", "route": "GET /customers", "method": "GET",
+         "path": "/customers?format=columns"},
+        {"name": "customers.search", "route": "GET /customers/search", "method": "GET",
+         "path": "/customers/search?q=acme&limit=20"},
+        {"name": "customers.list_by_name", "route": "GET /customers", "method": "GET",
+         "path": "/customers?customer_name=Customer%201"},
+        {"name": "dashboard.summary", "route": "GET /dashboard/summary", "method": "GET",
+         "path": "/dashboard/summary"},
+        {"name": "dashboard.trends_daily", "route": "GET /dashboard/trends", "method": "GET",
+         "path": f"/dashboard/trends?from={date.today() - timedelta(days=364)}&granularity=day"},
+        {"name": "dashboard.trends_monthly", "route": "GET /dashboard/trends", "method": "GET",
+         "path": f"/dashboard/trends?from={date.today() - timedelta(days=364)}&granularity=month"},
+        {"name": "dashboard.agents", "route": "GET /dashboard/agents", "method": "GET",
+         "path": "/dashboard/agents"},
+        {"name": "dashboard.resolution_times", "route": "GET /dashboard/resolution-times", "method": "GET",
+         "path": f"/dashboard/resolution-times?from={date.today() - timedelta(days=364)}"},
+        {"name": "tickets.events", "route": "GET /tickets/<int:ticket_id>/events", "method": "GET",
+         "path": lambda seq: f"/tickets/{ticket(seq)}/events"},
+        {"name": "users.list", "route": "GET /users", "method": "GET", "path": "/users"},
+        {"name": "users.list_agents", "route": "GET /users", "method": "GET", "path": "/users?role=agent"},
+
+        # --- writes ---
+        {"name": "tickets.create", "route": "POST /tickets", "method": "POST", "path": "/tickets",
+         "body": lambda seq: {"customer_id": customer(seq), "title": f"Bench {seq}", "priority": "MEDIUM"}},
+        {"name": "tickets.bulk", "route": "POST /tickets/bulk", "method": "POST", "path": "/tickets/bulk",
+         "body": lambda seq: [{"customer_id": customer(seq * BULK_TICKETS + i), "title": f"Bulk {seq}-{i}",
+                               "priority": "LOW"} for i in range(BULK_TICKETS)]},
+        {"name": "tickets.update_status", "route": "PUT /tickets/<int:ticket_id>/update", "method": "PUT",
+         "path": lambda seq: f"/tickets/{open_ticket(seq)}/update",
+         "body": lambda seq: {"status": "IN_PROGRESS", "assigned_to": agent(seq)}},
+        {"name": "tickets.assign", "route": "PUT /tickets/<int:ticket_id>/assign", "method": "PUT",
+         "path": lambda seq: f"/tickets/{ticket(seq)}/assign",
+         "body": lambda seq: {"assigned_to": agent(seq)}},
+        {"name": "customers.create", "route": "POST /customers", "method": "POST", "path": "/customers",
+         "body": lambda seq: {"name": f"New {seq}", "email": f"bench-new-{nonce}-{seq}@example.com",
+                              "company": "Globex"}},
+        {"name": "customers.import", "route": "POST /customers/import", "method": "POST",
+         "path": "/customers/import?format=ndjson", "headers": {"Content-Type": "application/x-ndjson"},
+         "body": import_body, "concurrency": 4},
+        {"name": "auth.register", "route": "POST /register", "method": "POST", "path": "/register",
+         "body": lambda seq: {"name": f"Agent {seq}", "email": f"bench-reg-{nonce}-{seq}@example.com",
+                              "password": "bench-password"}, "concurrency": 8},
+        {"name": "auth.login", "route": "POST /login", "method": "POST", "path": "/login",
+         "body": {"email": admin["email"], "password": admin["password"]}, "concurrency": 8},
+        {"name": "auth.logout", "route": "POST /logout", "method": "POST", "path": "/logout",
+         "headers": fresh_token},
+
+        # --- deletes (consume the disposable rows) ---
+        {"name": "tickets.delete", "route": "DELETE /tickets/<int:id>", "method": "DELETE",
+         "path": lambda seq: f"/tickets/{disposable['tickets'][seq]}",
+         "max_requests": len(disposable["tickets"])},
+        {"name": "customers.delete", "route": "DELETE /customers/<int:id>", "method": "DELETE",
+         "path": lambda seq: f"/customers/{disposable['customers'][seq]}",
+         "max_requests": len(disposable["customers"])},
+        {"name": "users.delete", "route": "DELETE /users/<int:id>", "method": "DELETE",
+         "path": lambda seq: f"/users/{disposable['users'][seq]}",
+         "max_requests": len(disposable["users"])},
+    ]
+
+    if first_page_cursor:
+        scenarios.insert(1, {"name": "tickets.list_page2", "route": "GET /tickets", "method": "GET",
+                             "path": f"/tickets?limit=50&after={first_page_cursor}"})
+
+    # Polling clients revalidating unchanged lists: expect 304 and 0 queries.
+    # Inserted ahead of the writes, which bump the versions
+    for name, path in CONDITIONAL_PATHS.items():
+        etag = (etags or {}).get(path)
+        if not etag:
+            continue
+        scenarios.insert(1, {"name": f"{name}_not_modified", "route": f"GET {path.split('?')[0]}",
+                             "method": "GET", "path": path, "headers": {"If-None-Match": etag}})
+    return scenarios
+
+
+def uncovered_routes(scenarios, routes):
+    covered = {s["route"] for s in scenarios}
+    return [route for route in routes if route not in covered]
+
+
+def select(scenarios, patterns):
+    """Scenarios whose name starts with any of `patterns` (all if none)."""
+    if not patterns:
+        return scenarios
+    return [s for s in scenarios if any(s["name"].startswith(p) for p in patterns)]
+
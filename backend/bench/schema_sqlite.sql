@@ -0,0 +1,72 @@
+-- SQLite equivalent of the support_desk schema, used by the benchmark
+-- stand-in (bench/stand_ins.py). Column names, defaults and the
+-- ON DELETE CASCADE from tickets to customers match MySQL.
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'agent',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    company TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    customer_id INTEGER NOT NULL REFERENCES customers(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    description TEXT,
+    priority TEXT NOT NULL CHECK (priority IN ('LOW', 'MEDIUM', 'HIGH')),
+    status TEXT NOT NULL DEFAULT 'OPEN' CHECK (status IN ('OPEN', 'IN_PROGRESS', 'CLOSED')),
+    assigned_to INTEGER REFERENCES users(id) ON DELETE SET NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    closed_at TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS ticket_daily_rollups (
+    day DATE NOT NULL,
+    priority TEXT NOT NULL CHECK (priority IN ('LOW', 'MEDIUM', 'HIGH')),
+    opened INTEGER NOT NULL DEFAULT 0,
+    closed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, priority)
+);
+
+CREATE TABLE IF NOT EXISTS ticket_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ticket_id INTEGER NOT NULL,
+    event_type TEXT NOT NULL CHECK (event_type IN ('created', 'status', 'assigned', 'deleted')),
+    from_status TEXT CHECK (from_status IN ('OPEN', 'IN_PROGRESS', 'CLOSED')),
+    status TEXT CHECK (status IN ('OPEN', 'IN_PROGRESS', 'CLOSED')),
+    from_assigned_to INTEGER,
+    assigned_to INTEGER,
+    occurred_at TIMESTAMP NOT NULL
+);
+
+-- MySQL's ON UPDATE CURRENT_TIMESTAMP
+CREATE TRIGGER IF NOT EXISTS tickets_updated_at
+AFTER UPDATE ON tickets
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE tickets SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+-- Same indexes as migrations/0003, 0004 and 0006 (FULLTEXT has no SQLite equivalent)
+CREATE INDEX IF NOT EXISTS idx_tickets_created ON tickets (created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created ON tickets (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_priority_created ON tickets (priority, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_assigned_status ON tickets (assigned_to, status, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_customer_created ON tickets (customer_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_customers_created ON customers (created_at);
+CREATE INDEX IF NOT EXISTS idx_customers_name ON customers (name);
+CREATE INDEX IF NOT EXISTS idx_ticket_events_ticket ON ticket_events (ticket_id, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_ticket_events_agent_status ON ticket_events (assigned_to, status, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_ticket_events_status ON ticket_events (status, occurred_at);
@@ -0,0 +1,124 @@
+# bench/serialization.py
+"""
+Encode time and bytes on the wire for large list responses.
+
+Builds 10k-row GET /tickets and GET /customers payloads shaped like the
+real ones (datetime columns included), then times
+
+- Flask's DefaultJSONProvider (what jsonify used before json_codec),
+- each json_codec backend (stdlib, orjson if installed),
+
+and the size and cost of every encoding compression.py can negotiate.
+No database or server needed:
+
+    cd backend
+    python -m bench.serialization --rows 10000 --output serialization.json
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import compression
+import json_codec
+from schemas.customer import CustomerResponse
+
+PRIORITIES = ("LOW", "MEDIUM", "HIGH")
+STATUSES = ("OPEN", "IN_PROGRESS", "CLOSED")
+COMPANIES = ("Acme Corp", "Globex", "Initech", "Umbrella", "Hooli", None)
+
+
+def ticket_rows(n, rng):
+    now = datetime.now().replace(microsecond=0)
+    rows = []
+    for i in range(n):
+        created_at = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+        rows.append({
+            "id": n - i, "customer_id": rng.randrange(1, 2000), "title": f"Ticket {i}",
+            "priority": rng.choice(PRIORITIES), "status": rng.choice(STATUSES),
+            "created_at": created_at, "updated_at": created_at + timedelta(hours=rng.randrange(48)),
+            "assigned_to": rng.randrange(1, 20) if rng.random() < 0.8 else None,
+        })
+    return {"tickets": rows, "next_cursor": "WyIyMDI2LTAxLTAxVDAwOjAwOjAwIiwgMV0"}
+
+
+def customer_rows(n, rng):
+    now = datetime.now().replace(microsecond=0)
+    return [
+        CustomerResponse(
+            id=i, name=f"Customer {i}", email=f"customer-{i}@example.com",
+            company=rng.choice(COMPANIES), created_at=now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+        ).dict()
+        for i in range(1, n + 1)
+    ]
+
+
+def best_of(fn, repeat):
+    """(result, median ms) over `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(timings)
+
+
+def measure(payload, repeat):
+    flask_provider = DefaultJSONProvider(Flask(__name__))
+    encoders = {"flask-default": lambda: flask_provider.dumps(payload).encode()}
+    for name, (dumps, _) in json_codec.BACKENDS.items():
+        encoders[name] = lambda dumps=dumps: dumps(payload)
+
+    results = {"encode": {}, "wire": {}}
+    for name, encode in encoders.items():
+        body, ms = best_of(encode, repeat)
+        results["encode"][name] = {"ms": round(ms, 2), "bytes": len(body)}
+
+    body = json_codec.dumps(payload)
+    results["wire"]["identity"] = {"ms": 0.0, "bytes": len(body)}
+    for name, encoder in reversed(compression.ENCODERS):
+        compressed, ms = best_of(lambda: encoder(body), repeat)
+        results["wire"][name] = {"ms": round(ms, 2), "bytes": len(compressed),
+                                 "ratio": round(len(body) / len(compressed), 1)}
+    return results
+
+
+def print_table(results):
+    for payload, result in results.items():
+        print(f"\n{payload}")
+        for name, r in result["encode"].items():
+            print(f"  encode  {name:14} {r['ms']:9.2f} ms  {r['bytes']:>10,} B")
+        for name, r in result["wire"].items():
+            ratio = f"  x{r['ratio']}" if "ratio" in r else ""
+            print(f"  wire    {name:14} {r['ms']:9.2f} ms  {r['bytes']:>10,} B{ratio}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    payloads = {
+        f"GET /tickets ({args.rows} rows)": ticket_rows(args.rows, rng),
+        f"GET /customers ({args.rows} rows)": customer_rows(args.rows, rng),
+    }
+    results = {name: measure(payload, args.repeat) for name, payload in payloads.items()}
+    print_table(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": args.rows, "gzip_level": compression.GZIP_LEVEL,
+                       "brotli_quality": compression.BROTLI_QUALITY, "results": results}, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
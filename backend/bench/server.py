@@ -0,0 +1,78 @@
+# bench/server.py
+"""
+The Flask app from app.py on the benchmark stand-ins, started by
+bench/run.py in its own process so the load generator doesn't share a
+GIL with the server.
+
+Seeds bench/dataset.py, writes the manifest (seeded ids plus every
+registered route) to --manifest, then serves with a threaded WSGI
+server. Each response carries X-DB-Queries, the number of statements
+the request executed.
+
+    python -m bench.server --port 5055 --manifest /tmp/manifest.json
+    python -m bench.server --database mysql ...   # scratch MySQL from DB_*, schema already applied
+"""
+import argparse
+import json
+import logging
+import os
+
+from bench import dataset, stand_ins
+
+QUERY_HEADER = "X-DB-Queries"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--manifest", required=True)
+    parser.add_argument("--database", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--sqlite-path")
+    parser.add_argument("--redis-url", help="use this Redis instead of fakeredis")
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--tickets", type=int, default=20000)
+    parser.add_argument("--agents", type=int, default=20)
+    parser.add_argument("--disposable", type=int, default=2000,
+                        help="rows seeded for each DELETE scenario to consume")
+    args = parser.parse_args()
+
+    stand_ins.install(args.database, args.sqlite_path, args.redis_url)
+    manifest = dataset.seed(args.customers, args.tickets, args.agents, args.disposable)
+
+    if args.database == "sqlite":
+        os.environ["SCHEMA_CHECK"] = "0"  # information_schema is MySQL-only; schema_sqlite.sql has the indexes
+    from werkzeug.serving import make_server
+    from app import app
+
+    @app.before_request
+    def _reset_queries():
+        stand_ins.reset_query_count()
+
+    @app.after_request
+    def _report_queries(response):
+        response.headers[QUERY_HEADER] = str(stand_ins.query_count())
+        return response
+
+    manifest["routes"] = sorted(
+        f"{method} {rule.rule}"
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint != "static" and not rule.endpoint.startswith("flasgger")
+        for method in rule.methods - {"HEAD", "OPTIONS"}
+    )
+    manifest["pid"] = os.getpid()
+
+    server = make_server(args.host, args.port, app, threaded=True)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    # Written last: its existence tells bench/run.py the server is ready
+    tmp = args.manifest + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, args.manifest)
+
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
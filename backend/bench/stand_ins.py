@@ -0,0 +1,389 @@
+# bench/stand_ins.py
+"""
+Local stand-ins for MySQL and Redis, so the benchmark suite runs on a
+laptop or CI box with neither service:
+
+- SQLitePool replaces db.pool, so get_db_connection() hands out SQLite
+  connections. The MySQL dialect the routes use (%s placeholders,
+  FOR UPDATE, MATCH ... AGAINST, ON DUPLICATE KEY UPDATE, NOW(),
+  NOW(3) - INTERVAL %s MICROSECOND, TIMESTAMPDIFF(SECOND, ...)) is
+  translated per statement.
+- fakeredis replaces redis_client.redis_client (`pip install fakeredis
+  lupa`; lupa runs the cache lock's Lua script). Pass a redis_url to use
+  a real local Redis instead.
+
+With database="mysql" the real pool is kept (configured from DB_* as
+usual) and only wrapped for query counting.
+
+install() must run before app.py or any route module is imported: they
+bind redis_client at import time.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import lru_cache
+
+from mysql.connector import errorcode, errors
+
+import db
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "schema_sqlite.sql")
+NGRAM_SIZE = 2  # matches NGRAM_TOKEN_SIZE in routes/customers.py
+
+_queries = threading.local()
+
+
+def reset_query_count():
+    _queries.count = 0
+
+
+def query_count():
+    """Statements executed by this thread since reset_query_count()."""
+    return getattr(_queries, "count", 0)
+
+
+def _count_query():
+    _queries.count = getattr(_queries, "count", 0) + 1
+
+
+# --- MySQL -> SQLite dialect -------------------------------------------------
+
+_MATCH = re.compile(
+    r"MATCH\s*\(([^)]*)\)\s*AGAINST\s*\(\s*%s\s+IN\s+NATURAL\s+LANGUAGE\s+MODE\s*\)", re.I
+)
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE\b", re.I)
+_LIKE = re.compile(r"\bLIKE\s+%s", re.I)
+_UPSERT_NOOP = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE\s+id\s*=\s*id\b", re.I)
+_UPSERT = re.compile(r"ON\s+DUPLICATE\s+KEY\s+UPDATE", re.I)
+_VALUES_REF = re.compile(r"\bVALUES\((\w+)\)", re.I)
+_NOW = re.compile(r"\bNOW\(\)", re.I)
+_NOW_BEFORE = re.compile(r"\bNOW\(3\)\s*-\s*INTERVAL\s+%s\s+MICROSECOND\b", re.I)
+_INSERT_INTO = re.compile(r"^\s*INSERT\s+(?:IGNORE\s+)?INTO\s+(\w+)", re.I)
+_TIMESTAMPDIFF = re.compile(r"\bTIMESTAMPDIFF\(\s*SECOND\s*,\s*([\w.]+)\s*,\s*([\w.]+)\s*\)", re.I)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql):
+    """Rewrite one MySQL statement (as the routes write it) for SQLite."""
+    sql = _MATCH.sub(lambda m: f"bench_match(%s, {m.group(1)})", sql)
+    sql = _FOR_UPDATE.sub("", sql)
+    sql = _LIKE.sub(r"LIKE %s ESCAPE '\\'", sql)
+    sql = _UPSERT_NOOP.sub("ON CONFLICT DO NOTHING", sql)
+    sql = _UPSERT.sub("ON CONFLICT DO UPDATE SET", sql)
+    sql = _VALUES_REF.sub(r"excluded.\1", sql)
+    sql = _NOW.sub("CURRENT_TIMESTAMP", sql)
+    sql = _NOW_BEFORE.sub("strftime('%Y-%m-%d %H:%M:%f', julianday('now') - %s / 86400e6)", sql)
+    sql = _TIMESTAMPDIFF.sub(r"CAST(ROUND((julianday(\2) - julianday(\1)) * 86400) AS INTEGER)", sql)
+    return sql.replace("%s", "?")
+
+
+def _ngrams(text):
+    text = text.lower()
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+
+def _match_score(term, *columns):
+    """Rough stand-in for ngram FULLTEXT relevance: shared n-grams."""
+    text = " ".join(c for c in columns if c).lower()
+    return sum(1 for gram in _ngrams(term) if gram in text)
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(" "))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter("DATE", lambda raw: date.fromisoformat(raw.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda raw: datetime.fromisoformat(raw.decode()))
+
+
+_auto_increment_tables = {}
+
+
+def _auto_increment(raw, table):
+    """Whether `table` has an INTEGER PRIMARY KEY, SQLite's AUTO_INCREMENT."""
+    if table not in _auto_increment_tables:
+        pk = [row for row in raw.execute(f"PRAGMA table_info({table})") if row[5]]
+        _auto_increment_tables[table] = len(pk) == 1 and pk[0][2].upper() == "INTEGER"
+    return _auto_increment_tables[table]
+
+
+@contextmanager
+def _mysql_errors():
+    """Raise SQLite's UNIQUE failures as MySQL's duplicate-key error (1062)."""
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        if "UNIQUE" not in str(e):
+            raise
+        raise errors.IntegrityError(msg=str(e), errno=errorcode.ER_DUP_ENTRY) from e
+
+
+class SQLiteCursor:
+    """The subset of the mysql.connector cursor API the routes use."""
+
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._cursor = conn._raw.cursor()
+        self._dictionary = dictionary
+        self._lastrowid = None
+
+    def execute(self, sql, params=()):
+        _count_query()
+        self._conn._begin_for(sql)
+        with _mysql_errors():
+            self._cursor.execute(translate(sql), tuple(params or ()))
+        self._lastrowid = self._first_inserted_id(sql)
+
+    def executemany(self, sql, seq_params):
+        _count_query()
+        self._conn._begin_for(sql)
+        with _mysql_errors():
+            self._cursor.executemany(translate(sql), [tuple(p) for p in seq_params])
+        # mysql.connector sends an INSERT batch as one multi-row INSERT
+        self._lastrowid = self._first_inserted_id(sql)
+
+    def _first_inserted_id(self, sql):
+        """MySQL's LAST_INSERT_ID(): the first id of a multi-row INSERT, where SQLite has the last."""
+        if not self._generated_id(sql):
+            return 0
+        last = self._conn._raw.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return last - self._cursor.rowcount + 1
+
+    def _generated_id(self, sql):
+        """
+        Like MySQL, lastrowid is only set by a statement that inserted rows
+        into a table with an AUTO_INCREMENT id; any other statement (the
+        rollup upsert, an UPDATE) leaves 0, where SQLite would keep the
+        connection's previous rowid.
+        """
+        match = _INSERT_INTO.match(sql)
+        return bool(match) and self._cursor.rowcount > 0 and _auto_increment(self._conn._raw, match.group(1))
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip((d[0] for d in self._cursor.description), row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._row(row) for row in self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    Pooled SQLite connection with mysql.connector's transaction shape:
+    the first write (or locking read) starts a transaction that lasts
+    until commit()/rollback(), and close() returns it to the pool.
+    """
+
+    unread_result = False
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._returned = False
+
+    @property
+    def in_transaction(self):
+        return self._raw.in_transaction
+
+    def _begin_for(self, sql):
+        if self._raw.in_transaction:
+            return
+        head = sql.lstrip()[:6].upper()
+        if head != "SELECT" or _FOR_UPDATE.search(sql):
+            # Take the write lock up front: a deferred transaction that
+            # upgrades later can fail with SQLITE_BUSY instead of waiting
+            self._raw.execute("BEGIN IMMEDIATE")
+
+    def cursor(self, dictionary=False, buffered=None, **kwargs):
+        cursor = SQLiteCursor(self, dictionary)
+        # Same per-request DB timing (perf.py) as a real pooled connection
+        return db.TimedCursor(cursor) if db._query_hooks else cursor
+
+    def commit(self):
+        if self._raw.in_transaction:
+            self._raw.execute("COMMIT")
+
+    def rollback(self):
+        if self._raw.in_transaction:
+            self._raw.execute("ROLLBACK")
+
+    def ping(self, reconnect=False):
+        self._raw.execute("SELECT 1")
+
+    def close(self):
+        if self._returned:
+            return
+        self._returned = True
+        self.rollback()
+        self._pool._release(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SQLitePool:
+    """Drop-in for db.ConnectionPool backed by one SQLite file (WAL mode)."""
+
+    def __init__(self, path, size=32):
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = deque()
+        self._in_use = 0
+        self._stats = {"checkouts": 0, "connects": 0}
+
+    def _connect(self):
+        raw = sqlite3.connect(
+            self.path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            isolation_level=None,   # transactions are managed by SQLiteConnection
+            check_same_thread=False,
+            timeout=30,
+        )
+        raw.execute("PRAGMA journal_mode=WAL")
+        raw.execute("PRAGMA synchronous=NORMAL")
+        raw.execute("PRAGMA foreign_keys=ON")
+        raw.create_function("bench_match", -1, _match_score, deterministic=True)
+        self._stats["connects"] += 1
+        return raw
+
+    def connect(self):
+        with self._lock:
+            raw = self._idle.pop() if self._idle else None
+            self._in_use += 1
+            self._stats["checkouts"] += 1
+        if raw is None:
+            raw = self._connect()
+        return SQLiteConnection(self, raw)
+
+    def _release(self, raw):
+        with self._lock:
+            self._in_use -= 1
+            if len(self._idle) < self.size:
+                self._idle.append(raw)
+                return
+        raw.close()
+
+    def create_schema(self):
+        raw = self._connect()
+        try:
+            with open(SCHEMA_PATH) as f:
+                raw.executescript(f.read())
+        finally:
+            raw.close()
+
+    def dispose(self):
+        with self._lock:
+            idle, self._idle = self._idle, deque()
+        for raw in idle:
+            raw.close()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({"size": self.size, "in_use": self._in_use, "idle": len(self._idle)})
+        return stats
+
+
+# --- query counting for the real pool ----------------------------------------
+
+class CountingCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def execute(self, *args, **kwargs):
+        _count_query()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        _count_query()
+        return self._cursor.executemany(*args, **kwargs)
+
+
+class CountingConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.close()
+
+
+def install(database="sqlite", sqlite_path=None, redis_url=None):
+    """
+    Point get_db_connection() and redis_client at the stand-ins.
+    Returns the pool now behind get_db_connection().
+    """
+    import redis_client
+
+    if database == "sqlite":
+        sqlite_path = sqlite_path or os.path.join(os.getcwd(), f"bench-{int(time.time())}.sqlite3")
+        db.pool = SQLitePool(sqlite_path)
+        db.pool.create_schema()
+    elif database == "mysql":
+        connect = db.pool.connect
+        db.pool.connect = lambda: CountingConnection(connect())
+    else:
+        raise ValueError(f"Unknown database stand-in: {database}")
+
+    if redis_url:
+        import redis
+        client = redis.Redis.from_url(redis_url, decode_responses=True)
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            raise SystemExit("The Redis stand-in needs fakeredis and lupa: pip install fakeredis lupa "
+                             "(or pass --redis-url to use a local Redis)")
+        # TimedRedis first in the MRO keeps the per-request Redis timing
+        client_class = type("FakeTimedRedis", (redis_client.TimedRedis, fakeredis.FakeRedis), {})
+        client = client_class(decode_responses=True)
+
+    redis_client.redis_client = client
+    redis_client._release_lock = client.register_script(redis_client.RELEASE_LOCK_SCRIPT)
+    return db.pool
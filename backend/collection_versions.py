@@ -0,0 +1,151 @@
+# collection_versions.py
+"""
+Per-collection version counters for conditional GETs.
+
+Every route that changes a collection bumps its counter in Redis
+(version:tickets, version:customers, version:users) after committing.
+List endpoints wrapped in @conditional_get derive a weak ETag from the
+counters they depend on plus the path and normalized query string, so
+an If-None-Match that still matches is answered 304 from one MGET,
+without touching MySQL.
+
+The version is read before the view queries the database, so a write
+that lands mid-request can only make the ETag older than the body, never
+newer: the client refetches next time rather than keeping stale data.
+With read replicas that only holds if the body comes from a server that
+has the write, so a bump also marks the collection recently written for
+READ_YOUR_WRITES_WINDOW, and lists of a recently written collection are
+read from the primary.
+"""
+import hashlib
+import json
+import logging
+import time
+from functools import wraps
+
+from flask import Response, make_response, request
+
+import redis_client as cache
+from db import READ_YOUR_WRITES_WINDOW, replicas
+from read_routing import pin_primary
+
+KEY_PREFIX = "version:"
+RECENT_KEY_PREFIX = "version:recent:"
+
+log = logging.getLogger(__name__)
+
+
+def version_key(collection):
+    return KEY_PREFIX + collection
+
+
+def recent_key(collection):
+    return RECENT_KEY_PREFIX + collection
+
+
+def initial_version():
+    # Seeded from the clock rather than 0, so counters recreated after a
+    # Redis flush never repeat a version a client may still hold
+    return int(time.time() * 1000)
+
+
+def queue_bump(pipe, collections):
+    """Queue the commands bumping `collections` on `pipe` (see bump)."""
+    for collection in collections:
+        if replicas:
+            # Before the INCR: whoever sees the new version also sees this
+            pipe.set(recent_key(collection), 1, px=int(READ_YOUR_WRITES_WINDOW * 1000))
+        pipe.incr(version_key(collection))
+
+
+def bump(*collections):
+    """Invalidate every ETag issued for these collections; never fails the write."""
+    try:
+        pipe = cache.redis_client.pipeline(transaction=False)
+        queue_bump(pipe, collections)
+        pipe.execute()
+    except Exception:
+        log.exception("Failed to bump collection versions %s", collections)
+
+
+def queue_missing_versions(pipe, keys, versions):
+    """
+    Queue creating the counters an MGET of `keys` found missing
+    (`versions`) on `pipe`; False if none were.
+    """
+    if None not in versions:
+        return False
+    seed = initial_version()
+    for key, version in zip(keys, versions):
+        if version is None:
+            pipe.set(key, seed, nx=True)
+    return True
+
+
+def current_versions(*collections):
+    """Current counter per collection, creating missing ones."""
+    keys = [version_key(c) for c in collections]
+    versions = cache.redis_client.mget(keys)
+    pipe = cache.redis_client.pipeline(transaction=False)
+    if queue_missing_versions(pipe, keys, versions):
+        pipe.execute()
+        versions = cache.redis_client.mget(keys)
+    return versions
+
+
+def recently_written(*collections):
+    """True if any of `collections` was bumped within READ_YOUR_WRITES_WINDOW."""
+    if not replicas:
+        return False
+    return cache.redis_client.exists(*[recent_key(c) for c in collections]) > 0
+
+
+def normalized_args(args):
+    """Query parameters in a canonical order, so ?a=1&b=2 and ?b=2&a=1 share an ETag."""
+    return sorted(args.items(multi=True))
+
+
+def make_etag(versions, path, args):
+    raw = json.dumps([path, versions, args], default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+
+def conditional_get(*collections):
+    """
+    Serve 304 Not Modified when If-None-Match matches the current ETag for
+    `collections`; otherwise run the view and tag its 200 response.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                etag = make_etag(current_versions(*collections), request.path,
+                                 normalized_args(request.args))
+            except Exception:
+                log.exception("Collection versions unavailable; serving without ETag")
+                return view(*args, **kwargs)
+
+            if request.if_none_match.contains_weak(etag):
+                return cache_headers(Response(status=304), etag)
+
+            try:
+                if recently_written(*collections):
+                    pin_primary()
+            except Exception:
+                log.exception("Collection recency unavailable; reading from the primary")
+                pin_primary()
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                cache_headers(response, etag)
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_headers(response, etag):
+    """Tag a Flask or Starlette response with the weak ETag."""
+    response.headers["ETag"] = f'W/"{etag}"'
+    # Let clients keep the body but revalidate on every use
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,81 @@
+# compression.py
+"""
+Negotiated response compression for large JSON / CSV / NDJSON bodies.
+
+Responses of COMPRESS_MIN_BYTES or more are compressed with the best
+encoding the client accepts: brotli when the optional `brotli` package
+is installed, otherwise gzip. Small bodies go out as they are (the
+framing overhead would eat the saving), and so do streamed responses
+such as GET /tickets/export, which a reverse proxy can compress chunk
+by chunk.
+
+Compression time is reported as the `compress` phase in Server-Timing.
+"""
+import gzip
+import os
+import time
+
+from flask import request
+
+from perf import add_timing
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # 4-5 is the usual sweet spot for dynamic content
+COMPRESSIBLE = {"application/json", "text/csv", "application/x-ndjson"}
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=BROTLI_QUALITY)
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# Server preference order
+ENCODERS = [("br", _brotli)] if brotli else []
+ENCODERS.append(("gzip", _gzip))
+
+
+def choose_encoding(accept_encoding):
+    """(name, encoder) for the best encoding the client accepts, or (None, None)."""
+    for name, encoder in ENCODERS:
+        if accept_encoding[name]:
+            return name, encoder
+    return None, None
+
+
+def compress_response(response):
+    if response.direct_passthrough or response.is_streamed:
+        return response
+    if response.mimetype not in COMPRESSIBLE or "Content-Encoding" in response.headers:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if response.status_code != 200 or response.content_length is None \
+            or response.content_length < COMPRESS_MIN_BYTES:
+        return response
+
+    name, encoder = choose_encoding(request.accept_encodings)
+    if not name:
+        return response
+
+    start = time.perf_counter()
+    body = encoder(response.get_data())
+    add_timing("compress", time.perf_counter() - start)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = name
+    return response
+
+
+def init_app(app):
+    # after_request hooks run in reverse order: registered after
+    # perf.init_app, this runs first and its time lands in Server-Timing
+    app.after_request(compress_response)
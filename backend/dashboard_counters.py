@@ -0,0 +1,324 @@
+# dashboard_counters.py
+"""
+Ticket counts by status and priority, kept in Redis hashes.
+
+Every ticket mutation applies its transition (old status/priority -> new)
+with HINCRBY, so the dashboard summary is two HGETALLs instead of two
+GROUP BY scans. rebuild() recomputes both hashes from MySQL; run this
+module as a script to reconcile periodically:
+
+    python dashboard_counters.py --interval 300
+
+The increments arrive through the job queue, minutes late if they are
+being retried, so a rebuild's snapshot already includes writes whose
+counter jobs have not run yet. The rebuild therefore stores a fence, the
+job stream position taken just before its snapshot, and the handler
+skips jobs queued at or before it. While a rebuild holds
+REBUILD_LOCK_KEY the handler waits instead of adding to the hashes about
+to be replaced. What is left is a write that commits just before the
+snapshot but is queued just after the fence is read, a window of a few
+milliseconds; the next reconcile corrects it.
+
+Per-agent workload (GET /dashboard/agents) is one aggregate query over
+idx_tickets_assigned_status, cached under AGENT_WORKLOAD_KEY and
+dropped whenever a write changes who holds a ticket or what state it
+is in.
+
+Write routes don't touch either directly: they enqueue counters_job()
+and workload_job() (jobs.py), and the handlers below fold a whole batch
+of them into one HINCRBY transaction and one invalidation.
+"""
+import argparse
+import logging
+import os
+import time
+from collections import Counter
+from datetime import datetime
+
+from collection_versions import recently_written
+from db import get_db_connection, get_read_connection
+from jobs import id_key, job_handler, stream_position
+from redis_client import redis_client, delete_cached
+
+STATUS_KEY = "dashboard:counts:status"
+PRIORITY_KEY = "dashboard:counts:priority"
+READY_KEY = "dashboard:counts:ready"
+FENCE_KEY = "dashboard:counts:fence"          # jobs queued up to here are in the hashes
+REBUILD_LOCK_KEY = "dashboard:counts:rebuilding"
+REBUILD_LOCK_TTL = float(os.getenv("COUNTERS_REBUILD_LOCK_TTL", "60"))
+AGENT_WORKLOAD_KEY = "dashboard:agents"
+
+COUNTERS_JOB = "dashboard.counters"
+WORKLOAD_JOB = "dashboard.workload"
+
+STATUS_COUNTS_SQL = "SELECT status, COUNT(*) FROM tickets GROUP BY status"
+PRIORITY_COUNTS_SQL = "SELECT priority, COUNT(*) FROM tickets GROUP BY priority"
+
+# One row per agent, agents without tickets included. The status sums
+# and MIN(created_at) are answered from the (assigned_to, status,
+# created_at) index without reading ticket rows.
+AGENT_WORKLOAD_SQL = """
+    SELECT u.id, u.name, u.email,
+           SUM(t.status = 'OPEN') AS open_count,
+           SUM(t.status = 'IN_PROGRESS') AS in_progress_count,
+           SUM(t.status = 'CLOSED') AS closed_count,
+           MIN(CASE WHEN t.status = 'OPEN' THEN t.created_at END) AS oldest_open_at,
+           NOW() AS db_now
+    FROM users u
+    LEFT JOIN tickets t ON t.assigned_to = u.id
+    WHERE u.role = 'agent'
+    GROUP BY u.id, u.name, u.email
+    ORDER BY u.id
+"""
+
+log = logging.getLogger(__name__)
+
+
+def queue_deltas(pipe, status_deltas, priority_deltas):
+    """Queue HINCRBYs adding {status: n} / {priority: n} deltas on `pipe`."""
+    for status, n in status_deltas.items():
+        if n:
+            pipe.hincrby(STATUS_KEY, status, n)
+    for priority, n in priority_deltas.items():
+        if n:
+            pipe.hincrby(PRIORITY_KEY, priority, n)
+
+
+def apply_deltas(status_deltas, priority_deltas):
+    """Atomically add {status: n} / {priority: n} deltas to the counters."""
+    pipe = redis_client.pipeline(transaction=True)
+    queue_deltas(pipe, status_deltas, priority_deltas)
+    pipe.execute()
+
+
+def counters_job(transitions):
+    """
+    Job applying (old, new) transitions to the counters; None if they
+    cancel out. `old` / `new` are (status, priority) tuples, old=None for
+    a created ticket and new=None for a deleted one.
+    """
+    status_deltas, priority_deltas = transition_deltas(transitions)
+    payload = {
+        "status": {k: n for k, n in status_deltas.items() if n},
+        "priority": {k: n for k, n in priority_deltas.items() if n},
+    }
+    if not payload["status"] and not payload["priority"]:
+        return None
+    return COUNTERS_JOB, payload
+
+
+def workload_job(needed=True):
+    """Job dropping the cached agent workload, or None if not `needed`."""
+    return (WORKLOAD_JOB, {}) if needed else None
+
+
+class CountersRebuilding(Exception):
+    """A rebuild held the lock for longer than the handler waits; the jobs are retried."""
+
+
+def fenced_deltas(jobs, fence):
+    """Fold (job_id, payload) counter jobs queued after `fence` into delta Counters."""
+    status_deltas = Counter()
+    priority_deltas = Counter()
+    after = id_key(fence or "0-0")
+    for job_id, payload in jobs:
+        if id_key(job_id) > after:
+            status_deltas.update(payload["status"])
+            priority_deltas.update(payload["priority"])
+    return status_deltas, priority_deltas
+
+
+@job_handler(COUNTERS_JOB, ids=True)
+def _apply_counter_jobs(jobs):
+    def apply(pipe):
+        rebuilding, fence = pipe.mget(REBUILD_LOCK_KEY, FENCE_KEY)
+        if rebuilding:
+            raise CountersRebuilding("dashboard counters are being rebuilt")
+        status_deltas, priority_deltas = fenced_deltas(jobs, fence)
+        pipe.multi()
+        queue_deltas(pipe, status_deltas, priority_deltas)
+
+    # WATCH: a rebuild swapping the hashes in between makes this start over
+    deadline = time.monotonic() + REBUILD_LOCK_TTL
+    while True:
+        try:
+            redis_client.transaction(apply, REBUILD_LOCK_KEY, FENCE_KEY)
+            return
+        except CountersRebuilding:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+@job_handler(WORKLOAD_JOB)
+def _invalidate_workload_jobs(payloads):
+    delete_cached(AGENT_WORKLOAD_KEY)
+
+
+def transition_deltas(transitions):
+    """Fold many (old, new) transitions into one pair of delta Counters."""
+    status_deltas = Counter()
+    priority_deltas = Counter()
+    for old, new in transitions:
+        if old:
+            status_deltas[old[0]] -= 1
+            priority_deltas[old[1]] -= 1
+        if new:
+            status_deltas[new[0]] += 1
+            priority_deltas[new[1]] += 1
+    return status_deltas, priority_deltas
+
+
+def queue_swap(pipe, status_counts, priority_counts, fence):
+    """Queue, on a MULTI `pipe`, replacing both hashes with a snapshot taken after `fence`."""
+    pipe.delete(STATUS_KEY, PRIORITY_KEY)
+    if status_counts:
+        pipe.hset(STATUS_KEY, mapping=status_counts)
+    if priority_counts:
+        pipe.hset(PRIORITY_KEY, mapping=priority_counts)
+    pipe.set(FENCE_KEY, fence)
+    pipe.set(READY_KEY, int(time.time()))
+    pipe.delete(REBUILD_LOCK_KEY)
+
+
+def rebuild():
+    """
+    Recompute both hashes from MySQL and swap them in atomically. If
+    another rebuild holds the lock, only returns the counts.
+    """
+    locked = redis_client.set(REBUILD_LOCK_KEY, 1, nx=True, px=int(REBUILD_LOCK_TTL * 1000))
+    try:
+        fence = stream_position()
+        # Primary: later HINCRBYs assume every committed write is counted here
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(STATUS_COUNTS_SQL)
+            status_counts = dict(cursor.fetchall())
+            cursor.execute(PRIORITY_COUNTS_SQL)
+            priority_counts = dict(cursor.fetchall())
+        finally:
+            cursor.close()
+            conn.close()
+    except BaseException:
+        if locked:
+            redis_client.delete(REBUILD_LOCK_KEY)
+        raise
+
+    if locked:
+        pipe = redis_client.pipeline(transaction=True)
+        queue_swap(pipe, status_counts, priority_counts, fence)
+        pipe.execute()
+
+    return status_counts, priority_counts
+
+
+def queue_read_counts(pipe):
+    pipe.get(READY_KEY)
+    pipe.hgetall(STATUS_KEY)
+    pipe.hgetall(PRIORITY_KEY)
+
+
+def counts_from_replies(ready, status_counts, priority_counts):
+    """read_counts() from the queue_read_counts() replies; None if the hashes were never built."""
+    if not ready:
+        return None
+    return (
+        {k: int(v) for k, v in status_counts.items()},
+        {k: int(v) for k, v in priority_counts.items()},
+    )
+
+
+def read_counts():
+    """
+    Return ({status: count}, {priority: count}) from Redis.
+
+    Only a cold start (counters never built, or Redis flushed) falls
+    back to rebuild(); every other call is O(1) and never touches MySQL.
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    queue_read_counts(pipe)
+    counts = counts_from_replies(*pipe.execute())
+    return counts if counts is not None else rebuild()
+
+
+def _as_datetime(value):
+    # SQLite (the benchmark stand-in) returns computed timestamps as text
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def workload_from_rows(rows):
+    """
+    Shape AGENT_WORKLOAD_SQL rows for the cache. Ages are measured against
+    the database clock (same time zone as created_at) and stamped with
+    `as_of`, so readers can age them without recomputing.
+    """
+    agents = []
+    for row in rows:
+        oldest = _as_datetime(row["oldest_open_at"])
+        age = None
+        if oldest is not None:
+            age = max(0, int((_as_datetime(row["db_now"]) - oldest).total_seconds()))
+        agents.append({
+            "agent_id": row["id"],
+            "name": row["name"],
+            "email": row["email"],
+            "open": int(row["open_count"] or 0),
+            "in_progress": int(row["in_progress_count"] or 0),
+            "closed": int(row["closed_count"] or 0),
+            "oldest_open_age_seconds": age,
+        })
+    return {"agents": agents, "as_of": time.time()}
+
+
+def workload_read_connection():
+    """
+    A replica, unless tickets or users were written within the
+    read-your-writes window: the rebuild that follows an invalidation
+    must see the write that caused it, or it would be cached without it.
+    """
+    try:
+        recent = recently_written("tickets", "users")
+    except Exception:
+        recent = True
+    return get_db_connection() if recent else get_read_connection()
+
+
+def build_agent_workload():
+    conn = workload_read_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(AGENT_WORKLOAD_SQL)
+        return workload_from_rows(cursor.fetchall())
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def current_workload(cached):
+    """Copy of a cached workload with the oldest-open ages brought up to now."""
+    elapsed = max(0, int(time.time() - cached["as_of"]))
+    return {
+        "agents": [
+            dict(agent, oldest_open_age_seconds=agent["oldest_open_age_seconds"] + elapsed)
+            if agent["oldest_open_age_seconds"] is not None else agent
+            for agent in cached["agents"]
+        ]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile dashboard counters with MySQL")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="seconds between runs; 0 runs once and exits")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    while True:
+        status_counts, priority_counts = rebuild()
+        log.info("Rebuilt dashboard counters: status=%s priority=%s", status_counts, priority_counts)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
@@ -1,11 +1,523 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+
 import mysql.connector
+from mysql.connector import errorcode
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "port": int(os.getenv("DB_PORT", "3306")),
+    "user": os.getenv("DB_USER", "root"),
+    "password": os.getenv("DB_PASSWORD", "root"),
+    "database": os.getenv("DB_NAME", "support_desk"),
+}
+
+# Pool tuning (all overridable from .env)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))            # connections kept open
+POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))  # extra connections under burst, closed on return
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))   # seconds to wait for a free connection
+POOL_RECYCLE = float(os.getenv("DB_POOL_RECYCLE", "1800"))  # reconnect connections older than this
+POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))  # drop connections idle longer than this
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"  # validate idle connections before handing them out
+POOL_PING_INTERVAL = float(os.getenv("DB_POOL_PING_INTERVAL", "5"))  # skip the ping if used this recently
+
+# Read replicas: comma-separated host[:port], same user / password / database as the primary
+DB_REPLICAS = [spec.strip() for spec in os.getenv("DB_REPLICAS", "").split(",") if spec.strip()]
+REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))  # seconds behind the primary before a replica is dropped
+REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "2"))
+# How long a client's reads stay on the primary after its own write; covers
+# the worst lag a replica can reach before the next health check drops it
+READ_YOUR_WRITES_WINDOW = float(
+    os.getenv("DB_READ_YOUR_WRITES_WINDOW", str(REPLICA_MAX_LAG + REPLICA_CHECK_INTERVAL))
+)
+
+log = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+def is_duplicate_key(e):
+    """Whether `e` is MySQL's duplicate-key error (1062), from mysql.connector or aiomysql."""
+    if isinstance(e, mysql.connector.Error):
+        return e.errno == errorcode.ER_DUP_ENTRY
+    # aiomysql raises PyMySQL's IntegrityError, (errno, message) in args
+    return type(e).__name__ == "IntegrityError" and bool(e.args) and e.args[0] == errorcode.ER_DUP_ENTRY
+
+
+def error_response(e):
+    """
+    (body, status, headers) for a route's catch-all handler: 503 with
+    Retry-After when the pool had no connection to give, 500 otherwise.
+    Both apps use it, so pool exhaustion answers the same in either.
+    """
+    if isinstance(e, PoolTimeout):
+        return {"error": str(e)}, 503, {"Retry-After": "1"}
+    return {"error": str(e)}, 500, {}
+
+
+_query_hooks = []
+
+
+def on_query(handler):
+    """
+    Register handler(statement, params, seconds, phase), called after every
+    round trip on a pooled connection. phase is "execute" or "fetch" for
+    cursor calls, or "checkout" for time spent waiting on the pool
+    (statement and params are None).
+    """
+    _query_hooks.append(handler)
+    return handler
+
+
+_read_routing_hooks = []
+
+
+def on_read_routing(handler):
+    """
+    Register handler() -> bool, asked before every get_read_connection();
+    if any handler returns True the read goes to the primary (e.g. the
+    client wrote recently and must see its own write).
+    """
+    _read_routing_hooks.append(handler)
+    return handler
+
+
+def _primary_required():
+    for handler in _read_routing_hooks:
+        try:
+            if handler():
+                return True
+        except Exception:
+            return True  # when in doubt, read from the primary
+    return False
+
+
+def _notify_query(statement, params, seconds, phase):
+    for handler in _query_hooks:
+        try:
+            handler(statement, params, seconds, phase)
+        except Exception:
+            pass  # instrumentation must never fail a query
+
+
+class TimedCursor:
+    """Cursor proxy reporting execute / fetch durations to the on_query hooks."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._statement = None
+        self._params = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, phase, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _notify_query(self._statement, self._params, time.perf_counter() - start, phase)
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        self._statement, self._params = operation, params
+        return self._timed("execute", self._cursor.execute, operation, params, *args, **kwargs)
+
+    def executemany(self, operation, seq_params, *args, **kwargs):
+        self._statement, self._params = operation, None
+        return self._timed("execute", self._cursor.executemany, operation, seq_params, *args, **kwargs)
+
+    def fetchone(self):
+        return self._timed("fetch", self._cursor.fetchone)
+
+    def fetchmany(self, *args, **kwargs):
+        return self._timed("fetch", self._cursor.fetchmany, *args, **kwargs)
+
+    def fetchall(self):
+        return self._timed("fetch", self._cursor.fetchall)
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+
+class PooledConnection:
+    """
+    Thin proxy around a mysql.connector connection.
+
+    Behaves exactly like the raw connection, except close() hands it back
+    to the pool instead of tearing down the socket, so route code that does
+    `conn.close()` in its finally block keeps working unchanged.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._returned = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        cursor = self._raw.cursor(*args, **kwargs)
+        return TimedCursor(cursor) if _query_hooks else cursor
+
+    def close(self):
+        if self._returned:
+            return
+        self._returned = True
+        self._pool._release(self._raw, self._created_at)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # A route that forgot close() (or raised before reaching it) must not leak a slot
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded MySQL connection pool.
+
+    - `size` connections are kept idle between requests; up to
+      `max_overflow` more are opened under burst and closed when returned.
+    - Idle connections past `recycle` / `idle_timeout` are replaced.
+    - With `pre_ping`, a connection that sat idle is pinged before it is
+      handed out (and replaced if dead), so a MySQL restart or wait_timeout does not
+      surface as a 500 on the next request.
+    - The pool remembers the pid that created it; in a forked worker
+      (gunicorn --preload etc.) the inherited sockets are abandoned and the
+      pool starts fresh instead of sharing them with the parent.
+    """
+
+    def __init__(self, config, size=POOL_SIZE, max_overflow=POOL_MAX_OVERFLOW,
+                 timeout=POOL_TIMEOUT, recycle=POOL_RECYCLE,
+                 idle_timeout=POOL_IDLE_TIMEOUT, pre_ping=POOL_PRE_PING,
+                 ping_interval=POOL_PING_INTERVAL):
+        self.config = config
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+        self.ping_interval = ping_interval
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()   # (raw, created_at, returned_at)
+        self._open = 0         # connections currently alive (idle + in use)
+        self._in_use = 0
+        self._stats = {
+            "checkouts": 0,
+            "connects": 0,
+            "recycled": 0,
+            "ping_failures": 0,
+            "timeouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            # Never close the parent's sockets from the child: just forget them
+            self._reset()
+
+    def _connect(self):
+        raw = mysql.connector.connect(**self.config)
+        self._stats["connects"] += 1
+        return raw
+
+    @staticmethod
+    def _discard(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, raw, created_at, returned_at, now):
+        if self.recycle and now - created_at > self.recycle:
+            self._stats["recycled"] += 1
+            return False
+        if self.idle_timeout and now - returned_at > self.idle_timeout:
+            self._stats["recycled"] += 1
+            return False
+        if self.pre_ping and now - returned_at > self.ping_interval:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._stats["ping_failures"] += 1
+                return False
+        return True
+
+    def connect(self):
+        """Check out a connection, blocking up to `timeout` seconds."""
+        self._check_fork()
+        start = time.monotonic()
+        deadline = start + self.timeout
+
+        with self._cond:
+            while not self._idle and self._open >= self.size + self.max_overflow:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"No database connection available within {self.timeout}s "
+                        f"(size={self.size}, overflow={self.max_overflow})"
+                    )
+                self._cond.wait(remaining)
+
+            if self._idle:
+                raw, created_at, returned_at = self._idle.pop()
+            else:
+                raw = None
+                created_at = None
+                returned_at = None
+            # Reserve the slot before doing network I/O outside the lock
+            self._in_use += 1
+            if raw is None:
+                self._open += 1
+
+        now = time.monotonic()
+        if raw is not None and not self._is_usable(raw, created_at, returned_at, now):
+            self._discard(raw)
+            raw = None
+
+        if raw is None:
+            try:
+                raw = self._connect()
+            except Exception:
+                with self._cond:
+                    self._in_use -= 1
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+            created_at = time.monotonic()
+
+        waited = time.monotonic() - start
+        with self._cond:
+            self._stats["checkouts"] += 1
+            self._stats["wait_time_total"] += waited
+            self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+        if _query_hooks:
+            _notify_query(None, None, waited, "checkout")
+        return PooledConnection(self, raw, created_at)
+
+    def _release(self, raw, created_at):
+        if self._pid != os.getpid():
+            return
+
+        keep = True
+        try:
+            if raw.unread_result:
+                keep = False
+            elif raw.in_transaction:
+                # Drop whatever the route left open (early `return` before commit, or
+                # the REPEATABLE READ snapshot of a plain SELECT) so the next
+                # checkout starts from a clean, current view.
+                raw.rollback()
+        except Exception:
+            # Unread results, broken socket, ... not safe to reuse
+            keep = False
+
+        with self._cond:
+            self._in_use -= 1
+            if keep and len(self._idle) < self.size:
+                self._idle.append((raw, created_at, time.monotonic()))
+                raw = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._discard(raw)
+
+    def dispose(self):
+        """Close every idle connection (in-use ones are closed when returned)."""
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+            self._open -= len(idle)
+        for raw, _, _ in idle:
+            self._discard(raw)
+
+    def stats(self):
+        self._check_fork()
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+            })
+        checkouts = stats["checkouts"] or 1
+        stats["wait_time_avg"] = stats["wait_time_total"] / checkouts
+        return stats
+
+
+def replica_config(spec):
+    """DB_CONFIG for one DB_REPLICAS entry ("host" or "host:port")."""
+    host, _, port = spec.partition(":")
+    return dict(DB_CONFIG, host=host, port=int(port or DB_CONFIG["port"]))
+
+
+def replication_lag(cursor):
+    """
+    Seconds this server is behind its source, from SHOW REPLICA STATUS
+    (SHOW SLAVE STATUS before MySQL 8.0.22). None if replication is not
+    running; raises if the server is not a replica at all.
+    """
+    try:
+        cursor.execute("SHOW REPLICA STATUS")
+    except mysql.connector.Error:
+        cursor.execute("SHOW SLAVE STATUS")
+    status = cursor.fetchone()
+    if status is None:
+        raise RuntimeError("not configured as a replica")
+    if "Seconds_Behind_Source" in status:
+        return status["Seconds_Behind_Source"]
+    return status["Seconds_Behind_Master"]
+
+
+class Replica:
+    """
+    One read replica: its own pool plus the health the monitor last saw.
+    A replica starts out unhealthy and only takes reads once a check has
+    found it replicating within REPLICA_MAX_LAG.
+    """
+
+    def __init__(self, spec, max_lag=REPLICA_MAX_LAG):
+        self.name = spec
+        self.pool = ConnectionPool(replica_config(spec))
+        self.max_lag = max_lag
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+
+    def check(self):
+        conn = None
+        try:
+            conn = self.pool.connect()
+            # Raw cursor: health checks are not request queries
+            cursor = conn._raw.cursor(dictionary=True)
+            try:
+                lag = replication_lag(cursor)
+            finally:
+                cursor.close()
+            if lag is None:
+                self.mark_down("replication stopped", lag)
+            elif lag > self.max_lag:
+                self.mark_down(f"lag {lag}s over {self.max_lag}s", lag)
+            else:
+                if not self.healthy:
+                    log.info("Replica %s is healthy (lag %ss)", self.name, lag)
+                self.healthy, self.lag, self.error = True, lag, None
+        except Exception as e:
+            self.mark_down(str(e))
+        finally:
+            self.checked_at = time.time()
+            if conn is not None:
+                conn.close()
+
+    def mark_down(self, reason, lag=None):
+        if self.healthy:
+            log.warning("Dropping replica %s: %s", self.name, reason)
+        self.healthy, self.lag, self.error = False, lag, reason
+
+    def status(self):
+        return {
+            "replica": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "checked_at": self.checked_at,
+            **self.pool.stats(),
+        }
+
+
+pool = ConnectionPool(DB_CONFIG)
+replicas = [Replica(spec) for spec in DB_REPLICAS]
+
+_next_replica = itertools.count()
+_read_stats = {"primary": 0, "replica": 0, "fallbacks": 0}
+_monitor = {"pid": None}
+_monitor_lock = threading.Lock()
+
+
+def _check_replicas():
+    while True:
+        for replica in replicas:
+            replica.check()
+        time.sleep(REPLICA_CHECK_INTERVAL)
+
+
+def ensure_replica_monitor():
+    """Start the replica health-check thread once per process (again after a fork)."""
+    pid = os.getpid()
+    if not replicas or _monitor["pid"] == pid:
+        return
+    with _monitor_lock:
+        if _monitor["pid"] == pid:
+            return
+        threading.Thread(target=_check_replicas, name="replica-monitor", daemon=True).start()
+        _monitor["pid"] = pid
+
 
 def get_db_connection():
-    """Establishes and returns a connection to the MySQL database."""
-    connection = mysql.connector.connect(
-        host='localhost',
-        user='root',
-        password='root',
-        database='support_desk')
-    return connection
+    """Returns a pooled connection to the MySQL database; close() gives it back to the pool."""
+    return pool.connect()
+
+
+def get_read_connection():
+    """
+    Pooled connection for read-only queries: a healthy replica (round
+    robin), or the primary when no replica is healthy, when an
+    on_read_routing handler asks for it, or when the replica is
+    unreachable. Anything written on this connection may be lost, and
+    what it reads may be up to REPLICA_MAX_LAG seconds old.
+    """
+    if replicas and not _primary_required():
+        ensure_replica_monitor()
+        healthy = [replica for replica in replicas if replica.healthy]
+        if healthy:
+            replica = healthy[next(_next_replica) % len(healthy)]
+            try:
+                conn = replica.pool.connect()
+                _read_stats["replica"] += 1
+                return conn
+            except PoolTimeout:
+                _read_stats["fallbacks"] += 1  # busy, not broken
+            except Exception as e:
+                replica.mark_down(str(e))
+                _read_stats["fallbacks"] += 1
+    _read_stats["primary"] += 1
+    return pool.connect()
+
+
+def pool_stats():
+    """Snapshot of pool usage: open / in-use / idle counts and checkout wait times."""
+    return pool.stats()
+
 
+def replica_stats():
+    """Reads served per target plus each replica's health, lag and pool usage."""
+    return {"reads": dict(_read_stats), "replicas": [replica.status() for replica in replicas]}
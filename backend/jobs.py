@@ -0,0 +1,343 @@
+# jobs.py
+"""
+Background jobs for request side effects, on a Redis stream.
+
+Write routes used to make several Redis round trips after committing
+(dashboard counters, cache invalidation), each one a chance to add
+latency or log an error on the write path. They now call enqueue()
+once: a single pipeline that bumps the collection versions (kept
+inline, so an ETag never outlives the write) and XADDs the jobs.
+
+Workers read the stream through the JOB_GROUP consumer group, up to
+JOB_BATCH_SIZE entries at a time, and hand each job type's payloads to
+its handler in one call, so fifty counter updates become one HINCRBY
+transaction. A failed batch is retried per job with exponential backoff
+(JOB_RETRY_BASE * 2^attempt, capped at JOB_RETRY_MAX) through the
+JOB_DELAYED sorted set; after JOB_MAX_ATTEMPTS it is moved to the
+JOB_DEAD stream with its error. Entries a crashed worker had read but
+not acknowledged are reclaimed after JOB_CLAIM_IDLE seconds. Delivery is
+at least once: handlers must tolerate the odd repeat (the counters are
+reconciled by dashboard_counters.py anyway).
+
+The stream is never trimmed: entries are deleted once acknowledged, so
+what it holds is the backlog (jobs_pending{state="queued"} on /metrics),
+and a MAXLEN would drop jobs nobody had run yet.
+
+Every web process runs a worker thread unless JOB_WORKER_IN_PROCESS=0;
+dedicated workers, and the dead-letter tools, run from the command line:
+
+    python jobs.py                 # work until interrupted
+    python jobs.py --dead          # list dead-lettered jobs
+    python jobs.py --requeue-dead  # move them back onto the queue
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+
+from redis.exceptions import ResponseError
+
+import json_codec
+from collection_versions import queue_bump
+from redis_client import redis_client
+
+JOB_STREAM = "jobs:stream"
+JOB_GROUP = "workers"
+JOB_DELAYED = "jobs:delayed"      # sorted set: encoded job -> due time
+JOB_DEAD = "jobs:dead"
+
+JOB_BATCH_SIZE = int(os.getenv("JOB_BATCH_SIZE", "100"))
+JOB_BLOCK_MS = int(os.getenv("JOB_BLOCK_MS", "1000"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE = float(os.getenv("JOB_RETRY_BASE", "1"))
+JOB_RETRY_MAX = float(os.getenv("JOB_RETRY_MAX", "60"))
+JOB_CLAIM_IDLE = float(os.getenv("JOB_CLAIM_IDLE", "30"))
+JOB_DEAD_MAXLEN = int(os.getenv("JOB_DEAD_MAXLEN", "10000"))
+JOB_WORKER_IN_PROCESS = os.getenv("JOB_WORKER_IN_PROCESS", "1") == "1"
+
+# Modules whose @job_handler functions a worker must have registered
+JOB_MODULES = ("dashboard_counters",)
+
+# Move due retries back onto the stream, atomically across workers
+PROMOTE_SCRIPT = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, job in ipairs(due) do
+    redis.call('XADD', KEYS[2], '*', 'job', job)
+    redis.call('ZREM', KEYS[1], job)
+end
+return #due
+"""
+
+log = logging.getLogger(__name__)
+
+_handlers = {}
+_promote = redis_client.register_script(PROMOTE_SCRIPT)
+_worker = {"pid": None}
+_worker_lock = threading.Lock()
+
+
+def job_handler(name, ids=False):
+    """
+    Register handler(payloads) for jobs called `name`. It receives the
+    payloads of every such job in a batch, oldest first; raising retries
+    all of them. With ids=True it receives (job_id, payload) pairs, job_id
+    being the stream id the job was first queued under (retries keep it),
+    comparable with stream_position() through id_key().
+    """
+    def decorator(handler):
+        _handlers[name] = (handler, ids)
+        return handler
+    return decorator
+
+
+# --- enqueueing (request side) -------------------------------------------------
+
+def id_key(entry_id):
+    """Sort key for a stream id ("<ms>-<seq>")."""
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def stream_position():
+    """
+    Id of the newest job ever added to the stream ("0-0" if none): every
+    job with an id up to it was queued, so its write committed, before
+    this call.
+    """
+    try:
+        return redis_client.xinfo_stream(JOB_STREAM)["last-generated-id"]
+    except ResponseError:
+        return "0-0"  # no stream yet
+
+
+def encode_job(name, payload, attempt=0, job_id=None):
+    job = {"name": name, "payload": payload, "attempt": attempt}
+    if job_id:
+        job["id"] = job_id  # keeps retries of identical jobs distinct in JOB_DELAYED
+    return json_codec.dumps(job)
+
+
+def queue_jobs(pipe, jobs):
+    """XADD (name, payload[, attempt, job_id]) jobs on `pipe`; None entries are skipped."""
+    for job in jobs:
+        if job is not None:
+            pipe.xadd(JOB_STREAM, {"job": encode_job(*job)})
+
+
+def enqueue(*jobs, bump=()):
+    """
+    Bump the `bump` collection versions and queue `jobs` ((name, payload)
+    tuples, or None) in one round trip. Call after committing; never
+    raises, the write has already happened.
+    """
+    if JOB_WORKER_IN_PROCESS:
+        ensure_worker()
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        queue_bump(pipe, bump)
+        queue_jobs(pipe, jobs)
+        pipe.execute()
+    except Exception:
+        log.exception("Failed to enqueue jobs %s", [job[0] for job in jobs if job])
+
+
+# --- working -------------------------------------------------------------------
+
+def ensure_group():
+    try:
+        redis_client.xgroup_create(JOB_STREAM, JOB_GROUP, id="0", mkstream=True)
+    except Exception as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+def retry_delay(attempt):
+    return min(JOB_RETRY_MAX, JOB_RETRY_BASE * 2 ** attempt)
+
+
+def _fail(pipe, entry_id, job, error):
+    attempt = job["attempt"] + 1
+    encoded = encode_job(job["name"], job["payload"], attempt, job.get("id", entry_id))
+    if attempt >= JOB_MAX_ATTEMPTS:
+        log.error("Job %s failed %d times, dead-lettered: %s", job["name"], attempt, error)
+        pipe.xadd(JOB_DEAD, {"job": encoded, "error": error, "failed_at": time.time()},
+                  maxlen=JOB_DEAD_MAXLEN, approximate=True)
+    else:
+        pipe.zadd(JOB_DELAYED, {encoded: time.time() + retry_delay(attempt)})
+
+
+def run_batch(entries):
+    """
+    Run stream entries [(id, {"job": ...}), ...]: one handler call per job
+    name, then acknowledge everything, scheduling retries or dead-letters
+    for the jobs whose handler failed. Returns the number of failed jobs.
+    """
+    by_name = defaultdict(list)
+    pipe = redis_client.pipeline(transaction=True)
+    for entry_id, fields in entries:
+        if fields is None:
+            continue  # deleted while pending; nothing to run, acknowledged below
+        try:
+            job = json_codec.loads(fields["job"])
+        except Exception as e:
+            pipe.xadd(JOB_DEAD, {"job": fields.get("job", ""), "error": f"undecodable: {e}",
+                                 "failed_at": time.time()}, maxlen=JOB_DEAD_MAXLEN, approximate=True)
+            continue
+        by_name[job["name"]].append((entry_id, job))
+
+    failed = 0
+    for name, jobs in by_name.items():
+        handler, ids = _handlers.get(name, (None, False))
+        try:
+            if handler is None:
+                raise LookupError(f"no handler for job {name!r}")
+            if ids:
+                handler([(job.get("id", entry_id), job["payload"]) for entry_id, job in jobs])
+            else:
+                handler([job["payload"] for _, job in jobs])
+        except Exception as e:
+            log.warning("Job batch %s (%d jobs) failed", name, len(jobs), exc_info=True)
+            failed += len(jobs)
+            for entry_id, job in jobs:
+                _fail(pipe, entry_id, job, f"{type(e).__name__}: {e}")
+
+    ids = [entry_id for entry_id, _ in entries if entry_id is not None]
+    if ids:
+        pipe.xack(JOB_STREAM, JOB_GROUP, *ids)
+        pipe.xdel(JOB_STREAM, *ids)
+    pipe.execute()
+    return failed
+
+
+def ack_deleted(consumer, claimed):
+    """
+    Acknowledge claimed entries that were deleted from the stream. Redis
+    6.2 returns them from XAUTOCLAIM as nil, ids and all, and leaves them
+    pending, so they would be reclaimed forever: find them among this
+    consumer's pending entries, checking each is really gone.
+    """
+    live = {entry_id for entry_id, fields in claimed if fields is not None}
+    pending = redis_client.xpending_range(JOB_STREAM, JOB_GROUP, min="-", max="+",
+                                          count=JOB_BATCH_SIZE, consumername=consumer)
+    candidates = [p["message_id"] for p in pending if p["message_id"] not in live]
+    pipe = redis_client.pipeline(transaction=False)
+    for entry_id in candidates:
+        pipe.xrange(JOB_STREAM, min=entry_id, max=entry_id)
+    gone = [entry_id for entry_id, found in zip(candidates, pipe.execute()) if not found]
+    if gone:
+        log.warning("Acknowledging %d job(s) deleted before they ran", len(gone))
+        redis_client.xack(JOB_STREAM, JOB_GROUP, *gone)
+
+
+def work_once(consumer, block_ms=JOB_BLOCK_MS):
+    """Promote due retries, reclaim abandoned entries, run one batch. Returns jobs run."""
+    _promote(keys=[JOB_DELAYED, JOB_STREAM], args=[time.time(), JOB_BATCH_SIZE])
+    reply = redis_client.xautoclaim(
+        JOB_STREAM, JOB_GROUP, consumer, min_idle_time=int(JOB_CLAIM_IDLE * 1000), count=JOB_BATCH_SIZE
+    )
+    # [next id, entries] on Redis 6.2; 7.0 appends the ids of deleted entries
+    entries = reply[1]
+    if any(fields is None for _, fields in entries):
+        ack_deleted(consumer, entries)
+    if not entries:
+        streams = redis_client.xreadgroup(JOB_GROUP, consumer, {JOB_STREAM: ">"},
+                                          count=JOB_BATCH_SIZE, block=block_ms)
+        entries = streams[0][1] if streams else []
+    if entries:
+        run_batch(entries)
+    return len(entries)
+
+
+def consumer_name():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def work(consumer=None):
+    """Worker loop; survives Redis outages (and a flushed Redis) by backing off."""
+    consumer = consumer or consumer_name()
+    while True:
+        try:
+            ensure_group()
+            while True:
+                if not work_once(consumer):
+                    time.sleep(0.05)  # don't spin if the server returned before the block timeout
+        except Exception:
+            log.warning("Job worker error; retrying in 1s", exc_info=True)
+            time.sleep(1)
+
+
+def ensure_worker():
+    """Start an in-process worker thread once per process (again after a fork)."""
+    pid = os.getpid()
+    if _worker["pid"] == pid:
+        return
+    with _worker_lock:
+        if _worker["pid"] == pid:
+            return
+        threading.Thread(target=work, name="job-worker", daemon=True).start()
+        _worker["pid"] = pid
+
+
+def queue_stats():
+    """Jobs waiting on the stream, scheduled for retry, and dead-lettered."""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.xlen(JOB_STREAM)
+    pipe.zcard(JOB_DELAYED)
+    pipe.xlen(JOB_DEAD)
+    queued, delayed, dead = pipe.execute()
+    return {"queued": queued, "delayed": delayed, "dead": dead}
+
+
+# --- dead letters --------------------------------------------------------------
+
+def dead_letters(limit=100):
+    return [
+        {"id": entry_id, **json_codec.loads(fields["job"]), "error": fields.get("error"),
+         "failed_at": float(fields.get("failed_at", 0))}
+        for entry_id, fields in redis_client.xrevrange(JOB_DEAD, count=limit)
+    ]
+
+
+def requeue_dead():
+    """
+    Move every dead-lettered job back onto the stream with a fresh attempt
+    count (and its original id, see job_handler).
+    """
+    moved = 0
+    for entry_id, fields in redis_client.xrange(JOB_DEAD):
+        job = json_codec.loads(fields["job"])
+        pipe = redis_client.pipeline(transaction=True)
+        queue_jobs(pipe, [(job["name"], job["payload"], 0, job.get("id"))])
+        pipe.xdel(JOB_DEAD, entry_id)
+        pipe.execute()
+        moved += 1
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background job worker")
+    parser.add_argument("--dead", action="store_true", help="list dead-lettered jobs and exit")
+    parser.add_argument("--requeue-dead", action="store_true", help="requeue dead-lettered jobs and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.dead:
+        print(json.dumps(dead_letters(), indent=2, default=str))
+    elif args.requeue_dead:
+        print(f"requeued {requeue_dead()} job(s)")
+    else:
+        for module in JOB_MODULES:
+            importlib.import_module(module)
+        log.info("Job worker %s started", consumer_name())
+        work()
+
+
+if __name__ == "__main__":
+    # Handlers register with the importable `jobs` module, not __main__
+    import jobs
+    jobs.main()
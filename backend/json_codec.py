@@ -0,0 +1,79 @@
+# json_codec.py
+"""
+One JSON encoder for API responses, the Redis cache and NDJSON exports.
+
+JSON_ENCODER picks the backend: "orjson" (the default when it is
+installed) or "stdlib". Both produce the same documents: datetimes and
+dates as ISO 8601, Decimal and UUID as strings, keys in insertion
+order, UTF-8 output. orjson does the datetime formatting in C, which is
+most of the cost of a page of ticket rows under the stdlib encoder.
+
+FastJSONProvider plugs the codec into Flask (perf.TimedJSONProvider
+adds timing on top); request bodies are parsed with it too.
+"""
+import dataclasses
+import decimal
+import json
+import os
+import uuid
+from datetime import date, datetime, time
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(o):
+    """Types neither encoder handles natively (orjson also handles dates and dataclasses)."""
+    if isinstance(o, (datetime, date, time)):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def stdlib_dumps(obj):
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def orjson_dumps(obj):
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+# name: (dumps -> UTF-8 bytes, loads from str or bytes)
+BACKENDS = {"stdlib": (stdlib_dumps, json.loads)}
+if orjson:
+    BACKENDS["orjson"] = (orjson_dumps, orjson.loads)
+
+JSON_ENCODER = os.getenv("JSON_ENCODER", "orjson" if orjson else "stdlib")
+if JSON_ENCODER not in BACKENDS:
+    raise ValueError(f"JSON_ENCODER={JSON_ENCODER!r} is not available (have: {', '.join(BACKENDS)})")
+
+dumps, loads = BACKENDS[JSON_ENCODER]
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by this module's codec."""
+
+    mimetype = "application/json"
+
+    def encode(self, obj):
+        return dumps(obj)
+
+    def dumps(self, obj, **kwargs):
+        return self.encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        # Hand the encoded bytes straight to the response, no str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj), mimetype=self.mimetype)
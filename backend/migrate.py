@@ -0,0 +1,336 @@
+# migrate.py
+"""
+Versioned schema migrations for the support_desk database.
+
+Migrations live in migrations/ as NNNN_name.up.sql / NNNN_name.down.sql
+pairs and are applied in version order; applied versions (with a
+checksum of the up script) are recorded in schema_migrations. Index
+changes are written as online DDL (ALGORITHM=INPLACE, LOCK=NONE).
+
+MySQL DDL commits implicitly, so a migration that fails half way leaves
+its earlier statements applied. Re-running it skips indexes that already
+exist (and, going down, indexes that are already gone) rather than
+failing, so fixing the cause and running again is safe.
+
+A migration may also have a NNNN_name.check.sql: queries for the rows
+its DDL cannot be applied over (e.g. duplicates under a new UNIQUE
+index). They run first, and any row they return stops the migration,
+before any DDL, with a SchemaError listing the rows to fix.
+
+    python migrate.py status
+    python migrate.py up [--to 4]
+    python migrate.py down [--to 2 | --steps 1]
+    python migrate.py check     # exit 1 if a required index is missing
+
+check_schema() runs at app startup and refuses to start when an index
+the hot query paths rely on is missing. Set SCHEMA_CHECK=0 to skip it
+(the SQLite benchmark stand-in does).
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+
+import mysql.connector
+from mysql.connector import errorcode
+
+from db import get_db_connection
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "1") == "1"
+LOCK_NAME = "support_desk_migrations"
+LOCK_TIMEOUT = 60
+
+# (table, leading columns) the hot paths need an index to start with
+REQUIRED_INDEXES = [
+    ("tickets", ("status",)),                    # GET /tickets?status=
+    ("tickets", ("priority",)),                  # GET /tickets?priority=
+    ("tickets", ("assigned_to", "status")),      # agent views
+    ("tickets", ("customer_id", "created_at")),  # GET /tickets?customer_id=, customer delete
+    ("tickets", ("created_at",)),                # keyset ORDER BY created_at, id
+    ("customers", ("created_at",)),              # GET /customers ORDER BY created_at
+    ("users", ("email",)),                       # login
+    ("ticket_events", ("ticket_id", "occurred_at")),               # GET /tickets/<id>/events
+    ("ticket_events", ("assigned_to", "status", "occurred_at")),   # one agent's time to close
+    ("ticket_events", ("status", "occurred_at")),                  # GET /dashboard/resolution-times
+]
+
+# Re-running after a partial failure: these mean "already done"
+IDEMPOTENT_ERRORS = {
+    "up": {errorcode.ER_DUP_KEYNAME, errorcode.ER_DUP_FIELDNAME},
+    "down": {errorcode.ER_CANT_DROP_FIELD_OR_KEY, errorcode.ER_DUP_KEYNAME},
+}
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.(up|down|check)\.sql$")
+
+log = logging.getLogger(__name__)
+
+
+class SchemaError(Exception):
+    """The database is missing indexes (or migrations) the app depends on."""
+
+
+class Migration:
+    def __init__(self, version, name):
+        self.version = version
+        self.name = name
+        self.up_path = None
+        self.down_path = None
+        self.check_path = None
+
+    def read(self, direction):
+        with open(getattr(self, f"{direction}_path")) as f:
+            return f.read()
+
+    @property
+    def checksum(self):
+        return hashlib.sha256(self.read("up").encode()).hexdigest()
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """All migrations in version order; every version needs an up script."""
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version, name, direction = int(match.group(1)), match.group(2), match.group(3)
+        migration = migrations.setdefault(version, Migration(version, name))
+        if migration.name != name:
+            raise SchemaError(f"Migration {version} has two names: {migration.name}, {name}")
+        setattr(migration, f"{direction}_path", os.path.join(directory, filename))
+
+    for migration in migrations.values():
+        if not migration.up_path:
+            raise SchemaError(f"Migration {migration!r} has no up script")
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def split_statements(sql):
+    """Split a script on top-level semicolons, dropping -- comments."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
+
+
+def _ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def applied_versions(cursor):
+    """{version: checksum} of applied migrations."""
+    try:
+        cursor.execute("SELECT version, checksum FROM schema_migrations")
+    except mysql.connector.Error as e:
+        if e.errno != errorcode.ER_NO_SUCH_TABLE:
+            raise
+        return {}  # never migrated
+    return dict(cursor.fetchall())
+
+
+def _run(cursor, migration, direction):
+    for statement in split_statements(migration.read(direction)):
+        try:
+            cursor.execute(statement)
+        except mysql.connector.Error as e:
+            if e.errno not in IDEMPOTENT_ERRORS[direction]:
+                raise
+            log.info("%r %s: skipping, already applied: %s", migration, direction, e.msg)
+
+
+def preflight(cursor, migration, max_listed=20):
+    """Raise SchemaError if the migration's check queries return any rows."""
+    if not migration.check_path:
+        return
+    for statement in split_statements(migration.read("check")):
+        cursor.execute(statement)
+        rows = cursor.fetchall()
+        if rows:
+            columns = [d[0] for d in cursor.description]
+            listed = "; ".join(
+                ", ".join(f"{column}={value}" for column, value in zip(columns, row)) for row in rows[:max_listed]
+            )
+            more = f" (and {len(rows) - max_listed} more)" if len(rows) > max_listed else ""
+            raise SchemaError(
+                f"{migration!r} cannot be applied until these rows are fixed: {listed}{more}. "
+                f"See {os.path.basename(migration.check_path)}"
+            )
+
+
+class _MigrationLock:
+    """MySQL named lock so two deploys can't migrate at the same time."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def __enter__(self):
+        self.cursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if self.cursor.fetchone()[0] != 1:
+            raise SchemaError(f"Another migration is running (lock {LOCK_NAME!r})")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+        self.cursor.fetchone()
+
+
+def migrate_up(target=None):
+    """Apply pending migrations up to `target` (default: latest). Returns those applied."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    done = []
+    try:
+        with _MigrationLock(cursor):
+            _ensure_table(cursor)
+            applied = applied_versions(cursor)
+            for migration in discover():
+                if migration.version in applied or (target is not None and migration.version > target):
+                    continue
+                preflight(cursor, migration)
+                log.info("Applying %r", migration)
+                _run(cursor, migration, "up")
+                cursor.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                    (migration.version, migration.name, migration.checksum)
+                )
+                conn.commit()
+                done.append(migration)
+    finally:
+        cursor.close()
+        conn.close()
+    return done
+
+
+def migrate_down(target=None, steps=1):
+    """Revert applied migrations above `target`, or the last `steps` of them."""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    done = []
+    try:
+        with _MigrationLock(cursor):
+            applied = applied_versions(cursor)
+            to_revert = [m for m in reversed(discover()) if m.version in applied]
+            if target is not None:
+                to_revert = [m for m in to_revert if m.version > target]
+            else:
+                to_revert = to_revert[:steps]
+            for migration in to_revert:
+                if not migration.down_path:
+                    raise SchemaError(f"Migration {migration!r} has no down script")
+                log.info("Reverting %r", migration)
+                _run(cursor, migration, "down")
+                cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (migration.version,))
+                conn.commit()
+                done.append(migration)
+    finally:
+        cursor.close()
+        conn.close()
+    return done
+
+
+def existing_indexes(cursor):
+    """{table: [column tuple per index]} for the current database."""
+    cursor.execute("""
+        SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME
+        FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE()
+        ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
+    """)
+    indexes = {}
+    for table, index, column in cursor.fetchall():
+        indexes.setdefault(table, {}).setdefault(index, []).append(column)
+    return {table: [tuple(cols) for cols in by_name.values()] for table, by_name in indexes.items()}
+
+
+def missing_indexes(indexes):
+    """REQUIRED_INDEXES entries that no index starts with."""
+    return [
+        (table, columns) for table, columns in REQUIRED_INDEXES
+        if not any(index[:len(columns)] == columns for index in indexes.get(table, []))
+    ]
+
+
+def check_schema(force=False):
+    """
+    Raise SchemaError if a required index is missing; log pending
+    migrations. Called at startup; a no-op with SCHEMA_CHECK=0 unless forced.
+    """
+    if not (SCHEMA_CHECK or force):
+        return
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        missing = missing_indexes(existing_indexes(cursor))
+        applied = applied_versions(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+    pending = [m for m in discover() if m.version not in applied]
+    if pending:
+        log.warning("Pending migrations: %s (run: python migrate.py up)", ", ".join(map(repr, pending)))
+    if missing:
+        described = ", ".join(f"{table}({', '.join(columns)})" for table, columns in missing)
+        raise SchemaError(f"Missing required indexes: {described}. Run: python migrate.py up")
+
+
+def status():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        applied = applied_versions(cursor)
+        missing = missing_indexes(existing_indexes(cursor))
+    finally:
+        cursor.close()
+        conn.close()
+
+    for migration in discover():
+        state = "pending"
+        if migration.version in applied:
+            state = "applied"
+            if applied[migration.version] != migration.checksum:
+                state = "applied (script changed since)"
+        print(f"{migration!r:40} {state}")
+    for table, columns in missing:
+        print(f"missing index: {table}({', '.join(columns)})")
+    return missing
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="support_desk schema migrations")
+    sub = parser.add_subparsers(dest="command", required=True)
+    up = sub.add_parser("up", help="apply pending migrations")
+    up.add_argument("--to", type=int, help="stop after this version")
+    down = sub.add_parser("down", help="revert migrations")
+    down.add_argument("--to", type=int, help="revert everything above this version")
+    down.add_argument("--steps", type=int, default=1)
+    sub.add_parser("status", help="list migrations and missing indexes")
+    sub.add_parser("check", help="exit 1 if a required index is missing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "up":
+        applied = migrate_up(args.to)
+        print(f"applied {len(applied)} migration(s)")
+    elif args.command == "down":
+        reverted = migrate_down(args.to, args.steps)
+        print(f"reverted {len(reverted)} migration(s)")
+    elif args.command == "status":
+        status()
+    else:
+        try:
+            check_schema(force=True)
+        except SchemaError as e:
+            print(e, file=sys.stderr)
+            sys.exit(1)
+        print("schema ok")
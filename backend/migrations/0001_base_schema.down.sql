@@ -0,0 +1,4 @@
+-- Destroys all data. Only for tearing down scratch / test databases.
+DROP TABLE IF EXISTS tickets;
+DROP TABLE IF EXISTS customers;
+DROP TABLE IF EXISTS users;
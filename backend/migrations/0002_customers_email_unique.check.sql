@@ -0,0 +1,8 @@
+-- Customers sharing an email: uq_customers_email cannot be built over them
+-- (emails were never unique before this migration). Keep one customer per
+-- email, moving the others' tickets to it, then run the migration again.
+SELECT email, COUNT(*) AS customers, GROUP_CONCAT(id ORDER BY id) AS ids
+FROM customers
+GROUP BY email
+HAVING COUNT(*) > 1
+ORDER BY email;
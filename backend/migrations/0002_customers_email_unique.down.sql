@@ -0,0 +1 @@
+ALTER TABLE customers DROP INDEX uq_customers_email;
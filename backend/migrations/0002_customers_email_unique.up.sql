@@ -0,0 +1,3 @@
+-- Duplicate handling in POST /customers/import (skip / upsert) keys on email.
+ALTER TABLE customers
+    ADD UNIQUE INDEX uq_customers_email (email), ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,2 @@
+ALTER TABLE customers DROP INDEX idx_customers_name;
+ALTER TABLE customers DROP INDEX ft_customers_search;
@@ -0,0 +1,18 @@
+-- Customer search index (used by GET /customers/search and the
+-- customer_name filter on GET /customers).
+--
+-- The built-in ngram parser (MySQL 5.7.6+) tokenizes name, email and
+-- company into overlapping n-grams (ngram_token_size, default 2), so
+-- partial words, prefixes and typos still share n-grams with the stored
+-- value and MATCH ... AGAINST ranks the closest ones first.
+--
+-- InnoDB can't build a FULLTEXT index with LOCK=NONE: writes to
+-- customers block (reads don't) while it builds.
+ALTER TABLE customers
+    ADD FULLTEXT INDEX ft_customers_search (name, email, company) WITH PARSER ngram,
+    ALGORITHM=INPLACE, LOCK=SHARED;
+
+-- Search terms shorter than ngram_token_size produce no n-grams and fall
+-- back to an index-backed prefix match on name.
+ALTER TABLE customers
+    ADD INDEX idx_customers_name (name), ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,9 @@
+-- Users sharing an email: uq_users_email cannot be built over them, and
+-- login could not tell them apart. Keep one account per email (tickets
+-- assigned to the others are unassigned when they are deleted), then run
+-- the migration again.
+SELECT email, COUNT(*) AS users, GROUP_CONCAT(id ORDER BY id) AS ids
+FROM users
+GROUP BY email
+HAVING COUNT(*) > 1
+ORDER BY email;
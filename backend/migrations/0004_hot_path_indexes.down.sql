@@ -0,0 +1,13 @@
+ALTER TABLE users DROP INDEX uq_users_email;
+ALTER TABLE customers DROP INDEX idx_customers_created;
+
+-- The foreign keys need some index on their column; the composite ones may
+-- have replaced the implicit FK indexes, so put single-column ones back first.
+ALTER TABLE tickets ADD INDEX fk_tickets_customer (customer_id);
+ALTER TABLE tickets DROP INDEX idx_tickets_customer_created;
+ALTER TABLE tickets ADD INDEX fk_tickets_assignee (assigned_to);
+ALTER TABLE tickets DROP INDEX idx_tickets_assigned_status;
+
+ALTER TABLE tickets DROP INDEX idx_tickets_priority_created;
+ALTER TABLE tickets DROP INDEX idx_tickets_status_created;
+ALTER TABLE tickets DROP INDEX idx_tickets_created;
@@ -0,0 +1,32 @@
+-- Indexes behind the filter and ORDER BY paths of GET /tickets,
+-- GET /tickets/export, GET /customers and login. migrate.REQUIRED_INDEXES
+-- checks for them at startup.
+--
+-- One index per statement so a re-run skips the ones that already exist
+-- (duplicate key name) instead of failing the whole ALTER. ALGORITHM=INPLACE,
+-- LOCK=NONE builds them online: reads and writes continue during the build.
+--
+-- Every ticket list query orders by (created_at, id); InnoDB appends the
+-- primary key to secondary indexes, so (x, created_at) serves both the
+-- filter on x and the keyset ORDER BY without a filesort.
+
+ALTER TABLE tickets
+    ADD INDEX idx_tickets_created (created_at), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE tickets
+    ADD INDEX idx_tickets_status_created (status, created_at), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE tickets
+    ADD INDEX idx_tickets_priority_created (priority, created_at), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE tickets
+    ADD INDEX idx_tickets_assigned_status (assigned_to, status, created_at), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE tickets
+    ADD INDEX idx_tickets_customer_created (customer_id, created_at), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE customers
+    ADD INDEX idx_customers_created (created_at), ALGORITHM=INPLACE, LOCK=NONE;
+
+ALTER TABLE users
+    ADD UNIQUE INDEX uq_users_email (email), ALGORITHM=INPLACE, LOCK=NONE;
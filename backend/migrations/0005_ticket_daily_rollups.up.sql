@@ -0,0 +1,11 @@
+-- Daily opened / closed counts per priority for GET /dashboard/trends,
+-- kept up to date by the ticket routes (see ticket_rollups.py).
+-- Populate it for existing tickets with: python ticket_rollups.py
+
+CREATE TABLE IF NOT EXISTS ticket_daily_rollups (
+    day DATE NOT NULL,
+    priority ENUM('LOW', 'MEDIUM', 'HIGH') NOT NULL,
+    opened INT NOT NULL DEFAULT 0,
+    closed INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, priority)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,26 @@
+-- Append-only ticket history (status and assignment changes), written
+-- in batches by ticket_events.py's background writer.
+-- No foreign key to tickets: a deleted ticket keeps its history.
+
+CREATE TABLE IF NOT EXISTS ticket_events (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    ticket_id INT NOT NULL,
+    event_type ENUM('created', 'status', 'assigned', 'deleted') NOT NULL,
+    from_status ENUM('OPEN', 'IN_PROGRESS', 'CLOSED') NULL,
+    status ENUM('OPEN', 'IN_PROGRESS', 'CLOSED') NULL,
+    from_assigned_to INT NULL,
+    assigned_to INT NULL,
+    occurred_at TIMESTAMP(3) NOT NULL,
+    INDEX idx_ticket_events_ticket (ticket_id, occurred_at),
+    INDEX idx_ticket_events_agent_status (assigned_to, status, occurred_at),
+    INDEX idx_ticket_events_status (status, occurred_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- History from before the log, approximated from the tickets table:
+-- creation at created_at, and a close at updated_at for CLOSED tickets
+INSERT INTO ticket_events
+    (ticket_id, event_type, from_status, status, from_assigned_to, assigned_to, occurred_at)
+SELECT id, 'created', NULL, 'OPEN', NULL, assigned_to, created_at FROM tickets
+UNION ALL
+SELECT id, 'status', NULL, 'CLOSED', assigned_to, assigned_to, updated_at
+FROM tickets WHERE status = 'CLOSED';
@@ -0,0 +1 @@
+ALTER TABLE tickets DROP COLUMN closed_at;
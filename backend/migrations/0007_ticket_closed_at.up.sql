@@ -0,0 +1,13 @@
+-- When a ticket was closed, for the "closed" side of ticket_daily_rollups.
+-- updated_at moves on every later edit (ON UPDATE CURRENT_TIMESTAMP), so
+-- bucketing closes on it drifted whenever a closed ticket was touched again.
+-- Set once by the status route on the transition to CLOSED.
+--
+-- Existing closed tickets get their updated_at, the best record there is
+-- (assigning updated_at to itself stops ON UPDATE from firing). Rebuild the
+-- rollups afterwards so they are bucketed the same way: python ticket_rollups.py
+
+ALTER TABLE tickets ADD COLUMN closed_at TIMESTAMP NULL DEFAULT NULL AFTER updated_at;
+
+UPDATE tickets SET closed_at = updated_at, updated_at = updated_at
+WHERE status = 'CLOSED' AND closed_at IS NULL;
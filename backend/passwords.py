@@ -0,0 +1,129 @@
+# passwords.py
+"""
+bcrypt hashing off the request thread.
+
+Hashes and verifications run in a small process pool so a burst of
+logins burns CPU in the pool's processes instead of stalling every
+request served by the same worker. Both the pool's backlog and the number
+of concurrent /login + /register requests are bounded, so password work
+can't starve ticket traffic.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import wraps
+
+from flask import jsonify
+from passlib.hash import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_DEPTH = int(os.getenv("PASSWORD_HASH_QUEUE_DEPTH", "32"))  # jobs running + waiting, per process
+HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+AUTH_CONCURRENCY = int(os.getenv("AUTH_CONCURRENCY", "8"))  # concurrent /login + /register per process
+AUTH_WAIT = float(os.getenv("AUTH_CONCURRENCY_WAIT", "1"))
+
+hasher = bcrypt.using(rounds=BCRYPT_ROUNDS)
+
+
+class PasswordHasherBusy(Exception):
+    """The hashing backlog is full; the caller should shed the request."""
+
+
+def _hash(password, rounds):
+    return bcrypt.using(rounds=rounds).hash(password)
+
+
+def _verify(password, password_hash):
+    return bcrypt.verify(password, password_hash)
+
+
+_state = {"pid": None}
+_state_lock = threading.Lock()
+
+
+def _init():
+    """(Re)create the pool and semaphores once per process, including after a fork."""
+    pid = os.getpid()
+    if _state["pid"] == pid:
+        return _state
+    with _state_lock:
+        if _state["pid"] != pid:
+            # spawn, not fork: forking a threaded web worker can copy held locks
+            _state["pool"] = ProcessPoolExecutor(
+                max_workers=HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _state["queue_slots"] = threading.BoundedSemaphore(HASH_QUEUE_DEPTH)
+            _state["auth_slots"] = threading.BoundedSemaphore(AUTH_CONCURRENCY)
+            _state["pid"] = pid
+    return _state
+
+
+def _reset(pool):
+    """Drop a broken pool (a process died: OOM kill etc.) so the next call builds a new one."""
+    with _state_lock:
+        if _state.get("pool") is pool:
+            _state["pid"] = None
+    pool.shutdown(wait=False)
+
+
+def _submit(fn, *args):
+    state = _init()
+    pool, slots = state["pool"], state["queue_slots"]
+    if not slots.acquire(blocking=False):
+        raise PasswordHasherBusy("Password hashing queue is full")
+    try:
+        future = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        slots.release()
+        _reset(pool)
+        raise
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except BrokenProcessPool:
+        # The pool broke with this job queued or running
+        _reset(pool)
+        raise
+
+
+def _run(fn, *args):
+    """Run fn in the pool; if the pool is broken, rebuild it and try once more."""
+    try:
+        return _submit(fn, *args)
+    except BrokenProcessPool:
+        return _submit(fn, *args)
+
+
+def hash_password(password):
+    return _run(_hash, password, BCRYPT_ROUNDS)
+
+
+def verify_password(password, password_hash):
+    return _run(_verify, password, password_hash)
+
+
+def needs_rehash(password_hash):
+    """True when the stored hash was made with a different cost factor than BCRYPT_ROUNDS."""
+    return hasher.needs_update(password_hash)
+
+
+def auth_budget(f):
+    """Cap concurrent password-handling requests; excess callers get 429 instead of queueing."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        slots = _init()["auth_slots"]
+        if not slots.acquire(timeout=AUTH_WAIT):
+            return jsonify({"error": "Too many authentication requests, retry shortly"}), 429, {"Retry-After": "1"}
+        try:
+            return f(*args, **kwargs)
+        finally:
+            slots.release()
+
+    return wrapper
@@ -0,0 +1,414 @@
+# perf.py
+"""
+Per-request performance instrumentation.
+
+init_app(app) hooks pooled DB cursors (db.on_query), Redis round trips
+and cache lookups (redis_client.on_command / on_cache_lookup) and JSON
+encoding into per-request totals on `g`. Every response gets a
+Server-Timing header, and every request is folded into Prometheus
+histograms labelled by route.
+
+Each worker keeps its own deltas and flushes them into Redis hashes
+every METRICS_FLUSH_INTERVAL seconds, so GET /metrics (routes/metrics.py)
+reports the whole deployment rather than whichever worker answered the
+scrape. Pool and local-cache gauges are per process and labelled by pid;
+job queue depths are read from Redis at scrape time.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+import jobs
+import redis_client as cache
+from db import on_query, pool_stats, replica_stats
+from json_codec import FastJSONProvider
+
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+SERVER_TIMING = os.getenv("SERVER_TIMING", "1") == "1"
+METRICS_KEY_PREFIX = "metrics:"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+log = logging.getLogger(__name__)
+
+
+class Histogram:
+    """Prometheus histogram; buckets are stored non-cumulative and summed on render."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels, buckets):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._totals = {}    # label values -> [bucket counts..., +Inf count, sum]
+        self._pending = {}   # same shape, not yet flushed to Redis
+
+    def _empty(self):
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, label_values, value):
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            for series in (self._totals, self._pending):
+                entry = series.setdefault(label_values, self._empty())
+                entry[slot] += 1
+                entry[-1] += value
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def restore(self, pending):
+        """Put back deltas whose flush failed."""
+        with self._lock:
+            for label_values, values in pending.items():
+                entry = self._pending.setdefault(label_values, self._empty())
+                for i, v in enumerate(values):
+                    entry[i] += v
+
+    def flush_to(self, pipe, pending):
+        key = METRICS_KEY_PREFIX + self.name
+        for label_values, values in pending.items():
+            for slot, n in enumerate(values[:-1]):
+                if n:
+                    pipe.hincrby(key, json.dumps([*label_values, slot]), n)
+            pipe.hincrbyfloat(key, json.dumps([*label_values, "sum"]), values[-1])
+
+    def from_hash(self, data):
+        series = {}
+        for field, value in data.items():
+            *label_values, slot = json.loads(field)
+            entry = series.setdefault(tuple(label_values), self._empty())
+            if slot == "sum":
+                entry[-1] = float(value)
+            else:
+                entry[slot] = int(value)
+        return series
+
+    def render(self, series):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, values in sorted(series.items()):
+            labels = _labels(self.labels, label_values)
+            cumulative = 0
+            for bound, n in zip((*self.buckets, "+Inf"), values[:-1]):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {values[-1]}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return {k: list(v) for k, v in self._totals.items()}
+
+
+class Counter(Histogram):
+    """Monotonic counter sharing the Histogram flush / render plumbing."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels):
+        super().__init__(name, help_text, labels, ())
+
+    def inc(self, label_values, n=1):
+        if n:
+            self.observe(label_values, n)
+
+    def observe(self, label_values, value):
+        with self._lock:
+            for series in (self._totals, self._pending):
+                series[label_values] = [series.get(label_values, [0])[0] + value]
+
+    def _empty(self):
+        return [0]
+
+    def flush_to(self, pipe, pending):
+        key = METRICS_KEY_PREFIX + self.name
+        for label_values, (n,) in pending.items():
+            pipe.hincrby(key, json.dumps(list(label_values)), n)
+
+    def from_hash(self, data):
+        return {tuple(json.loads(field)): [int(value)] for field, value in data.items()}
+
+    def render(self, series):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, (n,) in sorted(series.items()):
+            lines.append(f"{self.name}{{{_labels(self.labels, label_values)}}} {n}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency by route.",
+    ("route", "method", "status"), LATENCY_BUCKETS)
+REQUEST_PHASE = Histogram(
+    "http_request_phase_seconds",
+    "Time per request spent in db, db_wait (pool checkout), redis, auth, serialize, validate and compress.",
+    ("route", "method", "phase"), LATENCY_BUCKETS)
+DB_QUERIES = Histogram(
+    "db_queries_per_request", "SQL statements executed per request.",
+    ("route", "method"), COUNT_BUCKETS)
+REDIS_COMMANDS = Histogram(
+    "redis_commands_per_request", "Redis round trips per request (a pipeline counts once).",
+    ("route", "method"), COUNT_BUCKETS)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "get_cached lookups by outcome (local, redis, miss).",
+    ("route", "method", "result"))
+
+METRICS = (REQUEST_DURATION, REQUEST_PHASE, DB_QUERIES, REDIS_COMMANDS, CACHE_LOOKUPS)
+
+
+# --- request-scoped totals ---------------------------------------------------
+
+def _current():
+    if has_request_context():
+        return g.get("perf")
+    return None
+
+
+def add_timing(name, seconds):
+    """Add `seconds` to the current request's `name` phase (no-op outside a request)."""
+    stats = _current()
+    if stats is not None:
+        stats["timings"][name] = stats["timings"].get(name, 0.0) + seconds
+
+
+@contextmanager
+def timer(name):
+    """Time a block as a named phase of the current request (Server-Timing + metrics)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_timing(name, time.perf_counter() - start)
+
+
+@on_query
+def _on_query(statement, params, seconds, phase):
+    stats = _current()
+    if stats is None:
+        return
+    if phase == "checkout":
+        stats["timings"]["db_wait"] = stats["timings"].get("db_wait", 0.0) + seconds
+        return
+    stats["timings"]["db"] = stats["timings"].get("db", 0.0) + seconds
+    if phase == "execute":
+        stats["db_queries"] += 1
+
+
+@cache.on_command
+def _on_redis_command(command, seconds):
+    stats = _current()
+    if stats is not None:
+        stats["redis_commands"] += 1
+        stats["timings"]["redis"] = stats["timings"].get("redis", 0.0) + seconds
+
+
+@cache.on_cache_lookup
+def _on_cache_lookup(key, tier):
+    stats = _current()
+    if stats is not None:
+        stats["cache"][tier or "miss"] += 1
+
+
+class TimedJSONProvider(FastJSONProvider):
+    """The app's JSON provider, with encoding time reported as the serialize phase."""
+
+    def encode(self, obj):
+        start = time.perf_counter()
+        try:
+            return super().encode(obj)
+        finally:
+            add_timing("serialize", time.perf_counter() - start)
+
+
+def server_timing(stats, total):
+    """Server-Timing header value (durations in ms)."""
+    timings = dict(stats["timings"])
+    if "auth_time" in g:
+        timings["auth"] = g.auth_time
+    parts = []
+    for name, seconds in timings.items():
+        entry = f"{name};dur={seconds * 1000:.2f}"
+        if name == "db":
+            entry += f';desc="{stats["db_queries"]} queries"'
+        elif name == "redis":
+            entry += f';desc="{stats["redis_commands"]} calls"'
+        parts.append(entry)
+    cache_lookups = stats["cache"]
+    if any(cache_lookups.values()):
+        parts.append('cache;desc="{local} local, {redis} redis, {miss} miss"'.format(**cache_lookups))
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+def _before_request():
+    ensure_flusher()
+    g.perf = {
+        "start": time.perf_counter(),
+        "db_queries": 0,
+        "redis_commands": 0,
+        "cache": {"local": 0, "redis": 0, "miss": 0},
+        "timings": {},
+    }
+
+
+def _after_request(response):
+    stats = g.get("perf")
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats["start"]
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    method = request.method
+
+    REQUEST_DURATION.observe((route, method, str(response.status_code)), total)
+    DB_QUERIES.observe((route, method), stats["db_queries"])
+    REDIS_COMMANDS.observe((route, method), stats["redis_commands"])
+    for phase, seconds in stats["timings"].items():
+        REQUEST_PHASE.observe((route, method, phase), seconds)
+    if "auth_time" in g:
+        REQUEST_PHASE.observe((route, method, "auth"), g.auth_time)
+    for result, n in stats["cache"].items():
+        CACHE_LOOKUPS.inc((route, method, result), n)
+
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing(stats, total)
+    return response
+
+
+def init_app(app):
+    app.json = TimedJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+
+# --- aggregation across workers ----------------------------------------------
+
+_flusher = {"pid": None}
+_flusher_lock = threading.Lock()
+
+
+def flush():
+    """Push this worker's pending deltas to Redis; kept for the next try if Redis is down."""
+    drained = [(metric, metric.drain()) for metric in METRICS]
+    pipe = cache.redis_client.pipeline(transaction=False)
+    for metric, pending in drained:
+        metric.flush_to(pipe, pending)
+    try:
+        pipe.execute()
+    except Exception:
+        for metric, pending in drained:
+            metric.restore(pending)
+        raise
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        try:
+            flush()
+        except Exception:
+            log.warning("Failed to flush request metrics to Redis", exc_info=True)
+
+
+def ensure_flusher():
+    """Start the flush thread once per process (again after a fork)."""
+    pid = os.getpid()
+    if _flusher["pid"] == pid:
+        return
+    with _flusher_lock:
+        if _flusher["pid"] == pid:
+            return
+        for metric in METRICS:
+            metric.drain()  # deltas inherited from the parent were the parent's to flush
+        threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+        _flusher["pid"] = pid
+
+
+def _process_gauges():
+    pid = str(os.getpid())
+    lines = []
+    pool = pool_stats()
+    for name, help_text, kind, value in (
+        ("db_pool_connections_open", "Open pooled MySQL connections.", "gauge", pool.get("open")),
+        ("db_pool_connections_in_use", "Checked-out MySQL connections.", "gauge", pool.get("in_use")),
+        ("db_pool_connections_idle", "Idle pooled MySQL connections.", "gauge", pool.get("idle")),
+        ("db_pool_checkouts_total", "Pool checkouts.", "counter", pool.get("checkouts")),
+        ("db_pool_timeouts_total", "Checkouts that hit DB_POOL_TIMEOUT.", "counter", pool.get("timeouts")),
+        ("db_pool_wait_seconds_total", "Time spent waiting for a pooled connection.", "counter",
+         pool.get("wait_time_total")),
+    ):
+        if value is not None:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f'{name}{{pid="{pid}"}} {value}']
+
+    reads = replica_stats()
+    lines += ["# HELP db_reads_total get_read_connection() checkouts by target (fallbacks: replica unusable).",
+              "# TYPE db_reads_total counter"]
+    lines += [f'db_reads_total{{pid="{pid}",target="{target}"}} {n}' for target, n in reads["reads"].items()]
+    if reads["replicas"]:
+        lines += ["# HELP db_replica_healthy Whether the replica is taking reads.",
+                  "# TYPE db_replica_healthy gauge"]
+        lines += [f'db_replica_healthy{{pid="{pid}",replica="{r["replica"]}"}} {int(r["healthy"])}'
+                  for r in reads["replicas"]]
+        lines += ["# HELP db_replica_lag_seconds Replication lag at the last health check.",
+                  "# TYPE db_replica_lag_seconds gauge"]
+        lines += [f'db_replica_lag_seconds{{pid="{pid}",replica="{r["replica"]}"}} {r["lag_seconds"]}'
+                  for r in reads["replicas"] if r["lag_seconds"] is not None]
+
+    stats = cache.cache_stats()
+    lines += ["# HELP cache_tier_lookups_total Cache lookups per tier in this process.",
+              "# TYPE cache_tier_lookups_total counter"]
+    for tier, counters in stats.items():
+        for result in ("hits", "misses"):
+            if result in counters:
+                lines.append(f'cache_tier_lookups_total{{pid="{pid}",tier="{tier}",result="{result}"}} '
+                             f'{counters[result]}')
+    return lines
+
+
+def _job_gauges():
+    lines = ["# HELP jobs_pending Background jobs queued, waiting to retry, and dead-lettered.",
+             "# TYPE jobs_pending gauge"]
+    lines += [f'jobs_pending{{state="{state}"}} {n}' for state, n in jobs.queue_stats().items()]
+    return lines
+
+
+def render_metrics():
+    """Prometheus text exposition: deployment-wide request metrics + this process's gauges."""
+    lines = []
+    try:
+        flush()
+        pipe = cache.redis_client.pipeline(transaction=False)
+        for metric in METRICS:
+            pipe.hgetall(METRICS_KEY_PREFIX + metric.name)
+        all_series = [metric.from_hash(data) for metric, data in zip(METRICS, pipe.execute())]
+    except Exception:
+        log.warning("Redis unavailable, serving this worker's metrics only", exc_info=True)
+        all_series = [metric.snapshot() for metric in METRICS]
+
+    for metric, series in zip(METRICS, all_series):
+        lines += metric.render(series)
+    lines += _process_gauges()
+    try:
+        lines += _job_gauges()
+    except Exception:
+        log.warning("Job queue depths unavailable", exc_info=True)
+    return "\n".join(lines) + "\n"
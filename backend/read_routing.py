@@ -0,0 +1,78 @@
+# read_routing.py
+"""
+Read-your-writes for replica reads (db.get_read_connection).
+
+After a successful POST / PUT / PATCH / DELETE the response carries a
+marker, the time until which this client's reads must stay on the
+primary (READ_YOUR_WRITES_WINDOW from now), both as the
+READ_PRIMARY_COOKIE cookie and the READ_PRIMARY_HEADER header. A request
+that sends an unexpired marker back, through the cookie or the header
+for clients that don't keep cookies, reads from the primary. So does
+any request that called pin_primary(); collection_versions does this
+for lists whose collection was written within the window.
+
+Without DB_REPLICAS every read goes to the primary anyway and no
+markers are issued.
+"""
+import math
+import time
+
+from flask import g, has_request_context, request
+
+from db import READ_YOUR_WRITES_WINDOW, on_read_routing, replicas
+
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def new_marker(now=None):
+    # Truncated, not rounded: rounding up could put a fresh marker past
+    # now + READ_YOUR_WRITES_WINDOW, where marker_valid() rejects it
+    until = math.floor(((now or time.time()) + READ_YOUR_WRITES_WINDOW) * 1000) / 1000
+    return f"{until:.3f}"
+
+
+def marker_valid(value, now=None):
+    """True for a marker that has not expired. Markers further out than one
+    window were not issued by us and are ignored."""
+    try:
+        until = float(value)
+    except (TypeError, ValueError):
+        return False
+    now = now or time.time()
+    return now < until <= now + READ_YOUR_WRITES_WINDOW
+
+
+def pin_primary():
+    """Send the rest of this request's reads to the primary."""
+    if has_request_context():
+        g.read_primary = True
+
+
+@on_read_routing
+def _read_primary():
+    return has_request_context() and g.get("read_primary", False)
+
+
+def _check_marker():
+    marker = request.cookies.get(READ_PRIMARY_COOKIE) or request.headers.get(READ_PRIMARY_HEADER)
+    if marker_valid(marker):
+        g.read_primary = True
+
+
+def _issue_marker(response):
+    if request.method in SAFE_METHODS or response.status_code >= 400:
+        return response
+    marker = new_marker()
+    response.set_cookie(READ_PRIMARY_COOKIE, marker, max_age=math.ceil(READ_YOUR_WRITES_WINDOW),
+                        httponly=True, samesite="Lax")
+    response.headers[READ_PRIMARY_HEADER] = marker
+    return response
+
+
+def init_app(app):
+    if not replicas:
+        return
+    app.before_request(_check_marker)
+    app.after_request(_issue_marker)
@@ -1,20 +1,380 @@
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
 import redis
-import json
 
-redis_client = redis.Redis(
-    host="localhost",
-    port=6379,
+import json_codec
+
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+
+log = logging.getLogger(__name__)
+
+_command_hooks = []
+_cache_hooks = []
+
+
+def on_command(handler):
+    """Register handler(command, seconds), called after every Redis round trip (a pipeline is one)."""
+    _command_hooks.append(handler)
+    return handler
+
+
+def on_cache_lookup(handler):
+    """Register handler(key, tier) for get_cached; tier is "local", "redis" or None on a miss."""
+    _cache_hooks.append(handler)
+    return handler
+
+
+def _notify(hooks, *args):
+    for handler in hooks:
+        try:
+            handler(*args)
+        except Exception:
+            pass  # instrumentation must never fail a cache call
+
+
+class _TimedPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error=True):
+        start = time.perf_counter()
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            _notify(_command_hooks, "PIPELINE", time.perf_counter() - start)
+
+
+class TimedRedis(redis.Redis):
+    """redis.Redis that reports each round trip to the on_command hooks."""
+
+    def execute_command(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            _notify(_command_hooks, args[0], time.perf_counter() - start)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return _TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+redis_client = TimedRedis(
+    host=REDIS_HOST,
+    port=REDIS_PORT,
     decode_responses=True
 )
 
+# In-process tier in front of Redis; the TTL bounds staleness if an
+# invalidation message is ever missed
+LOCAL_CACHE_SIZE = int(os.getenv("LOCAL_CACHE_SIZE", "1024"))
+LOCAL_CACHE_TTL = float(os.getenv("LOCAL_CACHE_TTL", "10"))
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    """Thread-safe, bounded LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return (hit, value)."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+
+local_cache = LocalCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TTL)
+_redis_stats = {"hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+_invalidation_handlers = []
+_reconnect_handlers = []
+_listener = {"pid": None, "origin": None}
+_listener_lock = threading.Lock()
+
+
+def on_invalidate(handler):
+    """Register handler(key), called in every process when any process invalidates `key`."""
+    _invalidation_handlers.append(handler)
+    return handler
+
+
+def on_reconnect(handler):
+    """
+    Register handler(), called when the invalidation listener loses its
+    subscription and again once it is back: messages in between are
+    lost, so anything a process caches on the strength of them must go.
+    """
+    _reconnect_handlers.append(handler)
+    return handler
+
+
+def _reset_local_caches():
+    local_cache.clear()
+    for handler in _reconnect_handlers:
+        try:
+            handler()
+        except Exception:
+            log.exception("Reconnect handler failed")
+
+
+def _dispatch_invalidation(key):
+    local_cache.delete(key)
+    for handler in _invalidation_handlers:
+        try:
+            handler(key)
+        except Exception:
+            log.exception("Invalidation handler failed for %s", key)
+
+
+def _listen(origin):
+    reconnecting = False
+    while True:
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+            if reconnecting:
+                # Entries cached while we were away missed their messages too
+                _reset_local_caches()
+            for message in pubsub.listen():
+                sender, _, key = message["data"].partition(" ")
+                if sender != origin:
+                    _dispatch_invalidation(key)
+        except Exception:
+            log.exception("Cache invalidation listener disconnected")
+        # Anything published while we were disconnected is lost: start cold
+        _reset_local_caches()
+        reconnecting = True
+        time.sleep(1)
+
+
+def ensure_invalidation_listener():
+    """Start the pub/sub listener once per process (again after a fork)."""
+    pid = os.getpid()
+    if _listener["pid"] == pid:
+        return
+    with _listener_lock:
+        if _listener["pid"] == pid:
+            return
+        local_cache.clear()
+        _listener["origin"] = f"{pid}-{uuid.uuid4().hex}"
+        threading.Thread(target=_listen, args=(_listener["origin"],),
+                         name="cache-invalidation", daemon=True).start()
+        _listener["pid"] = pid
+
+
+def invalidation_message(key):
+    """Payload for INVALIDATION_CHANNEL; tagged with our origin so we skip our own messages."""
+    ensure_invalidation_listener()
+    return f"{_listener['origin']} {key}"
+
+
+def publish_invalidation(key, pipe=None):
+    """Tell every other process to drop `key` (queued on `pipe` if given)."""
+    target = pipe if pipe is not None else redis_client
+    target.publish(INVALIDATION_CHANNEL, invalidation_message(key))
+
+
+def from_redis(key, data):
+    """Decode a Redis GET of `key` into the local tier; None for a miss."""
+    if not data:
+        return None
+    value = json_codec.loads(data)
+    local_cache.set(key, value)
+    return value
+
+
+def queue_set_cached(pipe, key, value, ttl):
+    """Queue storing `value` under `key` and telling other processes, on a sync or async pipeline."""
+    pipe.setex(key, ttl, json_codec.dumps(value))
+    publish_invalidation(key, pipe)
+
+
+def queue_delete_cached(pipe, key):
+    pipe.delete(key)
+    publish_invalidation(key, pipe)
+
+
 def get_cached(key):
+    ensure_invalidation_listener()
+    hit, value = local_cache.get(key)
+    if hit:
+        _notify(_cache_hooks, key, "local")
+        return value
+
     data = redis_client.get(key)
-    if data:
-        return json.loads(data)
-    return None
+    with _stats_lock:
+        _redis_stats["hits" if data else "misses"] += 1
+    _notify(_cache_hooks, key, "redis" if data else None)
+    return from_redis(key, data)
+
 
 def set_cached(key, value, ttl=60):
-    redis_client.setex(key, ttl, json.dumps(value))  # used to set a string value for a specific key along with a timeout (expiration time) in seconds, all in a single, atomic operation.
+    pipe = redis_client.pipeline(transaction=False)
+    queue_set_cached(pipe, key, value, ttl)
+    pipe.execute()
+    local_cache.set(key, value, ttl)
+
 
 def delete_cached(key):
-    redis_client.delete(key)
\ No newline at end of file
+    local_cache.delete(key)
+    pipe = redis_client.pipeline(transaction=False)
+    queue_delete_cached(pipe, key)
+    pipe.execute()
+
+
+def cache_stats():
+    """Hit / miss / eviction counters for each cache tier in this process."""
+    with _stats_lock:
+        redis_stats = dict(_redis_stats)
+    return {"local": local_cache.stats(), "redis": redis_stats}
+
+
+# Compare-and-delete so a worker never releases a lock it no longer owns
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+_release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+
+
+def lock_key(key):
+    return f"lock:{key}"
+
+
+def lock_options(lock_timeout):
+    """SET options taking a cached_read refresh lock."""
+    return {"nx": True, "px": int(lock_timeout * 1000)}
+
+
+def cache_entry(value, soft_ttl, delta):
+    """What cached_read stores: the value, its soft expiry and how long computing it took."""
+    return {"value": value, "expires": time.time() + soft_ttl, "delta": delta}
+
+
+def serve_as_is(entry, beta):
+    """
+    Whether a reader returns a cached entry without refreshing it: before
+    its soft expiry, less a random head start (XFetch) that grows with the
+    entry's compute time and `beta`.
+    """
+    early = entry["delta"] * beta * -math.log(1.0 - random.random())
+    return time.time() + early < entry["expires"]
+
+
+def unexpired(entry):
+    return bool(entry) and time.time() < entry["expires"]
+
+
+def _refresh(key, compute, soft_ttl, hard_ttl):
+    start = time.time()
+    value = compute()
+    set_cached(key, cache_entry(value, soft_ttl, time.time() - start), hard_ttl)
+    return value
+
+
+def cached_read(key, compute, soft_ttl=30, hard_ttl=300, beta=1.0,
+                lock_timeout=10, wait_timeout=2.0):
+    """
+    Read-through cache with stampede protection.
+
+    - Fresh (younger than soft_ttl): returned as is, except that each reader
+      may volunteer to refresh early with a probability that rises as expiry
+      approaches and with how long `compute` took last time (XFetch,
+      tuned by `beta`), which spreads refreshes out instead of having them
+      all land at the same instant.
+    - Stale (past soft_ttl, before hard_ttl): one worker takes a Redis
+      lock and recomputes; everyone else keeps serving the stale value.
+    - Missing: one worker computes under the lock while the others poll
+      for its result for up to wait_timeout seconds before computing
+      themselves.
+
+    asgi/cache.py runs the same steps with awaits; the decisions are the
+    helpers above, shared by both.
+    """
+    lock = lock_key(key)
+    entry = get_cached(key)
+
+    if entry:
+        if serve_as_is(entry, beta):
+            return entry["value"]
+
+        token = uuid.uuid4().hex
+        if not redis_client.set(lock, token, **lock_options(lock_timeout)):
+            return entry["value"]  # someone else is refreshing
+        try:
+            return _refresh(key, compute, soft_ttl, hard_ttl)
+        finally:
+            _release_lock(keys=[lock], args=[token])
+
+    deadline = time.time() + wait_timeout
+    while True:
+        token = uuid.uuid4().hex
+        if redis_client.set(lock, token, **lock_options(lock_timeout)):
+            try:
+                # The previous holder may have finished between our read and the lock
+                entry = get_cached(key)
+                if unexpired(entry):
+                    return entry["value"]
+                return _refresh(key, compute, soft_ttl, hard_ttl)
+            finally:
+                _release_lock(keys=[lock], args=[token])
+
+        time.sleep(0.05)
+        entry = get_cached(key)
+        if entry:
+            return entry["value"]
+        if time.time() > deadline:
+            # Lock holder is slow or died; don't hang the request on it
+            return compute()
@@ -0,0 +1,92 @@
+from flask import Blueprint, request, jsonify
+from db import error_response
+from routes.auth_middleware import admin_required
+from slow_queries import get_slow_query, list_slow_queries, reset
+
+admin_bp = Blueprint("admin", __name__)
+
+SLOW_QUERY_SORTS = ("max", "total", "count", "avg")
+
+
+@admin_bp.route("/admin/slow-queries", methods=["GET"])
+@admin_required
+def slow_queries():
+    """
+    Slow query shapes, slowest first
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: sort
+        in: query
+        type: string
+        enum: [max, total, count, avg]
+        default: max
+      - name: limit
+        in: query
+        type: integer
+        default: 50
+    responses:
+      200:
+        description: One entry per normalized query shape, with EXPLAIN flags (full_scan, filesort, temporary)
+      400:
+        description: Invalid sort or limit
+    """
+    sort = request.args.get("sort", "max")
+    if sort not in SLOW_QUERY_SORTS:
+        return jsonify({"error": f"sort must be one of {', '.join(SLOW_QUERY_SORTS)}"}), 400
+    try:
+        limit = max(1, int(request.args.get("limit", 50)))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    try:
+        return jsonify(list_slow_queries(limit, sort)), 200
+    except Exception as e:
+        return error_response(e)
+
+
+@admin_bp.route("/admin/slow-queries/<fingerprint>", methods=["GET"])
+@admin_required
+def slow_query_detail(fingerprint):
+    """
+    One slow query shape with its EXPLAIN plan and recent parameter samples
+    ---
+    tags:
+      - Admin
+    parameters:
+      - name: fingerprint
+        in: path
+        type: string
+        required: true
+    responses:
+      200:
+        description: Shape, stats, EXPLAIN rows and samples
+      404:
+        description: Unknown fingerprint
+    """
+    try:
+        result = get_slow_query(fingerprint)
+    except Exception as e:
+        return error_response(e)
+    if not result:
+        return jsonify({"error": "Slow query not found"}), 404
+    return jsonify(result), 200
+
+
+@admin_bp.route("/admin/slow-queries", methods=["DELETE"])
+@admin_required
+def reset_slow_queries():
+    """
+    Clear the slow query log
+    ---
+    tags:
+      - Admin
+    responses:
+      200:
+        description: Number of shapes removed
+    """
+    try:
+        return jsonify({"removed": reset()}), 200
+    except Exception as e:
+        return error_response(e)
@@ -1,18 +1,53 @@
 from flask import Blueprint, request, jsonify
-from db import get_db_connection
-from passlib.hash import bcrypt
+from db import error_response, get_db_connection, get_read_connection, is_duplicate_key
+from dashboard_counters import workload_job
+from collection_versions import conditional_get
+from jobs import enqueue
+import ticket_events
+from passwords import (
+    PasswordHasherBusy, auth_budget, hash_password, needs_rehash, verify_password
+)
 from schemas.user import UserRegister, UserLogin
 from pydantic import ValidationError
 import jwt
 import datetime
+import logging
 import os
-from .auth_middleware import admin_required
+from .auth_middleware import admin_required, auth_required, bearer_token, revoke_token
 from dotenv import load_dotenv
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 
 auth_bp = Blueprint("auth", __name__)
+log = logging.getLogger(__name__)
+
+
+def rehash_password(user_id, password):
+    """
+    Best-effort upgrade of a valid login's hash to the current cost
+    factor. Never raises: the login has succeeded either way, and the
+    next one tries again.
+    """
+    conn = cursor = None
+    try:
+        new_hash = hash_password(password)
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET password_hash=%s WHERE id=%s", (new_hash, user_id))
+        conn.commit()
+    except PasswordHasherBusy:
+        pass  # expected under load; not worth a log line
+    except Exception:
+        log.exception("Password rehash failed for user %s", user_id)
+    finally:
+        if cursor is not None:
+            cursor.close()
+        if conn is not None:
+            conn.close()
+
+
 @auth_bp.route("/register", methods=["POST"])
+@auth_budget
 def register():
     """
     Register user
@@ -23,11 +58,12 @@ def register():
     try:
         data = UserRegister(**request.json)
 
+        # Hash before taking a DB connection so it isn't held during bcrypt
+        password_hash = hash_password(data.password)
+
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        password_hash = bcrypt.hash(data.password)
-
         cursor.execute("""
             INSERT INTO users (name, email, password_hash)
             VALUES (%s, %s, %s)
@@ -35,20 +71,30 @@ def register():
 
         conn.commit()
 
+        # New users default to the agent role
+        enqueue(workload_job(), bump=("users",))
+
         return jsonify({"message": "User created"}), 201
 
     except ValidationError as e:
         return jsonify({"error": e.errors()}), 400
 
+    except PasswordHasherBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        if is_duplicate_key(e):
+            return jsonify({"error": "A user with this email already exists"}), 409
+        return error_response(e)
 
     finally:
-        cursor.close()
-        conn.close()
+        if 'cursor' in locals():
+            cursor.close()
+            conn.close()
 
 
 @auth_bp.route("/login", methods=["POST"])
+@auth_budget
 def login():
     """
     Login user
@@ -65,9 +111,17 @@ def login():
         cursor.execute("SELECT * FROM users WHERE email=%s", (data.email,))
         user = cursor.fetchone()
 
-        if not user or not bcrypt.verify(data.password, user["password_hash"]):
+        # Don't hold a pooled connection while bcrypt runs
+        cursor.close()
+        conn.close()
+
+        if not user or not verify_password(data.password, user["password_hash"]):
             return jsonify({"error": "Invalid credentials"}), 401
 
+        # Cost factor changed since this hash was made: upgrade it transparently
+        if needs_rehash(user["password_hash"]):
+            rehash_password(user["id"], data.password)
+
         token = jwt.encode(
             {
                 "id": user["id"],
@@ -87,14 +141,36 @@ def login():
     except ValidationError as e:
         return jsonify({"error": e.errors()}), 400
 
+    except PasswordHasherBusy as e:
+        return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
     finally:
-        cursor.close()
-        conn.close()
+        if 'cursor' in locals():
+            cursor.close()
+            conn.close()
+
+@auth_bp.route("/logout", methods=["POST"])
+@auth_required
+def logout():
+    """
+    Logout (revoke the current token in every worker)
+    ---
+    tags:
+      - Auth
+    responses:
+      200:
+        description: Token revoked
+      401:
+        description: Missing or invalid token
+    """
+    revoke_token(bearer_token())
+    return jsonify({"message": "Logged out"}), 200
 
 @auth_bp.route("/users", methods=["GET"])
+@conditional_get("users")
 def get_users():
     """
     Get users (optionally filter by role)
@@ -112,7 +188,7 @@ def get_users():
     """
     role = request.args.get("role")
 
-    conn = get_db_connection()
+    conn = get_read_connection()
     cursor = conn.cursor(dictionary=True)
 
     if role:
@@ -136,15 +212,26 @@ def delete_user(id):
         conn = get_db_connection()
         cursor = conn.cursor()
 
+        # Their tickets are unassigned by ON DELETE SET NULL; lock and read
+        # them first so the history records the unassignment
+        cursor.execute("SELECT id, status FROM tickets WHERE assigned_to=%s FOR UPDATE", (id,))
+        unassigned = cursor.fetchall()
+
         cursor.execute("DELETE FROM users WHERE id=%s", (id,))
         if cursor.rowcount == 0:
             return jsonify({"error": "User not found"}), 404
 
         conn.commit()
+        ticket_events.record(*(
+            ticket_events.changed(ticket_id, status, status, id, None) for ticket_id, status in unassigned
+        ))
+        # Their tickets are unassigned (ON DELETE SET NULL)
+        enqueue(workload_job(), bump=("users", "tickets"))
         return jsonify({"message": "User deleted"}), 200
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
     finally:
-        cursor.close()
-        conn.close()
+        if 'cursor' in locals():
+            cursor.close()
+            conn.close()
@@ -1,45 +1,149 @@
-from flask import request, jsonify
+from functools import wraps
+import hashlib
+import time
+from flask import request, jsonify, g
 import jwt
 import os
 from dotenv import load_dotenv
+from redis_client import (
+    LocalCache, redis_client, on_invalidate, on_reconnect,
+    publish_invalidation, ensure_invalidation_listener
+)
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 
-def auth_required(f):
-    def wrapper(*args, **kwargs):
-        auth = request.headers.get("Authorization")
-        if not auth:
-            return jsonify({"error": "Missing token"}), 401
+# Verified claims keyed by token digest. Revocations evict entries through
+# pub/sub; the TTL bounds how long a worker can miss one (listener down)
+# before it checks the revocation key again.
+# Only routes behind auth_required / admin_required (POST /logout and
+# /admin/*) authenticate at all. The ticket, customer and dashboard APIs,
+# and the whole ASGI app, are public, so this cache does nothing for them.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+TOKEN_CACHE_MAX_TTL = float(os.getenv("TOKEN_CACHE_MAX_TTL", "60"))
+TOKEN_KEY_PREFIX = "auth:token:"
+REVOKED_KEY_PREFIX = "auth:revoked:"
+
+token_cache = LocalCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_MAX_TTL)
+# Bumped on every revocation this process hears of (see verify_token)
+_revocations = {"seen": 0}
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+@on_invalidate
+def _evict_revoked(key):
+    if key.startswith(TOKEN_KEY_PREFIX):
+        _revocations["seen"] += 1
+        token_cache.delete(key[len(TOKEN_KEY_PREFIX):])
+
+
+@on_reconnect
+def _clear_tokens():
+    _revocations["seen"] += 1
+    token_cache.clear()
+
+
+def verify_token(token):
+    """
+    Return the token's claims, raising jwt.InvalidTokenError if it is
+    invalid, expired or revoked. Only the first request with a given
+    token pays for HMAC verification and the revocation lookup.
+    """
+    ensure_invalidation_listener()
+    digest = token_digest(token)
+
+    hit, claims = token_cache.get(digest)
+    if hit:
+        return claims
+
+    claims = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    revocations = _revocations["seen"]
+    if redis_client.exists(REVOKED_KEY_PREFIX + digest):
+        raise jwt.InvalidTokenError("Token revoked")
+
+    ttl = TOKEN_CACHE_MAX_TTL
+    if "exp" in claims:
+        ttl = min(ttl, claims["exp"] - time.time())
+    # A revocation heard since the EXISTS may be this token's: its eviction
+    # already ran, so caching now would outlive it
+    if ttl > 0 and _revocations["seen"] == revocations:
+        token_cache.set(digest, claims, ttl)
+    return claims
+
 
-        token = auth.replace("Bearer ", "")
+def revoke_token(token):
+    """Reject `token` from now on, in every worker, until it would have expired anyway."""
+    digest = token_digest(token)
+    try:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except jwt.InvalidTokenError:
+        return  # already unusable
+
+    _revocations["seen"] += 1
+    token_cache.delete(digest)
+    pipe = redis_client.pipeline(transaction=False)
+    if "exp" in claims:
+        pipe.setex(REVOKED_KEY_PREFIX + digest, max(int(claims["exp"] - time.time()) + 1, 1), 1)
+    else:
+        pipe.set(REVOKED_KEY_PREFIX + digest, 1)  # never expires, so neither may its revocation
+    publish_invalidation(TOKEN_KEY_PREFIX + digest, pipe)
+    pipe.execute()
+
+
+def bearer_token():
+    auth = request.headers.get("Authorization")
+    if not auth:
+        return None
+    return auth.replace("Bearer ", "")
+
+
+def authenticate():
+    """
+    Authenticate the current request once and memoize the result on `g`.
+    Returns (claims, None) or (None, error_response).
+    """
+    if "auth_result" in g:
+        return g.auth_result
+
+    start = time.perf_counter()
+    token = bearer_token()
+    if not token:
+        result = (None, (jsonify({"error": "Missing token"}), 401))
+    else:
         try:
-            user = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            request.user = user
-        except:
-            return jsonify({"error": "Invalid or expired token"}), 401
+            result = (verify_token(token), None)
+        except jwt.InvalidTokenError:
+            result = (None, (jsonify({"error": "Invalid or expired token"}), 401))
+
+    # Picked up by the per-request metrics
+    g.auth_time = time.perf_counter() - start
+    g.auth_result = result
+    return result
 
+
+def auth_required(f):
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        user, error = authenticate()
+        if error:
+            return error
+        request.user = user
         return f(*args, **kwargs)
 
-    wrapper.__name__ = f.__name__
     return wrapper
 
 
 def admin_required(f):
+    @wraps(f)
     def wrapper(*args, **kwargs):
-        auth = request.headers.get("Authorization")
-        if not auth:
-            return jsonify({"error": "Missing token"}), 401
-
-        token = auth.replace("Bearer ", "")
-        try:
-            user = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            if user["role"] != "admin":
-                return jsonify({"error": "Admin only"}), 403
-            request.user = user
-        except:
-            return jsonify({"error": "Invalid or expired token"}), 401
-
+        user, error = authenticate()
+        if error:
+            return error
+        if user.get("role") != "admin":
+            return jsonify({"error": "Admin only"}), 403
+        request.user = user
         return f(*args, **kwargs)
 
-    wrapper.__name__ = f.__name__
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -1,9 +1,33 @@
-from flask import Blueprint, jsonify
-from db import get_db_connection
-from redis_client import get_cached, set_cached
+from flask import Blueprint, request, jsonify
+from dashboard_counters import (
+    read_counts, build_agent_workload, current_workload, AGENT_WORKLOAD_KEY
+)
+from redis_client import cached_read
+from ticket_events import read_resolution_times
+from ticket_rollups import parse_range, read_trends
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
+
+def build_summary():
+    # Counters are maintained incrementally by the ticket routes
+    # (see dashboard_counters.py), so this never scans the tickets table
+    return summary_from_counts(*read_counts())
+
+
+def summary_from_counts(status_counts, priority_counts):
+    return {
+        "by_status": [
+            {"status": status, "count": count}
+            for status, count in status_counts.items() if count > 0
+        ],
+        "by_priority": [
+            {"priority": priority, "count": count}
+            for priority, count in priority_counts.items() if count > 0
+        ]
+    }
+
+
 @dashboard_bp.route("/dashboard/summary", methods=["GET"])
 def dashboard_summary():
     """
@@ -15,40 +39,127 @@ def dashboard_summary():
       200:
         description: Ticket summary
     """
-    cache_key = "dashboard:summary"
-
-    # 1️⃣ Try cache
-    cached = get_cached(cache_key)
-    if cached:
-        return jsonify(cached), 200
-
-    # 2️⃣ Cache miss → compute
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-
-    cursor.execute("""
-        SELECT status, COUNT(*) as count
-        FROM tickets
-        GROUP BY status
-    """)
-    status_counts = cursor.fetchall()
-
-    cursor.execute("""
-        SELECT priority, COUNT(*) as count
-        FROM tickets
-        GROUP BY priority
-    """)
-    priority_counts = cursor.fetchall()
-
-    cursor.close()
-    conn.close()
-
-    summary = {
-        "by_status": status_counts,
-        "by_priority": priority_counts
-    }
-
-    # 3️⃣ Store in Redis (60 sec)
-    set_cached(cache_key, summary, ttl=60)
+    # Served stale for up to a minute while a single worker refreshes it;
+    # the refresh only falls back to MySQL on a counter cold start
+    summary = cached_read("dashboard:summary", build_summary, soft_ttl=5, hard_ttl=60)
 
     return jsonify(summary), 200
+
+
+@dashboard_bp.route("/dashboard/agents", methods=["GET"])
+def dashboard_agents():
+    """
+    Ticket workload per agent
+    ---
+    tags:
+      - Dashboard
+    responses:
+      200:
+        description: Open, in-progress and closed counts and the age of the oldest open ticket (seconds, null if none) for every agent
+    """
+    # Dropped by the ticket and user routes on every change that moves a
+    # count, so the soft TTL only bounds drift from writes made elsewhere
+    workload = cached_read(AGENT_WORKLOAD_KEY, build_agent_workload, soft_ttl=30, hard_ttl=300)
+
+    return jsonify(current_workload(workload)), 200
+
+
+@dashboard_bp.route("/dashboard/trends", methods=["GET"])
+def dashboard_trends():
+    """
+    Tickets opened and closed per period and priority
+    ---
+    tags:
+      - Dashboard
+    parameters:
+      - name: from
+        in: query
+        type: string
+        format: date
+        description: First day (default 29 days before `to`)
+      - name: to
+        in: query
+        type: string
+        format: date
+        description: Last day (default today)
+      - name: granularity
+        in: query
+        type: string
+        enum: [day, week, month]
+        default: day
+    responses:
+      200:
+        description: One zero-filled bucket per period with opened / closed counts by priority
+      400:
+        description: Invalid range or granularity
+    """
+    try:
+        start, end, granularity = parse_range(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Read from the daily rollup table: cost grows with the number of
+    # days in the range, not with the number of tickets
+    trends = cached_read(
+        f"dashboard:trends:{start}:{end}:{granularity}",
+        lambda: read_trends(start, end, granularity),
+        soft_ttl=60, hard_ttl=600
+    )
+    return jsonify(trends), 200
+
+
+def resolution_args(args):
+    """(start, end, agent_id) from the query args; raises ValueError on bad input."""
+    start, end, _ = parse_range(args)
+    agent_id = args.get("agent_id")
+    if agent_id is not None:
+        try:
+            agent_id = int(agent_id)
+        except ValueError:
+            raise ValueError("agent_id must be an integer")
+    return start, end, agent_id
+
+
+def resolution_key(start, end, agent_id):
+    return f"dashboard:resolution:{start}:{end}:{agent_id or 'all'}"
+
+
+@dashboard_bp.route("/dashboard/resolution-times", methods=["GET"])
+def dashboard_resolution_times():
+    """
+    Time to close per agent, from the ticket event log
+    ---
+    tags:
+      - Dashboard
+    parameters:
+      - name: from
+        in: query
+        type: string
+        format: date
+        description: First day a ticket was closed (default 29 days before `to`)
+      - name: to
+        in: query
+        type: string
+        format: date
+        description: Last day (default today)
+      - name: agent_id
+        in: query
+        type: integer
+        required: false
+    responses:
+      200:
+        description: Per agent, tickets closed in the range with mean and worst seconds from creation to close
+      400:
+        description: Invalid range or agent_id
+    """
+    try:
+        start, end, agent_id = resolution_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    resolution = cached_read(
+        resolution_key(start, end, agent_id),
+        lambda: read_resolution_times(start, end, agent_id),
+        soft_ttl=60, hard_ttl=600
+    )
+    return jsonify(resolution), 200
@@ -0,0 +1,20 @@
+from flask import Blueprint, Response
+from perf import render_metrics
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Prometheus metrics
+    ---
+    tags:
+      - Monitoring
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Request latency, per-phase time, DB queries and cache lookups per route, plus pool gauges
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
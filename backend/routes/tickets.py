@@ -1,11 +1,28 @@
-from flask import Blueprint, request, jsonify
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+
+from flask import Blueprint, Response, request, jsonify
 from pydantic import ValidationError
 from schemas.ticket import TicketCreate
-from db import get_db_connection
-from redis_client import delete_cached 
+from db import error_response, get_db_connection, get_read_connection
+from dashboard_counters import counters_job, workload_job
 from routes.auth_middleware import auth_required, admin_required
+import ticket_events
+import ticket_rollups
+import json_codec
+from collection_versions import conditional_get
+from jobs import enqueue
 
 tickets_bp = Blueprint("tickets", __name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BULK_TICKETS = 5000
+BULK_INSERT_CHUNK = 1000  # rows per multi-row INSERT, keeps packets well under max_allowed_packet
+
 @tickets_bp.route("/tickets", methods=["POST"])
 def create_ticket():
     """
@@ -49,6 +66,7 @@ def create_ticket():
     try:
         data = TicketCreate(**request.json)
 
+        # Primary, not a replica: the customer may have been created moments ago
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
@@ -73,11 +91,19 @@ def create_ticket():
             data.priority,
             data.assigned_to
         ))
+        # Before the rollup upsert, which resets the insert id to 0
+        ticket_id = cursor.lastrowid
+        ticket_rollups.apply_events(cursor, [ticket_rollups.opened(data.priority)])
 
         conn.commit()   #  ticket is now saved
+        ticket_events.record(ticket_events.created(ticket_id, data.assigned_to))
 
-        # INVALIDATE DASHBOARD CACHE (THIS IS THE LINE)
-        delete_cached("dashboard:summary")
+        # New tickets start OPEN (column default)
+        enqueue(
+            counters_job([(None, ("OPEN", data.priority))]),
+            workload_job(bool(data.assigned_to)),
+            bump=("tickets",)
+        )
 
         return jsonify({"message": "Ticket created"}), 201
 
@@ -85,17 +111,270 @@ def create_ticket():
         return jsonify({"error": e.errors()}), 400
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
+
+    finally:
+        if 'cursor' in locals():
+            cursor.close()
+            conn.close()
+
+BULK_INSERT_SQL = """
+    INSERT INTO tickets (customer_id, title, description, priority, assigned_to)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+# The status routes' UPDATE: closed_at is stamped on the transition to
+# CLOSED and kept by later CLOSED -> CLOSED updates (closed tickets cannot
+# be reopened, so any other status has none)
+SET_STATUS_SQL = """
+    UPDATE tickets
+    SET status = %s, assigned_to = %s,
+        closed_at = CASE WHEN %s = 'CLOSED' THEN COALESCE(closed_at, CURRENT_TIMESTAMP) END
+    WHERE id = %s
+"""
+
+
+def validate_bulk_tickets(items):
+    """Validate each item; returns ([(index, TicketCreate)], [per-item errors])."""
+    valid = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise TypeError("Ticket must be an object")
+            valid.append((index, TicketCreate(**item)))
+        except ValidationError as e:
+            errors.append({"index": index, "error": e.errors()})
+        except TypeError as e:
+            errors.append({"index": index, "error": str(e)})
+    return valid, errors
+
+
+def with_known_customers(valid, existing, errors):
+    """Yield the tickets whose customer exists, recording an error for the rest."""
+    for index, data in valid:
+        if data.customer_id not in existing:
+            errors.append({"index": index, "error": "Customer not found"})
+            continue
+        yield data
+
+
+def bulk_row(data):
+    return (data.customer_id, data.title, data.description, data.priority, data.assigned_to)
+
+
+def multi_row_insert(chunk):
+    """
+    (sql, params) inserting a whole chunk of bulk_row()s as one
+    statement. A driver's executemany may split a batch, and only a
+    single INSERT with a known row count gets consecutive ids from InnoDB.
+    """
+    head, _, row = BULK_INSERT_SQL.partition("VALUES")
+    return head + "VALUES " + ", ".join([row.strip()] * len(chunk)), [v for values in chunk for v in values]
+
+
+def inserted_ids(cursor, chunk):
+    """The ids of a chunk just inserted by multi_row_insert(): LAST_INSERT_ID() is the first."""
+    if cursor.rowcount != len(chunk):
+        raise RuntimeError(f"Bulk insert wrote {cursor.rowcount} of {len(chunk)} tickets")
+    return range(cursor.lastrowid, cursor.lastrowid + len(chunk))
+
+
+@tickets_bp.route("/tickets/bulk", methods=["POST"])
+def create_tickets_bulk():
+    """
+    Create many tickets in one request
+    ---
+    tags:
+      - Tickets
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: array
+          items:
+            type: object
+            required:
+              - customer_id
+              - title
+              - priority
+            properties:
+              customer_id:
+                type: integer
+              title:
+                type: string
+              description:
+                type: string
+              priority:
+                type: string
+                enum: [LOW, MEDIUM, HIGH]
+              assigned_to:
+                type: integer
+    responses:
+      201:
+        description: Valid tickets created; invalid ones listed in errors by index
+      400:
+        description: Nothing valid to insert, or body is not a list
+      413:
+        description: Batch too large
+      500:
+        description: Internal server error (nothing was inserted)
+    """
+    try:
+        items = request.json
+        if isinstance(items, dict):
+            items = items.get("tickets")
+        if not isinstance(items, list):
+            return jsonify({"error": "Body must be a list of tickets"}), 400
+        if len(items) > MAX_BULK_TICKETS:
+            return jsonify({"error": f"At most {MAX_BULK_TICKETS} tickets per request"}), 413
+
+        # 1️⃣ Validate everything up front, remembering each item's position
+        valid, errors = validate_bulk_tickets(items)
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # 2️⃣ One existence check for every distinct customer in the batch
+        customer_ids = list({data.customer_id for _, data in valid})
+        existing = set()
+        if customer_ids:
+            placeholders = ", ".join(["%s"] * len(customer_ids))
+            cursor.execute(
+                f"SELECT id FROM customers WHERE id IN ({placeholders})",
+                tuple(customer_ids)
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+
+        created = list(with_known_customers(valid, existing, errors))
+        if not created:
+            return jsonify({"created": 0, "errors": sorted(errors, key=lambda e: e["index"])}), 400
+
+        # 3️⃣ Multi-row inserts, all in one transaction
+        rows = [bulk_row(data) for data in created]
+        ticket_ids = []
+        for start in range(0, len(rows), BULK_INSERT_CHUNK):
+            chunk = rows[start:start + BULK_INSERT_CHUNK]
+            cursor.execute(*multi_row_insert(chunk))
+            ticket_ids.extend(inserted_ids(cursor, chunk))
+        ticket_rollups.apply_events(cursor, [ticket_rollups.opened(data.priority) for data in created])
+
+        conn.commit()
+        ticket_events.record(*(
+            ticket_events.created(ticket_id, data.assigned_to)
+            for ticket_id, data in zip(ticket_ids, created)
+        ))
+
+        # 4️⃣ One counter update for the whole batch
+        enqueue(
+            counters_job((None, ("OPEN", data.priority)) for data in created),
+            workload_job(any(data.assigned_to for data in created)),
+            bump=("tickets",)
+        )
+
+        return jsonify({
+            "created": len(rows),
+            "errors": sorted(errors, key=lambda e: e["index"])
+        }), 201
+
+    except Exception as e:
+        # Nothing was committed; the pool rolls the transaction back on close
+        return error_response(e)
 
     finally:
         if 'cursor' in locals():
             cursor.close()
             conn.close()
 
+
+def encode_cursor(created_at, ticket_id):
+    """Opaque keyset cursor for the (created_at, id) position of the last row of a page."""
+    raw = json.dumps([created_at.isoformat(), ticket_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    padded = cursor + "=" * (-len(cursor) % 4)
+    created_at, ticket_id = json.loads(base64.urlsafe_b64decode(padded))
+    return datetime.fromisoformat(created_at), int(ticket_id)
+
+
+def ticket_filters(args):
+    """
+    Build the WHERE clause shared by the ticket list and export endpoints
+    from the query-string filters.
+    """
+    where = "WHERE 1=1"
+    params = []
+
+    for column in ("status", "priority", "customer_id", "assigned_to"):
+        value = args.get(column)
+        if value:
+            where += f" AND {column} = %s"
+            params.append(value)
+
+    ticket_id = args.get("ticket_id")
+    if ticket_id:
+        where += " AND id = %s"
+        params.append(ticket_id)
+
+    return where, params
+
+
+def page_query(args):
+    """
+    Build the keyset-paginated ticket query for these query-string args.
+    Returns (query, params, limit); raises ValueError on a bad limit or cursor.
+    """
+    try:
+        limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be positive")
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    where, params = ticket_filters(args)
+
+    after = args.get("after")
+    if after:
+        try:
+            after_created_at, after_id = decode_cursor(after)
+        except Exception:
+            raise ValueError("Invalid cursor")
+        # Seek past the last row of the previous page instead of OFFSET,
+        # so page N costs the same as page 1
+        where += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+        params.extend([after_created_at, after_created_at, after_id])
+
+    query = f"""
+        SELECT id, customer_id, title, priority, status, created_at, updated_at, assigned_to
+        FROM tickets
+        {where}
+        ORDER BY created_at DESC, id DESC
+        LIMIT %s
+    """
+    # One extra row tells us whether there is a next page
+    params.append(limit + 1)
+    return query, params, limit
+
+
+def paginate(rows, limit):
+    """Trim the look-ahead row and turn it into next_cursor."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+    return {"tickets": rows, "next_cursor": next_cursor}
+
+
 @tickets_bp.route("/tickets", methods=["GET"])
+@conditional_get("tickets")
 def get_tickets():
     """
-    Get tickets with optional filters
+    Get tickets with optional filters, newest first, one page at a time
     ---
     tags:
       - Tickets
@@ -111,66 +390,169 @@ def get_tickets():
       - name: customer_id
         in: query
         type: integer
+      - name: assigned_to
+        in: query
+        type: integer
+      - name: limit
+        in: query
+        type: integer
+        description: Page size (default 50, max 500)
+      - name: after
+        in: query
+        type: string
+        description: next_cursor from the previous page
     responses:
       200:
-        description: List of tickets
+        description: One page of tickets plus next_cursor (null on the last page)
       400:
         description: Invalid query parameters
       500:
         description: Internal server error
     """
     try:
-        status = request.args.get("status")
-        priority = request.args.get("priority")
-        customer_id = request.args.get("customer_id")
-        assigned_to = request.args.get("assigned_to")
-        ticket_id = request.args.get("ticket_id")
-        assigned_to = request.args.get("assigned_to")
-        query = """
-            SELECT id, customer_id, title, priority, status, created_at, updated_at, assigned_to
-            FROM tickets
-            WHERE 1=1
-        """
-        params = []
-
-        if status:
-            query += " AND status = %s"
-            params.append(status)
-
-        if priority:
-            query += " AND priority = %s"
-            params.append(priority)
-
-        if customer_id:
-            query += " AND customer_id = %s"
-            params.append(customer_id)
-        
-
-        if assigned_to:
-          query += " AND assigned_to = %s"
-          params.append(assigned_to)
-
-        if ticket_id:
-            query += " AND id = %s"
-            params.append(ticket_id)
-
-        query += " ORDER BY created_at DESC"
+        try:
+            query, params, limit = page_query(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor(dictionary=True)
         cursor.execute(query, tuple(params))
 
-        tickets = cursor.fetchall()
-        return jsonify(tickets), 200
+        return jsonify(paginate(cursor.fetchall(), limit)), 200
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
     finally:
         if 'cursor' in locals():
             cursor.close()
             conn.close()
 
+EXPORT_COLUMNS = ["id", "customer_id", "title", "priority", "status", "created_at", "updated_at", "assigned_to"]
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FORMATS = {
+    # format: (mimetype, download filename)
+    "ndjson": ("application/x-ndjson", "tickets.ndjson"),
+    "csv": ("text/csv", "tickets.csv"),
+}
+
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def export_query(args):
+    where, params = ticket_filters(args)
+    query = f"""
+        SELECT {", ".join(EXPORT_COLUMNS)}
+        FROM tickets
+        {where}
+        ORDER BY created_at DESC, id DESC
+    """
+    return query, params
+
+
+def export_header(fmt):
+    if fmt != "csv":
+        return ""
+    buf = io.StringIO()
+    csv.writer(buf).writerow(EXPORT_COLUMNS)
+    return buf.getvalue()
+
+
+def export_batch(rows, fmt):
+    """Encode one fetchmany() batch of EXPORT_COLUMNS tuples."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        csv.writer(buf).writerows([[_export_value(v) for v in row] for row in rows])
+        return buf.getvalue()
+    return b"".join(
+        json_codec.dumps(dict(zip(EXPORT_COLUMNS, row))) + b"\n"
+        for row in rows
+    )
+
+
+@tickets_bp.route("/tickets/export", methods=["GET"])
+@conditional_get("tickets")
+def export_tickets():
+    """
+    Stream every matching ticket as NDJSON or CSV
+    ---
+    tags:
+      - Tickets
+    parameters:
+      - name: format
+        in: query
+        type: string
+        enum: [ndjson, csv]
+        default: ndjson
+      - name: status
+        in: query
+        type: string
+        enum: [OPEN, IN_PROGRESS, CLOSED]
+      - name: priority
+        in: query
+        type: string
+        enum: [LOW, MEDIUM, HIGH]
+      - name: customer_id
+        in: query
+        type: integer
+      - name: assigned_to
+        in: query
+        type: integer
+    responses:
+      200:
+        description: Streamed export, one ticket per line
+      400:
+        description: Unknown format
+      500:
+        description: Internal server error
+    """
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    query, params = export_query(request.args)
+
+    try:
+        conn = get_read_connection()
+        # Unbuffered: rows stay on the server and are pulled batch by batch,
+        # so worker memory is bounded by EXPORT_BATCH_SIZE, not the table size
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(query, tuple(params))
+    except Exception as e:
+        if 'conn' in locals():
+            conn.close()
+        return error_response(e)
+
+    def generate():
+        try:
+            yield export_header(fmt)
+
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                yield export_batch(rows, fmt)
+        finally:
+            # Runs on completion and on client disconnect; a half-read
+            # cursor makes the pool discard the connection instead of reusing it
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            conn.close()
+
+    mimetype, filename = EXPORT_FORMATS[fmt]
+    return Response(
+        generate(),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
 
 
 from typing import Literal
@@ -215,8 +597,9 @@ def update_ticket_status(ticket_id):
         conn = get_db_connection()
         cursor = conn.cursor(dictionary=True)
 
-        # Check ticket exists
-        cursor.execute("SELECT status FROM tickets WHERE id = %s", (ticket_id,))
+        # Check ticket exists; lock the row so the counter transition
+        # below is computed from the status we actually overwrite
+        cursor.execute("SELECT status, priority, assigned_to FROM tickets WHERE id = %s FOR UPDATE", (ticket_id,))
         ticket = cursor.fetchone()
 
         if not ticket:
@@ -227,21 +610,25 @@ def update_ticket_status(ticket_id):
             return jsonify({"error": "Closed tickets cannot be reopened"}), 400
 
         # Update status
-        cursor.execute("""
-            UPDATE tickets
-            SET status = %s, assigned_to = %s
-            WHERE id = %s
-        """, (new_status, assigned_to, ticket_id))
+        cursor.execute(SET_STATUS_SQL, (new_status, assigned_to, new_status, ticket_id))
+        if new_status == "CLOSED" and ticket["status"] != "CLOSED":
+            ticket_rollups.apply_events(cursor, [ticket_rollups.closed(ticket["priority"])])
 
         conn.commit()
+        ticket_events.record(ticket_events.changed(
+            ticket_id, ticket["status"], new_status, ticket["assigned_to"], assigned_to
+        ))
 
-        # Invalidate dashboard cache
-        delete_cached("dashboard:summary")
+        enqueue(
+            counters_job([((ticket["status"], ticket["priority"]), (new_status, ticket["priority"]))]),
+            workload_job(bool(ticket["assigned_to"] or assigned_to)),
+            bump=("tickets",)
+        )
 
         return jsonify({"message": "Status updated"}), 200
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
     finally:
         if 'cursor' in locals():
@@ -279,8 +666,9 @@ def assign_ticket(ticket_id):
     cursor = conn.cursor(dictionary=True)
 
     # Check ticket exists
-    cursor.execute("SELECT id FROM tickets WHERE id=%s", (ticket_id,))
-    if not cursor.fetchone():
+    cursor.execute("SELECT id, status, assigned_to FROM tickets WHERE id=%s FOR UPDATE", (ticket_id,))
+    ticket = cursor.fetchone()
+    if not ticket:
         return jsonify({"error": "Ticket not found"}), 404
 
     # Check user is real
@@ -296,10 +684,44 @@ def assign_ticket(ticket_id):
     """, (assigned_to, ticket_id))
 
     conn.commit()
-    delete_cached("dashboard:summary")
-    
+
+    ticket_events.record(ticket_events.changed(
+        ticket_id, ticket["status"], ticket["status"], ticket["assigned_to"], assigned_to
+    ))
+    enqueue(workload_job(), bump=("tickets",))
+
     return jsonify({"message": "Ticket assigned"}), 200
 
+@tickets_bp.route("/tickets/<int:ticket_id>/events", methods=["GET"])
+def get_ticket_events(ticket_id):
+    """
+    Status and assignment history of a ticket
+    ---
+    tags:
+      - Tickets
+    parameters:
+      - name: ticket_id
+        in: path
+        required: true
+        type: integer
+    responses:
+      200:
+        description: Events oldest first (created, status, assigned, deleted); the latest may take up to a second to appear
+      404:
+        description: No history for this ticket
+      500:
+        description: Internal server error
+    """
+    # No ETag: events are written after the tickets version is bumped
+    try:
+        events = ticket_events.read_timeline(ticket_id)
+        if not events:
+            return jsonify({"error": "No history for this ticket"}), 404
+        return jsonify({"ticket_id": ticket_id, "events": events}), 200
+
+    except Exception as e:
+        return error_response(e)
+
 @tickets_bp.route("/tickets/<int:id>", methods=["DELETE"])
 def delete_ticket(id):
     """
@@ -307,17 +729,33 @@ def delete_ticket(id):
     """
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
+        cursor = conn.cursor(dictionary=True)
 
-        cursor.execute("DELETE FROM tickets WHERE id=%s", (id,))
-        if cursor.rowcount == 0:
+        cursor.execute(
+            "SELECT status, priority, assigned_to, created_at, closed_at FROM tickets WHERE id=%s FOR UPDATE",
+            (id,)
+        )
+        ticket = cursor.fetchone()
+        if not ticket:
             return jsonify({"error": "Ticket not found"}), 404
 
+        cursor.execute("DELETE FROM tickets WHERE id=%s", (id,))
+        ticket_rollups.apply_events(cursor, ticket_rollups.deleted(
+            ticket["status"], ticket["priority"], ticket["created_at"], ticket["closed_at"]
+        ))
         conn.commit()
+        ticket_events.record(ticket_events.deleted(id, ticket["status"], ticket["assigned_to"]))
+
+        enqueue(
+            counters_job([((ticket["status"], ticket["priority"]), None)]),
+            workload_job(bool(ticket["assigned_to"])),
+            bump=("tickets",)
+        )
         return jsonify({"message": "Ticket deleted"}), 200
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
     finally:
-        cursor.close()
-        conn.close()
+        if 'cursor' in locals():
+            cursor.close()
+            conn.close()
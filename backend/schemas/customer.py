@@ -1,6 +1,6 @@
 # schemas/customer.py
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, TypeAdapter
+from typing import List, Optional, Tuple
 from datetime import datetime
 class CustomerCreate(BaseModel):
     name: str
@@ -12,4 +12,11 @@ class CustomerResponse(BaseModel):
     name: str
     email: EmailStr
     company: Optional[str]
-    created_at: datetime
\ No newline at end of file
+    created_at: datetime
+
+# Compact form of CustomerResponse: one tuple per row, in CUSTOMER_COLUMNS
+# order, validated a whole result set at a time. Emails are checked as
+# EmailStr when written (CustomerCreate), so here they only need to be str.
+CUSTOMER_COLUMNS = ("id", "name", "email", "company", "created_at")
+CustomerRow = Tuple[int, str, str, Optional[str], datetime]
+customer_rows_adapter = TypeAdapter(List[CustomerRow])
@@ -0,0 +1,250 @@
+# slow_queries.py
+"""
+Slow-query log keyed by query shape.
+
+Every pooled-connection round trip is reported through db.on_query.
+When one statement (execute plus its fetches) takes longer than
+SLOW_QUERY_MS, it is normalized into a fingerprint and recorded in
+Redis: hit count, total and max duration, the routes that issued it and
+the last few parameter samples. The first time a shape is seen, EXPLAIN
+runs for it once (across all workers) with the captured parameters, so
+a filter combination on GET /tickets that falls back to a full scan
+shows up with `type: ALL` and no key.
+
+Recording and EXPLAIN happen on a background thread with its own pooled
+connection, never on the request path. Browse the log through
+GET /admin/slow-queries (routes/admin.py).
+"""
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import threading
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+import redis_client as cache
+from db import get_db_connection, on_query
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_SAMPLES = int(os.getenv("SLOW_QUERY_SAMPLES", "20"))       # parameter samples kept per shape
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "1") == "1"
+SLOW_QUERY_QUEUE = int(os.getenv("SLOW_QUERY_QUEUE", "1000"))        # pending records; extra are dropped
+
+KEY_PREFIX = "slowq:"
+INDEX_KEY = "slowq:index"   # sorted set: fingerprint -> max duration (ms)
+EXPLAINABLE = ("SELECT", "UPDATE", "DELETE")
+
+log = logging.getLogger(__name__)
+
+_IN_LIST = re.compile(r"\bIN\s*\(\s*%s(?:\s*,\s*%s)*\s*\)", re.I)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))*", re.I)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"(?<![\w%])\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize(statement):
+    """Query shape: whitespace collapsed, literals and IN / VALUES lists folded."""
+    shape = _STRING.sub("?", statement)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    shape = _VALUES_LIST.sub("VALUES (...)", shape)
+    shape = _NUMBER.sub("?", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+def fingerprint(shape):
+    return hashlib.sha1(shape.encode()).hexdigest()[:16]
+
+
+# --- capture (request thread) --------------------------------------------------
+
+_local = threading.local()
+_queue = queue.Queue(maxsize=SLOW_QUERY_QUEUE)
+_worker = {"pid": None}
+_worker_lock = threading.Lock()
+
+
+@on_query
+def _on_query(statement, params, seconds, phase):
+    if phase == "checkout" or statement is None or getattr(_local, "is_worker", False):
+        return
+    if phase == "execute":
+        _local.statement = statement
+        _local.params = params
+        _local.elapsed = seconds
+        _local.recorded = False
+    elif getattr(_local, "statement", None) is statement:
+        _local.elapsed += seconds
+    else:
+        return
+
+    if not _local.recorded and _local.elapsed * 1000 >= SLOW_QUERY_MS:
+        _local.recorded = True
+        route = request.url_rule.rule if has_request_context() and request.url_rule else None
+        _submit((statement, params, _local.elapsed, route, datetime.now(timezone.utc).isoformat()))
+
+
+def _submit(item):
+    ensure_worker()
+    try:
+        _queue.put_nowait(item)
+    except queue.Full:
+        pass  # a flood of slow queries: the shapes already queued are enough to go on
+
+
+# --- recording (background thread) ---------------------------------------------
+
+def _jsonable(params):
+    return json.loads(json.dumps(list(params) if params is not None else None, default=str))
+
+
+def explain(statement, params):
+    """EXPLAIN rows for one statement, on a fresh pooled connection."""
+    conn = get_db_connection()
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("EXPLAIN " + statement, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _plan_flags(plan):
+    return {
+        "full_scan": any(row.get("type") == "ALL" for row in plan),
+        "filesort": any("filesort" in (row.get("Extra") or "") for row in plan),
+        "temporary": any("temporary" in (row.get("Extra") or "") for row in plan),
+    }
+
+
+def record(statement, params, seconds, route, at):
+    shape = normalize(statement)
+    fp = fingerprint(shape)
+    key = KEY_PREFIX + fp
+    ms = round(seconds * 1000, 2)
+    sample = json.dumps({"params": _jsonable(params), "duration_ms": ms, "route": route, "at": at})
+
+    pipe = cache.redis_client.pipeline(transaction=False)
+    pipe.hsetnx(key, "query", shape)
+    pipe.hsetnx(key, "first_seen", at)
+    pipe.hset(key, "last_seen", at)
+    pipe.hincrby(key, "count", 1)
+    pipe.hincrbyfloat(key, "total_ms", ms)
+    pipe.zadd(INDEX_KEY, {fp: ms}, gt=True)
+    pipe.lpush(key + ":samples", sample)
+    pipe.ltrim(key + ":samples", 0, SLOW_QUERY_SAMPLES - 1)
+    if route:
+        pipe.sadd(key + ":routes", route)
+    explainable = (SLOW_QUERY_EXPLAIN and params is not None
+                   and statement.lstrip()[:6].upper() in EXPLAINABLE)
+    if explainable:
+        pipe.set(key + ":explained", 1, nx=True)  # EXPLAIN each shape once, whichever worker sees it first
+    claimed = pipe.execute()[-1] if explainable else False
+
+    if claimed:
+        try:
+            plan = explain(statement, params)
+            fields = {"explain": json.dumps(plan, default=str), **{k: int(v) for k, v in _plan_flags(plan).items()}}
+        except Exception as e:
+            fields = {"explain_error": str(e)}
+        fields["explain_params"] = json.dumps(_jsonable(params))
+        cache.redis_client.hset(key, mapping=fields)
+
+
+def _work():
+    _local.is_worker = True  # our own EXPLAINs and Redis writes are not request traffic
+    while True:
+        item = _queue.get()
+        try:
+            record(*item)
+        except Exception:
+            log.warning("Failed to record slow query", exc_info=True)
+
+
+def ensure_worker():
+    """Start the recording thread once per process (again after a fork)."""
+    pid = os.getpid()
+    if _worker["pid"] == pid:
+        return
+    with _worker_lock:
+        if _worker["pid"] == pid:
+            return
+        threading.Thread(target=_work, name="slow-query-log", daemon=True).start()
+        _worker["pid"] = pid
+
+
+# --- reading -------------------------------------------------------------------
+
+def _summary(fp, data, max_ms, routes):
+    count = int(data.get("count", 0))
+    total_ms = float(data.get("total_ms", 0))
+    summary = {
+        "fingerprint": fp,
+        "query": data.get("query"),
+        "count": count,
+        "total_ms": round(total_ms, 2),
+        "avg_ms": round(total_ms / count, 2) if count else None,
+        "max_ms": max_ms,
+        "first_seen": data.get("first_seen"),
+        "last_seen": data.get("last_seen"),
+        "routes": sorted(routes),
+        "explained": "explain" in data,
+    }
+    for flag in ("full_scan", "filesort", "temporary"):
+        if flag in data:
+            summary[flag] = data[flag] == "1"
+    return summary
+
+
+def list_slow_queries(limit=50, sort="max"):
+    """Recorded shapes, slowest first (sort: max, total, count or avg)."""
+    entries = cache.redis_client.zrevrange(INDEX_KEY, 0, -1, withscores=True)
+    pipe = cache.redis_client.pipeline(transaction=False)
+    for fp, _ in entries:
+        pipe.hgetall(KEY_PREFIX + fp)
+        pipe.smembers(KEY_PREFIX + fp + ":routes")
+    results = pipe.execute()
+
+    shapes = [
+        _summary(fp, results[2 * i], max_ms, results[2 * i + 1])
+        for i, (fp, max_ms) in enumerate(entries)
+    ]
+    if sort != "max":
+        field = {"total": "total_ms", "count": "count", "avg": "avg_ms"}[sort]
+        shapes.sort(key=lambda s: s[field] or 0, reverse=True)
+    return shapes[:limit]
+
+
+def get_slow_query(fp):
+    """Full record for one shape (EXPLAIN rows and parameter samples), or None."""
+    key = KEY_PREFIX + fp
+    pipe = cache.redis_client.pipeline(transaction=False)
+    pipe.hgetall(key)
+    pipe.smembers(key + ":routes")
+    pipe.lrange(key + ":samples", 0, -1)
+    pipe.zscore(INDEX_KEY, fp)
+    data, routes, samples, max_ms = pipe.execute()
+    if not data:
+        return None
+
+    result = _summary(fp, data, max_ms, routes)
+    result["explain"] = json.loads(data["explain"]) if "explain" in data else None
+    result["explain_error"] = data.get("explain_error")
+    result["explain_params"] = json.loads(data["explain_params"]) if "explain_params" in data else None
+    result["samples"] = [json.loads(s) for s in samples]
+    return result
+
+
+def reset():
+    """Forget every recorded shape (they are EXPLAINed again when next seen)."""
+    fps = cache.redis_client.zrange(INDEX_KEY, 0, -1)
+    keys = [INDEX_KEY]
+    for fp in fps:
+        keys += [KEY_PREFIX + fp + suffix for suffix in ("", ":samples", ":routes", ":explained")]
+    cache.redis_client.delete(*keys)
+    return len(fps)
@@ -0,0 +1,33 @@
+# tests/conftest.py
+"""
+Route tests against the benchmark stand-ins (bench/stand_ins.py):
+SQLite for MySQL and fakeredis for Redis, so they need neither service.
+
+    cd backend
+    python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SCHEMA_CHECK", "0")  # the SQLite schema has no MySQL indexes to check
+os.environ.setdefault("JOB_WORKER_IN_PROCESS", "0")  # tests run queued jobs with jobs.work_once()
+os.environ.setdefault("SECRET_KEY", "test-secret")    # signs the tokens /login hands out
+
+
+@pytest.fixture(scope="session")
+def seeded(tmp_path_factory):
+    """Install the stand-ins and seed a small dataset; returns dataset.seed()'s manifest."""
+    from bench import dataset, stand_ins
+
+    stand_ins.install("sqlite", str(tmp_path_factory.mktemp("db") / "desk.sqlite3"))
+    return dataset.seed(customers=20, tickets=100, agents=3, disposable=5)
+
+
+@pytest.fixture(scope="session")
+def client(seeded):
+    # app binds redis_client and db at import, so only after install()
+    from app import app
+    return app.test_client()
@@ -0,0 +1,65 @@
+# tests/test_auth.py
+import time
+
+import jwt
+import pytest
+
+
+def test_duplicate_registration_is_a_conflict(client):
+    user = {"name": "Dup", "email": "dup-user@example.com", "password": "correct horse battery"}
+    assert client.post("/register", json=user).status_code == 201
+
+    res = client.post("/register", json=user)
+    assert res.status_code == 409
+    assert res.get_json() == {"error": "A user with this email already exists"}
+
+
+@pytest.fixture
+def auth(seeded):
+    import routes.auth_middleware as auth
+
+    auth.token_cache.clear()
+    return auth
+
+
+def login(client, seeded):
+    admin = seeded["admin"]
+    res = client.post("/login", json={"email": admin["email"], "password": admin["password"]})
+    assert res.status_code == 200
+    return {"Authorization": f"Bearer {res.get_json()['token']}"}
+
+
+def test_logout_revokes_the_token(client, seeded, auth):
+    headers = login(client, seeded)
+    assert client.get("/admin/slow-queries", headers=headers).status_code == 200
+
+    assert client.post("/logout", headers=headers).status_code == 200
+    assert client.get("/admin/slow-queries", headers=headers).status_code == 401
+
+
+def test_verified_tokens_are_served_from_the_cache_until_another_worker_revokes_them(auth):
+    token = jwt.encode({"sub": "1", "role": "admin", "exp": time.time() + 300}, auth.SECRET_KEY, algorithm="HS256")
+    assert auth.verify_token(token)["sub"] == "1"
+
+    # Revoked behind the cache's back: still served from it...
+    digest = auth.token_digest(token)
+    auth.redis_client.set(auth.REVOKED_KEY_PREFIX + digest, 1)
+    assert auth.verify_token(token)["sub"] == "1"
+
+    # ...until the revoking worker's invalidation arrives
+    from redis_client import INVALIDATION_CHANNEL
+
+    auth.redis_client.publish(INVALIDATION_CHANNEL, f"other-worker {auth.TOKEN_KEY_PREFIX}{digest}")
+    deadline = time.monotonic() + 2
+    while auth.token_cache.get(digest)[0] and time.monotonic() < deadline:
+        time.sleep(0.02)
+    with pytest.raises(jwt.InvalidTokenError):
+        auth.verify_token(token)
+
+
+def test_expired_and_forged_tokens_are_rejected(auth):
+    expired = jwt.encode({"sub": "1", "exp": time.time() - 1}, auth.SECRET_KEY, algorithm="HS256")
+    forged = jwt.encode({"sub": "1", "role": "admin"}, "not-the-secret", algorithm="HS256")
+    for token in (expired, forged):
+        with pytest.raises(jwt.InvalidTokenError):
+            auth.verify_token(token)
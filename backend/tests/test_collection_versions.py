@@ -0,0 +1,41 @@
+# tests/test_collection_versions.py
+def test_unchanged_list_is_answered_304_without_a_body(client):
+    res = client.get("/tickets", query_string={"status": "OPEN", "limit": 5})
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+
+    res = client.get("/tickets", query_string={"status": "OPEN", "limit": 5}, headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.get_data() == b""
+    assert res.headers["ETag"] == etag
+
+
+def test_query_order_does_not_change_the_etag(client):
+    first = client.get("/tickets?status=OPEN&limit=5").headers["ETag"]
+    second = client.get("/tickets?limit=5&status=OPEN").headers["ETag"]
+    other = client.get("/tickets?limit=6&status=OPEN").headers["ETag"]
+    assert first == second != other
+
+
+def test_a_write_to_the_collection_changes_the_etag(client, seeded):
+    etag = client.get("/tickets", query_string={"status": "OPEN"}).headers["ETag"]
+    res = client.post("/tickets", json={
+        "customer_id": seeded["customer_ids"][0], "title": "New version", "priority": "LOW",
+    })
+    assert res.status_code == 201
+
+    res = client.get("/tickets", query_string={"status": "OPEN"}, headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+def test_lists_are_served_untagged_when_redis_is_down(client, monkeypatch):
+    import collection_versions
+
+    def redis_down(*collections):
+        raise ConnectionError("Redis is unreachable")
+
+    monkeypatch.setattr(collection_versions, "current_versions", redis_down)
+    res = client.get("/tickets", query_string={"status": "OPEN"})
+    assert res.status_code == 200
+    assert "ETag" not in res.headers
@@ -0,0 +1,53 @@
+# tests/test_compression.py
+import gzip
+import json
+
+import pytest
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+
+@pytest.fixture
+def compression(seeded):
+    # perf, which it imports, binds redis_client: only after install()
+    import compression
+    return compression
+
+
+def accept(header):
+    return parse_accept_header(header, Accept)
+
+
+def test_large_json_is_gzipped_for_clients_that_accept_it(client):
+    res = client.get("/tickets", query_string={"limit": 100}, headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["Vary"]
+    assert len(json.loads(gzip.decompress(res.get_data()))["tickets"]) == 100
+
+
+def test_identity_clients_get_the_plain_body(client):
+    res = client.get("/tickets", query_string={"limit": 100})
+    assert "Content-Encoding" not in res.headers
+    assert "Accept-Encoding" in res.headers["Vary"]
+    assert len(res.get_json()["tickets"]) == 100
+
+
+def test_small_bodies_are_not_compressed(client, compression):
+    res = client.get("/tickets", query_string={"limit": 1, "ticket_id": 1}, headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert len(res.get_data()) < compression.COMPRESS_MIN_BYTES
+    assert "Content-Encoding" not in res.headers
+
+
+def test_streamed_exports_are_left_to_the_proxy(client):
+    res = client.get("/tickets/export", headers={"Accept-Encoding": "gzip"})
+    assert res.is_streamed
+    assert "Content-Encoding" not in res.headers
+
+
+def test_encoding_follows_server_preference_among_those_accepted(compression, monkeypatch):
+    monkeypatch.setattr(compression, "ENCODERS", [("br", None), ("gzip", compression._gzip)])
+    assert compression.choose_encoding(accept("gzip, br;q=0.5"))[0] == "br"
+    assert compression.choose_encoding(accept("gzip"))[0] == "gzip"
+    assert compression.choose_encoding(accept("gzip;q=0, deflate"))[0] is None
@@ -0,0 +1,77 @@
+# tests/test_customers.py
+def test_duplicate_customer_email_is_a_conflict(client):
+    customer = {"name": "Dup", "email": "dup-customer@example.com"}
+    assert client.post("/customers", json=customer).status_code == 201
+
+    res = client.post("/customers", json=customer)
+    assert res.status_code == 409
+    assert res.get_json() == {"error": "A customer with this email already exists"}
+
+
+def test_search_query_escapes_like_wildcards_in_the_prefix():
+    from routes.customers import customer_search_query
+
+    assert customer_search_query("   ", 20) is None
+    sql, params = customer_search_query("5", 20)
+    assert "MATCH" not in sql and params == ("5%", 20)
+    sql, params = customer_search_query(" 50%_off\\ ", 20)
+    assert "MATCH(name, email, company) AGAINST" in sql
+    assert params == ("50%_off\\", "50\\%\\_off\\\\%", "50%_off\\", 20)
+
+
+def test_search_ranks_name_prefixes_above_fuzzy_matches(client):
+    for name, email in [("Mara Quillfeather", "mara@quill.example"),
+                        ("Quillon Mara", "quillon@example.com")]:
+        assert client.post("/customers", json={"name": name, "email": email}).status_code == 201
+
+    res = client.get("/customers/search", query_string={"q": "Quill", "limit": 5})
+    assert res.status_code == 200
+    names = [customer["name"] for customer in res.get_json()]
+    assert names[:2] == ["Quillon Mara", "Mara Quillfeather"]
+
+
+def test_search_with_an_empty_term_finds_nothing(client):
+    res = client.get("/customers/search", query_string={"q": " "})
+    assert res.status_code == 200
+    assert res.get_json() == []
+
+
+def parse_all(fmt, body):
+    from routes.customers import ImportParser
+
+    parser = ImportParser(fmt)
+    return [pair for records in parser.parse(body.splitlines(keepends=True)) for pair in records]
+
+
+def test_csv_import_keeps_quoted_newlines_and_escaped_quotes_in_one_record():
+    body = (
+        '\ufeffname,email,company\r\n'
+        'Ada,ada@example.com,"Analytical\r\nEngines ""Ltd"""\r\n'
+        'Bob,bob@example.com,\r\n'
+    ).encode("utf-8")
+    assert parse_all("csv", body) == [
+        (3, {"name": "Ada", "email": "ada@example.com", "company": 'Analytical\r\nEngines "Ltd"'}),
+        (4, {"name": "Bob", "email": "bob@example.com", "company": ""}),
+    ]
+
+
+def test_csv_import_flushes_a_record_left_open_at_the_end():
+    body = b'name,email,company\nAda,ada@example.com,"never closed\n'
+    [(line_number, record)] = parse_all("csv", body)
+    assert line_number == 2
+    assert record["company"].startswith("never closed")
+
+
+def test_ndjson_import_reports_bad_lines_and_skips_blank_ones():
+    [(first_line, first), (second_line, second)] = parse_all("ndjson", b'{"name": "Ada"}\n\n{not json\n')
+    assert (first_line, first) == (1, {"name": "Ada"})
+    assert second_line == 3 and isinstance(second, ValueError)
+
+
+def test_csv_import_with_a_multi_line_company(client):
+    body = b'name,email,company\nMulti Line,multi-line@example.com,"Floor 3\nBuilding B"\nbad,,\n'
+    res = client.post("/customers/import", data=body, content_type="text/csv")
+    assert res.status_code == 200
+    summary = res.get_json()
+    assert (summary["rows"], summary["inserted"], summary["rejected"]) == (2, 1, 1)
+    assert summary["rejects"][0]["line"] == 4
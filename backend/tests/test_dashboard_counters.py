@@ -0,0 +1,93 @@
+# tests/test_dashboard_counters.py
+import pytest
+
+
+@pytest.fixture
+def counters(seeded):
+    import dashboard_counters
+    import jobs
+
+    for key in (jobs.JOB_STREAM, jobs.JOB_DELAYED, jobs.JOB_DEAD):
+        jobs.redis_client.delete(key)
+    jobs.ensure_group()
+    return dashboard_counters
+
+
+def mysql_counts():
+    from db import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT status, COUNT(*) FROM tickets GROUP BY status")
+        return {status: n for status, n in cursor.fetchall() if n}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def redis_counts(counters):
+    status_counts, _ = counters.read_counts()
+    return {status: n for status, n in status_counts.items() if n}
+
+
+def create_ticket(client, seeded):
+    res = client.post("/tickets", json={
+        "customer_id": seeded["customer_ids"][0], "title": "Counted once", "priority": "LOW",
+    })
+    assert res.status_code == 201
+
+
+def run_queued_jobs():
+    import jobs
+
+    while jobs.work_once("test", block_ms=1):
+        pass
+
+
+def test_rebuild_is_not_double_counted_by_jobs_queued_before_it(client, seeded, counters):
+    create_ticket(client, seeded)   # its counters job is still queued...
+    counters.rebuild()              # ...when the snapshot counts the ticket
+    run_queued_jobs()
+    assert redis_counts(counters) == mysql_counts()
+
+
+def test_jobs_queued_after_a_rebuild_are_applied(client, seeded, counters):
+    counters.rebuild()
+    create_ticket(client, seeded)
+    run_queued_jobs()
+    assert redis_counts(counters) == mysql_counts()
+
+
+def test_status_changes_and_deletes_move_the_counts(client, seeded, counters):
+    counters.rebuild()
+    open_ticket, doomed = seeded["open_ticket_ids"][0], seeded["disposable"]["tickets"][0]
+    assert client.put(f"/tickets/{open_ticket}/update", json={"status": "CLOSED"}).status_code == 200
+    assert client.delete(f"/tickets/{doomed}").status_code == 200
+    run_queued_jobs()
+    assert redis_counts(counters) == mysql_counts()
+
+
+def test_transitions_that_cancel_out_queue_no_job(counters):
+    assert counters.counters_job([(None, ("OPEN", "LOW")), (("OPEN", "LOW"), None)]) is None
+    assert counters.counters_job([(("OPEN", "LOW"), ("CLOSED", "LOW"))]) == (
+        counters.COUNTERS_JOB, {"status": {"OPEN": -1, "CLOSED": 1}, "priority": {}},
+    )
+
+
+def test_fence_follows_the_first_queued_id_of_a_retried_job(counters):
+    status_deltas, _ = counters.fenced_deltas([
+        ("100-0", {"status": {"OPEN": 1}, "priority": {}}),   # retried job queued before the fence
+        ("200-1", {"status": {"OPEN": 1}, "priority": {}}),
+    ], fence="200-0")
+    assert status_deltas == {"OPEN": 1}
+
+
+def test_counter_jobs_wait_for_a_running_rebuild(counters, monkeypatch):
+    monkeypatch.setattr(counters, "REBUILD_LOCK_TTL", 0.2)
+    counters.redis_client.set(counters.REBUILD_LOCK_KEY, 1)
+    try:
+        with pytest.raises(counters.CountersRebuilding):
+            counters._apply_counter_jobs([("1-0", {"status": {"OPEN": 1}, "priority": {}})])
+    finally:
+        counters.redis_client.delete(counters.REBUILD_LOCK_KEY)
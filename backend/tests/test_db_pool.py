@@ -0,0 +1,98 @@
+# tests/test_db_pool.py
+import time
+
+import pytest
+
+from db import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    unread_result = False
+    in_transaction = False
+
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise OSError("MySQL server has gone away")
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, **kwargs):
+        super().__init__({}, **kwargs)
+        self.connections = []
+
+    def _connect(self):
+        raw = FakeConnection()
+        self.connections.append(raw)
+        self._stats["connects"] += 1
+        return raw
+
+
+def checkout(pool):
+    conn = pool.connect()
+    raw = conn._raw
+    conn.close()
+    return raw
+
+
+def test_idle_connections_are_reused():
+    pool = FakePool(size=1, max_overflow=0)
+    assert checkout(pool) is checkout(pool)
+    assert pool.stats()["connects"] == 1
+
+
+def test_pre_ping_replaces_a_dead_idle_connection():
+    pool = FakePool(size=1, max_overflow=0, ping_interval=0)
+    dead = checkout(pool)
+    dead.alive = False
+
+    assert checkout(pool) is not dead
+    assert dead.closed
+    assert pool.stats()["ping_failures"] == 1
+
+
+def test_connections_past_recycle_are_replaced():
+    pool = FakePool(size=1, max_overflow=0, recycle=0.01)
+    old = checkout(pool)
+    time.sleep(0.02)
+
+    assert checkout(pool) is not old
+    assert old.closed
+    assert pool.stats()["recycled"] == 1
+
+
+def test_overflow_connections_close_on_return():
+    pool = FakePool(size=1, max_overflow=1)
+    first, second = pool.connect(), pool.connect()
+    first.close()
+    second.close()
+    assert pool.stats()["idle"] == 1
+    assert [raw.closed for raw in pool.connections] == [False, True]
+
+
+def test_exhausted_pool_times_out():
+    pool = FakePool(size=1, max_overflow=0, timeout=0.05)
+    held = pool.connect()
+    with pytest.raises(PoolTimeout):
+        pool.connect()
+    held.close()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_forked_worker_starts_a_fresh_pool_without_closing_inherited_sockets():
+    pool = FakePool(size=1, max_overflow=0)
+    inherited = checkout(pool)
+    pool._pid = -1   # as if this process were the parent's fork
+
+    assert checkout(pool) is not inherited
+    assert not inherited.closed
+    assert pool.stats()["open"] == 1
@@ -0,0 +1,125 @@
+# tests/test_jobs.py
+import time
+
+import pytest
+
+
+@pytest.fixture
+def jobs(seeded):
+    # Imported after the stand-ins are installed; a fresh, empty queue per test
+    import jobs
+
+    for key in (jobs.JOB_STREAM, jobs.JOB_DELAYED, jobs.JOB_DEAD):
+        jobs.redis_client.delete(key)
+    jobs.ensure_group()
+    return jobs
+
+
+@pytest.fixture
+def ran(jobs):
+    payloads = []
+    jobs.job_handler("test.record")(payloads.extend)
+    return payloads
+
+
+def pending(jobs, consumer):
+    return [p["message_id"] for p in jobs.redis_client.xpending_range(
+        jobs.JOB_STREAM, jobs.JOB_GROUP, min="-", max="+", count=100, consumername=consumer)]
+
+
+def test_deleted_entries_in_a_batch_are_skipped_and_the_rest_acknowledged(jobs, ran):
+    jobs.queue_jobs(jobs.redis_client, [("test.record", 1)])
+    [[_, entries]] = jobs.redis_client.xreadgroup(jobs.JOB_GROUP, "w1", {jobs.JOB_STREAM: ">"})
+
+    assert jobs.run_batch(entries + [(None, None)]) == 0
+    assert ran == [1]
+    assert pending(jobs, "w1") == []
+
+
+def test_ack_deleted_acknowledges_only_entries_gone_from_the_stream(jobs):
+    jobs.queue_jobs(jobs.redis_client, [("test.record", 1), ("test.record", 2)])
+    [[_, [(gone, _), (live, fields)]]] = jobs.redis_client.xreadgroup(
+        jobs.JOB_GROUP, "w1", {jobs.JOB_STREAM: ">"})
+    # What Redis 6.2 leaves behind: a deleted entry still pending, claimed as nil
+    jobs.redis_client.xdel(jobs.JOB_STREAM, gone)
+
+    jobs.ack_deleted("w1", [(None, None), (live, fields)])
+    assert pending(jobs, "w1") == [live]
+
+
+def test_enqueue_does_not_trim_unread_jobs(jobs, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_WORKER_IN_PROCESS", False)
+    for n in range(5):
+        jobs.enqueue(("test.record", n))
+    assert jobs.redis_client.xlen(jobs.JOB_STREAM) == 5
+
+
+@pytest.fixture
+def flaky(jobs):
+    """Handler for test.flaky that fails while `failures` is positive, recording the ids it saw."""
+    state = {"failures": 0, "seen": []}
+
+    def handler(pairs):
+        state["seen"].append([job_id for job_id, _ in pairs])
+        if state["failures"]:
+            state["failures"] -= 1
+            raise RuntimeError("downstream unavailable")
+
+    jobs.job_handler("test.flaky", ids=True)(handler)
+    return state
+
+
+def run_all(jobs):
+    while jobs.work_once("w1", block_ms=1):
+        pass
+
+
+def test_failed_jobs_are_retried_under_their_original_id(jobs, flaky, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_BASE", 0)   # due immediately
+    flaky["failures"] = 1
+    jobs.queue_jobs(jobs.redis_client, [("test.flaky", {"n": 1})])
+    [[original, _]] = jobs.redis_client.xrange(jobs.JOB_STREAM)
+
+    run_all(jobs)
+    assert flaky["seen"] == [[original], [original]]
+    assert jobs.queue_stats() == {"queued": 0, "delayed": 0, "dead": 0}
+
+
+def test_retries_back_off(jobs, flaky):
+    flaky["failures"] = 1
+    jobs.queue_jobs(jobs.redis_client, [("test.flaky", {"n": 1})])
+    run_all(jobs)
+
+    [(encoded, due)] = jobs.redis_client.zrange(jobs.JOB_DELAYED, 0, -1, withscores=True)
+    assert jobs.json_codec.loads(encoded)["attempt"] == 1
+    assert due > time.time() + jobs.retry_delay(1) - 1
+    assert jobs.queue_stats()["queued"] == 0
+
+
+def test_jobs_failing_every_attempt_are_dead_lettered_then_requeued(jobs, flaky, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_BASE", 0)
+    monkeypatch.setattr(jobs, "JOB_MAX_ATTEMPTS", 3)
+    flaky["failures"] = 3
+    jobs.queue_jobs(jobs.redis_client, [("test.flaky", {"n": 1})])
+    [[original, _]] = jobs.redis_client.xrange(jobs.JOB_STREAM)
+
+    run_all(jobs)
+    [dead] = jobs.dead_letters()
+    assert (dead["id"], dead["attempt"], dead["payload"]) == (original, 3, {"n": 1})
+    assert dead["error"] == "RuntimeError: downstream unavailable"
+
+    assert jobs.requeue_dead() == 1
+    run_all(jobs)
+    assert flaky["seen"] == [[original]] * 4
+    assert jobs.queue_stats() == {"queued": 0, "delayed": 0, "dead": 0}
+
+
+def test_undecodable_and_unhandled_jobs_do_not_block_the_batch(jobs, ran, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_MAX_ATTEMPTS", 1)
+    jobs.redis_client.xadd(jobs.JOB_STREAM, {"job": "{not json"})
+    jobs.queue_jobs(jobs.redis_client, [("test.unknown", 1), ("test.record", 2)])
+
+    run_all(jobs)
+    assert ran == [2]
+    errors = sorted(fields["error"].split(":")[0] for _, fields in jobs.redis_client.xrange(jobs.JOB_DEAD))
+    assert errors == ["LookupError", "undecodable"]
@@ -0,0 +1,39 @@
+# tests/test_json_codec.py
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import json_codec
+
+DOCUMENT = {
+    "created_at": datetime(2026, 3, 1, 12, 30, 5, 250000),
+    "day": date(2026, 3, 1),
+    "amount": Decimal("12.50"),
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "name": "Zoë",
+    "tags": [1, None, True],
+}
+
+
+@pytest.mark.parametrize("backend", sorted(json_codec.BACKENDS))
+def test_every_backend_encodes_the_same_document(backend):
+    dumps, loads = json_codec.BACKENDS[backend]
+    encoded = dumps(DOCUMENT)
+    assert encoded == json_codec.stdlib_dumps(DOCUMENT)
+    assert loads(encoded) == json.loads(encoded)
+    assert json.loads(encoded) == {
+        "created_at": "2026-03-01T12:30:05.250000",
+        "day": "2026-03-01",
+        "amount": "12.50",
+        "id": "12345678-1234-5678-1234-567812345678",
+        "name": "Zoë",
+        "tags": [1, None, True],
+    }
+
+
+def test_unknown_types_are_still_an_error():
+    with pytest.raises(TypeError):
+        json_codec.dumps({"value": object()})
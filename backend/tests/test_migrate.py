@@ -0,0 +1,52 @@
+# tests/test_migrate.py
+import pytest
+
+
+@pytest.fixture
+def migration(seeded, tmp_path):
+    import migrate
+
+    (tmp_path / "0001_unique_names.up.sql").write_text("CREATE UNIQUE INDEX uq_names ON names (name);")
+    (tmp_path / "0001_unique_names.check.sql").write_text(
+        "-- Rows the index cannot be built over\n"
+        "SELECT name, COUNT(*) AS n FROM names GROUP BY name HAVING COUNT(*) > 1 ORDER BY name;"
+    )
+    [found] = migrate.discover(str(tmp_path))
+    return found
+
+
+@pytest.fixture
+def cursor(seeded):
+    from db import get_db_connection
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("CREATE TEMP TABLE names (name TEXT)")
+    yield cursor
+    cursor.execute("DROP TABLE names")
+    cursor.close()
+    conn.close()
+
+
+def test_preflight_lists_the_rows_blocking_a_migration(migration, cursor):
+    import migrate
+
+    for name in ("ann", "bob", "ann"):
+        cursor.execute("INSERT INTO names VALUES (%s)", (name,))
+    with pytest.raises(migrate.SchemaError, match=r"0001_unique_names .*name=ann, n=2\. See 0001_unique_names\.check\.sql"):
+        migrate.preflight(cursor, migration)
+
+
+def test_preflight_passes_clean_data(migration, cursor):
+    import migrate
+
+    cursor.execute("INSERT INTO names VALUES (%s)", ("ann",))
+    migrate.preflight(cursor, migration)
+
+
+def test_unique_email_migrations_have_a_preflight():
+    import migrate
+
+    by_name = {m.name: m for m in migrate.discover()}
+    assert by_name["customers_email_unique"].check_path
+    assert by_name["hot_path_indexes"].check_path
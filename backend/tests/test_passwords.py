@@ -0,0 +1,33 @@
+# tests/test_passwords.py
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import passwords
+
+
+class BrokenPool:
+    """A pool whose worker died after accepting the job."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A process in the process pool was terminated abruptly"))
+        return future
+
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+def test_a_pool_broken_while_running_the_job_is_replaced_and_the_job_retried(monkeypatch):
+    broken = BrokenPool()
+    passwords._init()
+    monkeypatch.setitem(passwords._state, "pool", broken)
+
+    assert passwords._run(abs, -1) == 1
+    assert broken.shut_down
+    assert passwords._state["pool"] is not broken
+    assert passwords._state["pid"] == os.getpid()
+    passwords._state["pool"].shutdown()   # the original pool is put back after the test
@@ -0,0 +1,42 @@
+# tests/test_pool_timeout.py
+import pytest
+
+
+def exhausted(*args, **kwargs):
+    from db import PoolTimeout
+    raise PoolTimeout("No database connection available within 10.0s")
+
+
+def assert_retryable_503(res):
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert "No database connection" in res.get_json()["error"]
+
+
+def test_pool_exhaustion_is_a_retryable_503(client, monkeypatch):
+    # Imported here, after the client fixture has installed the stand-ins
+    import routes.tickets
+
+    monkeypatch.setattr(routes.tickets, "get_read_connection", exhausted)
+    assert_retryable_503(client.get("/tickets", query_string={"status": "OPEN"}))
+
+
+@pytest.mark.parametrize("module, method, path", [
+    ("routes.tickets", "delete", "/tickets/1"),
+    ("routes.auth", "delete", "/users/1"),
+    ("routes.tickets", "put", "/tickets/1/update"),
+])
+def test_write_routes_answer_pool_exhaustion_with_503(client, monkeypatch, module, method, path):
+    import importlib
+
+    monkeypatch.setattr(importlib.import_module(module), "get_db_connection", exhausted)
+    assert_retryable_503(getattr(client, method)(path, json={"status": "CLOSED"}))
+
+
+def test_import_reports_pool_exhaustion_with_its_summary(client, monkeypatch):
+    import routes.customers
+
+    monkeypatch.setattr(routes.customers, "get_db_connection", exhausted)
+    res = client.post("/customers/import?format=ndjson", data=b'{"name": "A", "email": "a@example.com"}\n')
+    assert_retryable_503(res)
+    assert res.get_json()["summary"]["inserted"] == 0
@@ -0,0 +1,101 @@
+# tests/test_read_routing.py
+import os
+import time
+
+import pytest
+from flask import Flask, g
+
+import db
+import read_routing
+
+
+class FakeReplica:
+    def __init__(self, name, broken=False):
+        self.name = name
+        self.healthy = True
+        self.broken = broken
+        self.pool = self
+
+    def connect(self):
+        if self.broken:
+            raise ConnectionError("replica unreachable")
+        return self.name
+
+    def mark_down(self, reason, lag=None):
+        self.healthy = False
+
+
+class FakePrimary:
+    def connect(self):
+        return "primary"
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    # db.replicas is shared by name (collection_versions, read_routing): fill it in place
+    replica = FakeReplica("replica")
+    monkeypatch.setattr(db, "pool", FakePrimary())
+    monkeypatch.setitem(db._monitor, "pid", os.getpid())   # no health-check thread
+    db.replicas.append(replica)
+    yield replica
+    db.replicas.remove(replica)
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def test_reads_go_to_a_healthy_replica_unless_the_request_is_pinned(replica, app):
+    with app.test_request_context("/tickets"):
+        assert db.get_read_connection() == "replica"
+        read_routing.pin_primary()
+        assert db.get_read_connection() == "primary"
+
+
+def test_an_unreachable_replica_is_marked_down_and_the_read_falls_back(replica):
+    replica.broken = True
+    assert db.get_read_connection() == "primary"
+    assert not replica.healthy
+    assert db.get_read_connection() == "primary"
+
+
+@pytest.mark.parametrize("now", [1700000000.0, 1700000000.0004, 1700000000.0009])
+def test_a_fresh_marker_is_valid_whatever_the_sub_millisecond_time(now):
+    assert read_routing.marker_valid(read_routing.new_marker(now), now)
+
+
+@pytest.mark.parametrize("marker, pinned", [
+    (lambda: read_routing.new_marker(), True),
+    (lambda: f"{time.time() - 1:.3f}", False),                                        # expired
+    (lambda: f"{time.time() + 10 * db.READ_YOUR_WRITES_WINDOW:.3f}", False),          # not one of ours
+    (lambda: "soon", False),
+])
+def test_a_clients_marker_pins_its_reads_to_the_primary(replica, app, marker, pinned):
+    for headers in ({"Cookie": f"{read_routing.READ_PRIMARY_COOKIE}={marker()}"},
+                    {read_routing.READ_PRIMARY_HEADER: marker()}):
+        with app.test_request_context("/tickets", headers=headers):
+            read_routing._check_marker()
+            assert g.get("read_primary", False) is pinned
+            assert db.get_read_connection() == ("primary" if pinned else "replica")
+
+
+@pytest.mark.parametrize("method, status, issued", [
+    ("POST", 201, True), ("DELETE", 200, True), ("GET", 200, False), ("PUT", 404, False),
+])
+def test_successful_writes_issue_a_marker(app, method, status, issued):
+    with app.test_request_context("/tickets", method=method):
+        response = read_routing._issue_marker(app.response_class(status=status))
+    assert (read_routing.READ_PRIMARY_HEADER in response.headers) is issued
+    assert (read_routing.READ_PRIMARY_COOKIE in response.headers.get("Set-Cookie", "")) is issued
+    if issued:
+        assert read_routing.marker_valid(response.headers[read_routing.READ_PRIMARY_HEADER])
+
+
+def test_lists_of_a_recently_written_collection_read_from_the_primary(replica, seeded):
+    import collection_versions
+
+    collection_versions.cache.redis_client.delete(collection_versions.recent_key("customers"))
+    assert not collection_versions.recently_written("customers")
+    collection_versions.bump("customers")
+    assert collection_versions.recently_written("customers")
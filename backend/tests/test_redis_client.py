@@ -0,0 +1,147 @@
+# tests/test_redis_client.py
+import threading
+import time
+import types
+
+import pytest
+
+
+KEY, LOCK = "test:cached", "lock:test:cached"
+
+
+@pytest.fixture
+def cache(seeded):
+    # Imported after the stand-ins are installed, so it binds fakeredis
+    import redis_client
+
+    redis_client.redis_client.delete(KEY, LOCK)
+    redis_client.local_cache.clear()
+    return redis_client
+
+
+class Compute:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def stale_entry(cache, key, value):
+    cache.set_cached(key, {"value": value, "expires": time.time() - 1, "delta": 0.01}, 60)
+
+
+def test_miss_computes_once_then_serves_the_cached_value(cache):
+    compute = Compute("fresh")
+    assert cache.cached_read(KEY, compute, beta=0) == "fresh"
+    assert cache.cached_read(KEY, compute, beta=0) == "fresh"
+    assert compute.calls == 1
+    assert not cache.redis_client.exists(LOCK)
+
+
+def test_stale_value_is_refreshed_by_the_worker_that_takes_the_lock(cache):
+    stale_entry(cache, KEY, "old")
+    compute = Compute("new")
+    assert cache.cached_read(KEY, compute, beta=0) == "new"
+    assert cache.get_cached(KEY)["value"] == "new"
+    assert not cache.redis_client.exists(LOCK)
+
+
+def test_stale_value_is_served_while_another_worker_refreshes(cache):
+    stale_entry(cache, KEY, "old")
+    cache.redis_client.set(LOCK, "someone-else")
+    compute = Compute("new")
+    assert cache.cached_read(KEY, compute, beta=0) == "old"
+    assert compute.calls == 0
+
+
+def test_miss_waits_for_the_lock_holder_then_computes_itself(cache):
+    cache.redis_client.set(LOCK, "someone-else")
+    compute = Compute("computed")
+    start = time.monotonic()
+    assert cache.cached_read(KEY, compute, beta=0, wait_timeout=0.2) == "computed"
+    assert time.monotonic() - start >= 0.2
+    assert compute.calls == 1
+    assert cache.redis_client.get(LOCK) == "someone-else"   # never released someone else's lock
+
+
+def test_miss_picks_up_the_lock_holders_result(cache):
+    cache.redis_client.set(LOCK, "someone-else")
+
+    def holder_finishes():
+        cache.set_cached(KEY, {"value": "theirs", "expires": time.time() + 30, "delta": 0.01}, 60)
+
+    threading.Timer(0.1, holder_finishes).start()
+    compute = Compute("mine")
+    assert cache.cached_read(KEY, compute, beta=0, wait_timeout=2) == "theirs"
+    assert compute.calls == 0
+
+
+def wait_until(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_local_cache_evicts_the_least_recently_used_entry(cache):
+    local = cache.LocalCache(maxsize=2, ttl=10)
+    local.set("a", 1)
+    local.set("b", 2)
+    local.get("a")
+    local.set("c", 3)
+    assert [local.get(key)[0] for key in "abc"] == [True, False, True]
+    assert local.stats()["evictions"] == 1
+
+
+def test_local_cache_entries_expire_after_the_shorter_ttl(cache):
+    local = cache.LocalCache(maxsize=2, ttl=10)
+    local.set("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert local.get("a") == (False, None)
+
+
+def test_another_process_invalidation_drops_the_local_entry(cache):
+    cache.set_cached(KEY, "v1")
+    assert cache.local_cache.get(KEY) == (True, "v1")
+    # Our own message (sent by set_cached) must not drop what we just cached
+    time.sleep(0.1)
+    assert cache.local_cache.get(KEY) == (True, "v1")
+
+    cache.redis_client.publish(cache.INVALIDATION_CHANNEL, f"other-process {KEY}")
+    assert wait_until(lambda: not cache.local_cache.get(KEY)[0])
+
+
+def test_reconnect_clears_local_entries_and_tells_handlers(cache, monkeypatch):
+    calls = []
+    monkeypatch.setattr(cache, "_reconnect_handlers", [lambda: calls.append("reconnected")])
+    cache.local_cache.set(KEY, "cached before the disconnect")
+
+    cache._reset_local_caches()
+    assert cache.local_cache.get(KEY) == (False, None)
+    assert calls == ["reconnected"]
+
+
+def test_listener_resets_the_local_cache_when_its_subscription_drops(cache, monkeypatch):
+    class DroppedPubSub:
+        def subscribe(self, channel):
+            pass
+
+        def listen(self):
+            raise ConnectionError("Connection closed by server")
+
+    class Stop(Exception):
+        pass
+
+    def sleep(seconds):
+        raise Stop   # end the listener before it reconnects
+
+    monkeypatch.setattr(cache.redis_client, "pubsub", lambda **kwargs: DroppedPubSub())
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(sleep=sleep, monotonic=time.monotonic))
+    cache.local_cache.set(KEY, "cached before the disconnect")
+
+    with pytest.raises(Stop):
+        cache._listen("test-origin")
+    assert cache.local_cache.get(KEY) == (False, None)
@@ -0,0 +1,60 @@
+# tests/test_ticket_events.py
+import time
+from datetime import datetime, timedelta
+
+import ticket_events
+from db import get_db_connection
+
+
+def database_now():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT NOW()")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def newest_ticket_id():
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(id) FROM tickets")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def wait_for_timeline(ticket_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while True:
+        ticket_events.flush()
+        events = ticket_events.read_timeline(ticket_id)
+        if events or time.monotonic() > deadline:
+            return events
+        time.sleep(0.05)
+
+
+def test_create_ticket_records_event_for_new_ticket(client, seeded):
+    res = client.post("/tickets", json={
+        "customer_id": seeded["customer_ids"][0], "title": "Printer on fire", "priority": "HIGH",
+    })
+    assert res.status_code == 201
+
+    ticket_id = newest_ticket_id()
+    events = wait_for_timeline(ticket_id)
+    assert [(e["ticket_id"], e["type"]) for e in events] == [(ticket_id, "created")]
+
+
+def test_event_is_stamped_by_the_database_clock_at_the_time_it_happened(seeded):
+    ticket_id = seeded["ticket_ids"][0]
+    event = ticket_events.created(ticket_id)
+    event = (*event[:-1], event[-1] - 60)   # queued a minute ago
+    assert ticket_events.write_batch([event])
+
+    occurred_at = max(ticket_events.read_timeline(ticket_id), key=lambda e: e["id"])["occurred_at"]
+    age = datetime.fromisoformat(str(database_now())) - occurred_at
+    assert timedelta(seconds=59) < age < timedelta(seconds=61)
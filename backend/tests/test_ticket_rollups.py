@@ -0,0 +1,73 @@
+# tests/test_ticket_rollups.py
+from datetime import date, timedelta
+
+import ticket_rollups
+from db import get_db_connection
+
+
+def execute(sql, params=()):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall() if cursor.description else None
+        conn.commit()
+        return rows
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def rollups():
+    rows = execute("SELECT day, priority, opened, closed FROM ticket_daily_rollups")
+    return {(str(day), priority): (opened, closed) for day, priority, opened, closed in rows if opened or closed}
+
+
+def close_yesterday(ticket_id, priority):
+    """Move a close made today, and its rollup, back to yesterday."""
+    yesterday = date.today() - timedelta(days=1)
+    execute("UPDATE tickets SET closed_at = %s, updated_at = %s WHERE id = %s", (yesterday, yesterday, ticket_id))
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        ticket_rollups.apply_events(cursor, [(date.today(), priority, "closed", -1),
+                                             (yesterday, priority, "closed", 1)])
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def assert_matches_backfill():
+    current = rollups()
+    ticket_rollups.backfill()
+    assert rollups() == current
+
+
+def test_close_stays_in_its_bucket_after_later_updates(client, seeded):
+    ticket_id = seeded["open_ticket_ids"][0]
+    assert client.put(f"/tickets/{ticket_id}/update", json={"status": "CLOSED"}).status_code == 200
+    [(priority,)] = execute("SELECT priority FROM tickets WHERE id = %s", (ticket_id,))
+    close_yesterday(ticket_id, priority)
+
+    # Reassigning a closed ticket today moves updated_at, not the close
+    res = client.put(f"/tickets/{ticket_id}/update",
+                     json={"status": "CLOSED", "assigned_to": seeded["agent_ids"][0]})
+    assert res.status_code == 200
+    assert_matches_backfill()
+
+    assert client.delete(f"/tickets/{ticket_id}").status_code == 200
+    assert_matches_backfill()
+
+
+def test_rollup_rows_lock_buckets_in_day_then_priority_order():
+    yesterday = date.today() - timedelta(days=1)
+    rows = ticket_rollups.rollup_rows([
+        ticket_rollups.opened("LOW"),
+        (yesterday, "MEDIUM", "closed", -1),
+        ticket_rollups.opened("HIGH"),
+        (yesterday, "HIGH", "opened", -1),
+    ])
+    assert [(day, priority) for day, priority, _, _ in rows] == [
+        (yesterday, "HIGH"), (yesterday, "MEDIUM"), (None, "HIGH"), (None, "LOW"),
+    ]
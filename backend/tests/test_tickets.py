@@ -0,0 +1,108 @@
+# tests/test_tickets.py
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+import ticket_events
+from db import get_db_connection
+
+
+def titles(ticket_ids):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(ticket_ids))
+        cursor.execute(f"SELECT id, title FROM tickets WHERE id IN ({placeholders})", tuple(ticket_ids))
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def test_bulk_create_records_events_for_the_ids_it_inserted(client, seeded, monkeypatch):
+    recorded = []
+    monkeypatch.setattr(ticket_events, "record", lambda *events: recorded.extend(events))
+    customer_id = seeded["customer_ids"][0]
+    res = client.post("/tickets/bulk", json=[
+        {"customer_id": customer_id, "title": f"Bulk {n}", "priority": "LOW"} for n in range(3)
+    ])
+    assert res.status_code == 201
+
+    ticket_ids = [event[0] for event in recorded]
+    assert titles(ticket_ids) == {ticket_id: f"Bulk {n}" for n, ticket_id in enumerate(ticket_ids)}
+
+
+def test_inserted_ids_refuses_a_short_insert():
+    from routes.tickets import inserted_ids
+
+    class Cursor:
+        rowcount, lastrowid = 2, 10
+
+    with pytest.raises(RuntimeError):
+        inserted_ids(Cursor(), [()] * 3)
+
+
+def all_ticket_ids(status):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT id FROM tickets WHERE status = %s ORDER BY created_at DESC, id DESC", (status,))
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def test_walking_the_cursor_visits_every_ticket_once_in_order(client):
+    seen, after = [], None
+    while True:
+        query = {"status": "OPEN", "limit": 7, **({"after": after} if after else {})}
+        page = client.get("/tickets", query_string=query).get_json()
+        assert len(page["tickets"]) <= 7
+        seen += [ticket["id"] for ticket in page["tickets"]]
+        after = page["next_cursor"]
+        if after is None:
+            break
+    assert seen == all_ticket_ids("OPEN")
+
+
+def test_cursor_round_trips_its_position():
+    from routes.tickets import decode_cursor, encode_cursor
+
+    position = (datetime(2026, 3, 1, 12, 30, 5, 250000), 42)
+    assert decode_cursor(encode_cursor(*position)) == position
+
+
+def test_bad_cursor_and_limit_are_rejected(client):
+    assert client.get("/tickets", query_string={"after": "not-a-cursor"}).status_code == 400
+    assert client.get("/tickets", query_string={"limit": 0}).status_code == 400
+
+
+def test_ndjson_export_streams_every_matching_ticket_across_batches(client, monkeypatch):
+    import routes.tickets
+
+    monkeypatch.setattr(routes.tickets, "EXPORT_BATCH_SIZE", 7)
+    res = client.get("/tickets/export", query_string={"status": "OPEN"})
+    assert res.status_code == 200
+    assert res.mimetype == "application/x-ndjson"
+    assert res.is_streamed
+    rows = [json.loads(line) for line in res.get_data().splitlines()]
+    assert [row["id"] for row in rows] == all_ticket_ids("OPEN")
+    assert {row["status"] for row in rows} == {"OPEN"}
+
+
+def test_csv_export_has_a_header_and_one_line_per_ticket(client):
+    from routes.tickets import EXPORT_COLUMNS
+
+    res = client.get("/tickets/export", query_string={"format": "csv", "status": "CLOSED"})
+    assert res.status_code == 200
+    header, *rows = csv.reader(io.StringIO(res.get_data(as_text=True)))
+    assert header == EXPORT_COLUMNS
+    assert [int(row[0]) for row in rows] == all_ticket_ids("CLOSED")
+
+
+def test_export_rejects_an_unknown_format(client):
+    assert client.get("/tickets/export", query_string={"format": "xml"}).status_code == 400
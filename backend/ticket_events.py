@@ -0,0 +1,272 @@
+# ticket_events.py
+"""
+Append-only ticket history: one ticket_events row per creation, status
+change, assignment change and deletion, stamped with when it happened.
+
+The ticket routes build events in the request, after their transaction
+commits, and record() hands them to a background writer that inserts
+them in batches (up to TICKET_EVENT_BATCH rows, at most
+TICKET_EVENT_FLUSH_INTERVAL seconds after the first one queued). A
+write request only pays for a Queue.put. The trade-off is the usual one
+for an async log: events reach the table up to a flush interval late,
+and the events still queued are lost if the process is killed (a normal
+shutdown flushes them). If the queue is full because MySQL is
+unreachable for a long time, new events are dropped and logged rather
+than blocking writes.
+
+occurred_at comes from the database clock, like the tickets' own
+timestamps, not from the app host's. An event carries its monotonic
+creation time, and the insert backdates NOW(3) by the event's age, so a
+flush interval in the queue does not move it.
+
+Rows hold the ticket's status and assignee before (from_*) and after
+the event. Indexes (migrations/0006_ticket_events.up.sql):
+
+- (ticket_id, occurred_at): a ticket's timeline,
+- (assigned_to, status, occurred_at): one agent's closes in a range,
+- (status, occurred_at): every agent's closes in a range.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import timedelta
+
+from db import get_db_connection, get_read_connection
+
+EVENT_QUEUE_SIZE = int(os.getenv("TICKET_EVENT_QUEUE", "10000"))   # pending events; extra are dropped
+EVENT_BATCH_SIZE = int(os.getenv("TICKET_EVENT_BATCH", "500"))
+EVENT_FLUSH_INTERVAL = float(os.getenv("TICKET_EVENT_FLUSH_INTERVAL", "1"))
+EVENT_WRITE_ATTEMPTS = 3
+
+INSERT_SQL = """
+    INSERT INTO ticket_events
+        (ticket_id, event_type, from_status, status, from_assigned_to, assigned_to, occurred_at)
+    VALUES (%s, %s, %s, %s, %s, %s, NOW(3) - INTERVAL %s MICROSECOND)
+"""
+
+TIMELINE_SQL = """
+    SELECT id, ticket_id, event_type, from_status, status,
+           from_assigned_to, assigned_to, occurred_at
+    FROM ticket_events
+    WHERE ticket_id = %s
+    ORDER BY occurred_at, id
+"""
+
+# Time to close per agent: each close joined to its ticket's creation
+# (index on ticket_id), aggregated in MySQL
+RESOLUTION_SQL = """
+    SELECT c.assigned_to, COUNT(*) AS closed,
+           AVG(TIMESTAMPDIFF(SECOND, o.occurred_at, c.occurred_at)) AS avg_seconds,
+           MAX(TIMESTAMPDIFF(SECOND, o.occurred_at, c.occurred_at)) AS max_seconds
+    FROM ticket_events c
+    JOIN ticket_events o ON o.ticket_id = c.ticket_id AND o.event_type = 'created'
+    WHERE c.status = 'CLOSED' AND c.event_type = 'status'
+      AND c.occurred_at >= %s AND c.occurred_at < %s
+      {agent_filter}
+    GROUP BY c.assigned_to
+"""
+
+log = logging.getLogger(__name__)
+
+
+# --- events (built by the ticket routes) ---------------------------------------
+
+def created(ticket_id, assigned_to=None):
+    return (ticket_id, "created", None, "OPEN", None, assigned_to, time.monotonic())
+
+
+def changed(ticket_id, old_status, new_status, old_assigned_to, new_assigned_to):
+    """
+    Event for an update that may change status, assignee or both; None
+    if it changed neither. A status change is a "status" event even if
+    the assignee changed with it (both are in the row).
+    """
+    if old_status != new_status:
+        event_type = "status"
+    elif old_assigned_to != new_assigned_to:
+        event_type = "assigned"
+    else:
+        return None
+    return (ticket_id, event_type, old_status, new_status, old_assigned_to, new_assigned_to, time.monotonic())
+
+
+def deleted(ticket_id, status, assigned_to):
+    return (ticket_id, "deleted", status, None, assigned_to, None, time.monotonic())
+
+
+# --- queue and writer ----------------------------------------------------------
+
+_queue = queue.Queue(maxsize=EVENT_QUEUE_SIZE)
+_writer = {"pid": None}
+_writer_lock = threading.Lock()
+_stats = {"written": 0, "dropped": 0, "failed_batches": 0}
+
+
+def record(*events):
+    """Queue events for the background writer. Never blocks, never raises."""
+    ensure_writer()
+    for event in events:
+        if event is None:
+            continue
+        try:
+            _queue.put_nowait(event)
+        except queue.Full:
+            _stats["dropped"] += 1
+            log.error("Ticket event queue full, dropped %s event for ticket %s", event[1], event[0])
+
+
+def _insert_rows(batch):
+    """INSERT_SQL parameters: each event with its age, in microseconds, for occurred_at."""
+    now = time.monotonic()
+    return [(*event[:-1], round((now - event[-1]) * 1_000_000)) for event in batch]
+
+
+def write_batch(batch):
+    """Insert events in one transaction, retrying transient failures."""
+    for attempt in range(1, EVENT_WRITE_ATTEMPTS + 1):
+        try:
+            conn = get_db_connection()
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(INSERT_SQL, _insert_rows(batch))
+                conn.commit()
+            finally:
+                cursor.close()
+                conn.close()
+            _stats["written"] += len(batch)
+            return True
+        except Exception:
+            if attempt == EVENT_WRITE_ATTEMPTS:
+                _stats["failed_batches"] += 1
+                _stats["dropped"] += len(batch)
+                log.exception("Failed to write %d ticket events", len(batch))
+                return False
+            time.sleep(0.5 * 2 ** (attempt - 1))
+
+
+def _next_batch():
+    """Block for one event, then collect more until the batch is full or the interval is up."""
+    batch = [_queue.get()]
+    deadline = time.monotonic() + EVENT_FLUSH_INTERVAL
+    while len(batch) < EVENT_BATCH_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+def _work():
+    while True:
+        write_batch(_next_batch())
+
+
+def flush():
+    """Write whatever is queued from the calling thread (shutdown, tests, scripts)."""
+    batch = []
+    while True:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+        if len(batch) >= EVENT_BATCH_SIZE:
+            write_batch(batch)
+            batch = []
+    if batch:
+        write_batch(batch)
+
+
+def ensure_writer():
+    """Start the writer thread once per process (again after a fork)."""
+    pid = os.getpid()
+    if _writer["pid"] == pid:
+        return
+    with _writer_lock:
+        if _writer["pid"] == pid:
+            return
+        # Events queued by the parent before the fork are the parent's to write
+        while not _queue.empty():
+            _queue.get_nowait()
+        threading.Thread(target=_work, name="ticket-events", daemon=True).start()
+        atexit.register(flush)
+        _writer["pid"] = pid
+
+
+def writer_stats():
+    return {**_stats, "queued": _queue.qsize()}
+
+
+# --- reading -------------------------------------------------------------------
+
+def event_from_row(row):
+    event_id, ticket_id, event_type, from_status, status, from_assigned_to, assigned_to, occurred_at = row
+    return {
+        "id": event_id,
+        "ticket_id": ticket_id,
+        "type": event_type,
+        "from_status": from_status,
+        "status": status,
+        "from_assigned_to": from_assigned_to,
+        "assigned_to": assigned_to,
+        "occurred_at": occurred_at,
+    }
+
+
+def read_timeline(ticket_id):
+    """A ticket's events, oldest first (deleted tickets keep theirs)."""
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(TIMELINE_SQL, (ticket_id,))
+        return [event_from_row(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def resolution_query(start, end, agent_id=None):
+    """(sql, params) for RESOLUTION_SQL over days start..end (inclusive)."""
+    params = [start, end + timedelta(days=1)]
+    agent_filter = ""
+    if agent_id is not None:
+        agent_filter = "AND c.assigned_to = %s"
+        params.append(agent_id)
+    return RESOLUTION_SQL.format(agent_filter=agent_filter), tuple(params)
+
+
+def read_resolution_times(start, end, agent_id=None):
+    """
+    Per-agent time to close for tickets closed on days start..end
+    (inclusive): count, mean and worst, in seconds from creation.
+    """
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(*resolution_query(start, end, agent_id))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    return resolution_from_rows(rows, start, end)
+
+
+def resolution_from_rows(rows, start, end):
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "agents": [
+            {
+                "agent_id": agent,
+                "closed": int(closed),
+                "avg_seconds": round(float(avg_seconds), 1),
+                "max_seconds": int(max_seconds),
+            }
+            for agent, closed, avg_seconds, max_seconds in sorted(rows, key=lambda r: (r[0] is None, r[0] or 0))
+        ],
+    }
@@ -0,0 +1,259 @@
+# ticket_rollups.py
+"""
+Daily ticket trend rollups: one ticket_daily_rollups row per
+(day, priority) with the number of tickets opened and closed that day.
+
+The ticket routes add their own events inside the same transaction as
+the ticket write (apply_events), so a bucket never disagrees with the
+write that produced it. Deleting a ticket takes its events back out, so
+the rollups always describe the tickets that exist, which is also what
+backfill() recomputes from. Closes are bucketed on the ticket's closed_at
+day (migrations/0007), which the status route sets once, in the same
+statement as the transition to CLOSED and by the same database clock
+that picks the day of the incremental +1.
+
+The upsert row-locks its (day, priority) rows until commit, so ticket
+writes of the same priority on the same day queue behind one another.
+The routes make it the transaction's last statement, which holds the
+lock for the commit alone, and rollup_rows() locks rows in (day,
+priority) order so that two multi-bucket writes (a bulk insert, a
+customer delete) cannot deadlock.
+
+Backfill (or reconcile) a range with:
+
+    python ticket_rollups.py --from 2025-01-01 --to 2025-12-31
+"""
+import argparse
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from db import get_db_connection, get_read_connection
+
+PRIORITIES = ("LOW", "MEDIUM", "HIGH")
+GRANULARITIES = ("day", "week", "month")
+MAX_TREND_DAYS = 3 * 366
+BACKFILL_CHUNK_DAYS = 31  # one transaction per chunk keeps row locks short
+
+# A NULL day means "today" by the database clock, the same clock that
+# stamps created_at and closed_at
+UPSERT_SQL = """
+    INSERT INTO ticket_daily_rollups (day, priority, opened, closed)
+    VALUES (COALESCE(%s, CURRENT_DATE), %s, %s, %s)
+    ON DUPLICATE KEY UPDATE opened = opened + VALUES(opened), closed = closed + VALUES(closed)
+"""
+
+BACKFILL_SQL = """
+    INSERT INTO ticket_daily_rollups (day, priority, opened, closed)
+    SELECT day, priority, SUM(opened), SUM(closed)
+    FROM (
+        SELECT DATE(created_at) AS day, priority, 1 AS opened, 0 AS closed
+        FROM tickets
+        WHERE created_at >= %s AND created_at < %s
+        UNION ALL
+        SELECT DATE(closed_at) AS day, priority, 0 AS opened, 1 AS closed
+        FROM tickets
+        WHERE status = 'CLOSED' AND closed_at >= %s AND closed_at < %s
+    ) events
+    GROUP BY day, priority
+"""
+
+log = logging.getLogger(__name__)
+
+
+# --- events (written by the ticket routes) -------------------------------------
+
+def opened(priority):
+    return (None, priority, "opened", 1)
+
+
+def closed(priority):
+    return (None, priority, "closed", 1)
+
+
+def deleted(status, priority, created_at, closed_at):
+    """Events that take a deleted ticket back out of its buckets."""
+    events = [(created_at.date(), priority, "opened", -1)]
+    if status == "CLOSED" and closed_at is not None:
+        events.append((closed_at.date(), priority, "closed", -1))
+    return events
+
+
+def _lock_order(row):
+    day, priority = row[0], row[1]
+    return day is None, day or date.min, priority  # None is CURRENT_DATE, the latest day
+
+
+def rollup_rows(events):
+    """
+    Fold (day, priority, field, n) events into one UPSERT_SQL row per
+    bucket, in lock order.
+    """
+    totals = Counter()
+    for day, priority, field, n in events:
+        totals[(day, priority, field)] += n
+    buckets = {}
+    for (day, priority, field), n in totals.items():
+        buckets.setdefault((day, priority), {"opened": 0, "closed": 0})[field] += n
+    return sorted((
+        (day, priority, counts["opened"], counts["closed"])
+        for (day, priority), counts in buckets.items()
+        if counts["opened"] or counts["closed"]
+    ), key=_lock_order)
+
+
+def apply_events(cursor, events):
+    """
+    Add events to the rollups on the caller's cursor (and transaction).
+    Call it last, right before commit: its row locks serialize the day's
+    writes of the same priority until then.
+    """
+    rows = rollup_rows(events)
+    if rows:
+        cursor.executemany(UPSERT_SQL, rows)
+
+
+# --- reading -------------------------------------------------------------------
+
+def parse_range(args, today=None):
+    """
+    (start, end, granularity) from from= / to= / granularity= query args.
+    Defaults to the last 30 days by day; raises ValueError on bad input.
+    """
+    today = today or date.today()
+    granularity = args.get("granularity", "day")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    try:
+        end = date.fromisoformat(args["to"]) if args.get("to") else today
+        start = date.fromisoformat(args["from"]) if args.get("from") else end - timedelta(days=29)
+    except ValueError:
+        raise ValueError("from and to must be dates (YYYY-MM-DD)")
+    if start > end:
+        raise ValueError("from must not be after to")
+    if (end - start).days >= MAX_TREND_DAYS:
+        raise ValueError(f"at most {MAX_TREND_DAYS} days per request")
+    return start, end, granularity
+
+
+def period_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _periods(start, end, granularity):
+    period = period_start(start, granularity)
+    while period <= end:
+        yield period
+        if granularity == "day":
+            period += timedelta(days=1)
+        elif granularity == "week":
+            period += timedelta(days=7)
+        else:
+            period = (period + timedelta(days=32)).replace(day=1)
+
+
+def _as_date(value):
+    # SQLite (the benchmark stand-in) returns computed values as text
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def read_trends(start, end, granularity="day"):
+    """
+    Opened / closed counts per period and priority for [start, end].
+    Reads at most 3 rows per day in the range, whatever the ticket count.
+    """
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT day, priority, opened, closed
+            FROM ticket_daily_rollups
+            WHERE day >= %s AND day <= %s
+        """, (start, end))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+    return trends_from_rows(rows, start, end, granularity)
+
+
+def trends_from_rows(rows, start, end, granularity):
+    def empty():
+        return {"total": 0, **{priority: 0 for priority in PRIORITIES}}
+
+    # Every period is present, zero-filled, so charts need no gap handling
+    buckets = {
+        period: {"opened": empty(), "closed": empty()}
+        for period in _periods(start, end, granularity)
+    }
+    for day, priority, opened_n, closed_n in rows:
+        bucket = buckets[period_start(_as_date(day), granularity)]
+        for field, n in (("opened", int(opened_n)), ("closed", int(closed_n))):
+            bucket[field][priority] += n
+            bucket[field]["total"] += n
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "granularity": granularity,
+        "buckets": [
+            {"period": period.isoformat(), **counts}
+            for period, counts in buckets.items()
+        ],
+    }
+
+
+# --- backfill ------------------------------------------------------------------
+
+def backfill(start=None, end=None):
+    """
+    Recompute the rollups for [start, end] from the tickets table,
+    replacing whatever is there. Defaults to the first ticket's day
+    through today. Returns the number of days rebuilt.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        if start is None:
+            cursor.execute("SELECT MIN(created_at) FROM tickets")
+            first = cursor.fetchone()[0]
+            if first is None:
+                return 0
+            start = _as_date(first)
+        end = end or date.today()
+
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(chunk_start + timedelta(days=BACKFILL_CHUNK_DAYS - 1), end)
+            lower, upper = chunk_start, chunk_end + timedelta(days=1)
+            cursor.execute(
+                "DELETE FROM ticket_daily_rollups WHERE day >= %s AND day < %s", (lower, upper)
+            )
+            cursor.execute(BACKFILL_SQL, (lower, upper, lower, upper))
+            conn.commit()
+            log.info("Rebuilt ticket rollups %s..%s", chunk_start, chunk_end)
+            chunk_start = upper
+        return (end - start).days + 1
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill ticket_daily_rollups from tickets")
+    parser.add_argument("--from", dest="start", type=date.fromisoformat,
+                        help="first day (default: first ticket)")
+    parser.add_argument("--to", dest="end", type=date.fromisoformat, help="last day (default: today)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    days = backfill(args.start, args.end)
+    print(f"rebuilt {days} day(s)")
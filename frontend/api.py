@@ -0,0 +1,122 @@
+# api.py
+"""
+HTTP client for the Streamlit app.
+
+Each browser session gets one requests.Session, kept in st.session_state,
+so reruns reuse its keep-alive connections instead of opening a new one
+per call. It also keeps the backend's read_primary_until cookie, so a
+user's reads right after their own write see it even with read replicas.
+Every call has a (connect, read) timeout; idempotent calls are retried
+once on a dropped connection (a keep-alive socket the server closed).
+
+Data the pages render on every rerun goes through get_cached(): reused
+for `ttl` seconds with no request at all, then revalidated with the
+ETag the list endpoints return, so an unchanged collection costs a 304
+rather than the whole body. Each entry names the backend collections it
+depends on ("tickets", "customers", "users"); after a mutation, the page
+calls invalidate() with the collections it changed.
+"""
+import os
+import time
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+BASE_URL = os.getenv("API_BASE_URL", "http://127.0.0.1:5000")
+CONNECT_TIMEOUT = float(os.getenv("API_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("API_READ_TIMEOUT", "30"))
+POOL_SIZE = int(os.getenv("API_POOL_SIZE", "4"))
+REFERENCE_TTL = float(os.getenv("REFERENCE_TTL", "60"))   # customers, agents
+LIVE_TTL = float(os.getenv("LIVE_TTL", "10"))             # tickets, dashboard
+
+
+def session():
+    """This browser session's requests.Session, created on first use."""
+    if "http" not in st.session_state:
+        http = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=POOL_SIZE,
+            max_retries=Retry(total=1, connect=1, read=1, status=0, backoff_factor=0.1,
+                              allowed_methods=Retry.DEFAULT_ALLOWED_METHODS),
+        )
+        http.mount("http://", adapter)
+        http.mount("https://", adapter)
+        st.session_state.http = http
+    return st.session_state.http
+
+
+def request(method, path, **kwargs):
+    headers = kwargs.pop("headers", {})
+    if st.session_state.get("token"):
+        headers.setdefault("Authorization", f"Bearer {st.session_state.token}")
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    return session().request(method, f"{BASE_URL}{path}", headers=headers, **kwargs)
+
+
+def get(path, **kwargs):
+    return request("GET", path, **kwargs)
+
+
+def post(path, **kwargs):
+    return request("POST", path, **kwargs)
+
+
+def put(path, **kwargs):
+    return request("PUT", path, **kwargs)
+
+
+def delete(path, **kwargs):
+    return request("DELETE", path, **kwargs)
+
+
+def _cache():
+    if "api_cache" not in st.session_state:
+        st.session_state.api_cache = {}   # key -> {"data", "etag", "fetched_at", "depends_on"}
+    return st.session_state.api_cache
+
+
+def get_cached(path, params=None, depends_on=(), ttl=REFERENCE_TTL, collect=None):
+    """
+    GET `path` as JSON, cached in this browser session.
+
+    Within `ttl` seconds the cached value is returned without a request;
+    after that the request carries If-None-Match and a 304 keeps it.
+    `collect(body)` turns the response body into the value to cache, e.g.
+    by following pagination (the first page's ETag covers the rest).
+    Raises requests.HTTPError on an error status.
+    """
+    cache = _cache()
+    key = (path, tuple(sorted((params or {}).items())))
+    entry = cache.get(key)
+    now = time.monotonic()
+    if entry and now - entry["fetched_at"] < ttl:
+        return entry["data"]
+
+    headers = {"If-None-Match": entry["etag"]} if entry and entry["etag"] else {}
+    res = get(path, params=params, headers=headers)
+    if res.status_code == 304:
+        entry["fetched_at"] = now
+        return entry["data"]
+    res.raise_for_status()
+
+    data = collect(res.json()) if collect else res.json()
+    cache[key] = {"data": data, "etag": res.headers.get("ETag"), "fetched_at": now,
+                  "depends_on": set(depends_on)}
+    return data
+
+
+def invalidate(*collections):
+    """Drop cached entries depending on any of `collections` (all of them if none given)."""
+    cache = _cache()
+    for key in [k for k, entry in cache.items() if not collections or entry["depends_on"] & set(collections)]:
+        del cache[key]
+
+
+def reset():
+    """Forget cached data and cookies (logout)."""
+    invalidate()
+    if "http" in st.session_state:
+        st.session_state.http.close()
+        del st.session_state.http
@@ -1,7 +1,8 @@
 import streamlit as st
-import requests
+import datetime
+
+import api
 
-BASE_URL = "http://127.0.0.1:5000"
 st.set_page_config(page_title="Smart Support Desk", layout="wide")
 
 # -------------------------------
@@ -9,7 +10,38 @@ st.set_page_config(page_title="Smart Support Desk", layout="wide")
 # -------------------------------
 if "token" not in st.session_state:
     st.session_state.token = None
-headers = {"Authorization": f"Bearer {st.session_state.token}"}
+
+
+def fetch_tickets(params=None):
+    """Walk the paginated /tickets endpoint and return every matching ticket."""
+    params = dict(params or {})
+    params["limit"] = 500
+
+    def collect(page):
+        tickets = list(page["tickets"])
+        while page["next_cursor"]:
+            res = api.get("/tickets", params={**params, "after": page["next_cursor"]})
+            res.raise_for_status()
+            page = res.json()
+            tickets.extend(page["tickets"])
+        return tickets
+
+    return api.get_cached("/tickets", params, depends_on=("tickets",), ttl=api.LIVE_TTL, collect=collect)
+
+
+def customers():
+    try:
+        return api.get_cached("/customers", depends_on=("customers",))
+    except Exception:
+        return []
+
+
+def users(role=None):
+    try:
+        return api.get_cached("/users", {"role": role} if role else None, depends_on=("users",))
+    except Exception:
+        return []
+
 
 if "user" not in st.session_state:
     st.session_state.user = None
@@ -20,17 +52,9 @@ if "menu" not in st.session_state:
 # if "customer_data" not in st.session_state:
 #     st.session_state.customer_data = {}
 
-if "customers" not in st.session_state:
-    res = requests.get(f"{BASE_URL}/customers") 
-    st.session_state.customers = res.json() if res.status_code == 200 else []
-
-if "agents" not in st.session_state:
-    res = requests.get(f"{BASE_URL}/users") 
-    st.session_state.agents = res.json() if res.status_code == 200 else []
-
 
 if "agent_workload" not in st.session_state:
-    st.session_state.agent_workload = [{}]
+    st.session_state.agent_workload = []
 # Title
 st.title("🎧 Smart Support Desk")
 
@@ -48,10 +72,10 @@ if not st.session_state.token:
 
         if st.button("Login"):
             try:
-                res = requests.post(f"{BASE_URL}/login",
-                                    json={"email": email, "password": password})
+                res = api.post("/login", json={"email": email, "password": password})
                 if res.status_code == 200:
                     data = res.json()
+                    api.invalidate()
                     st.session_state.token = data["token"]
                     st.session_state.user = data["user"]
                     st.success("Login successful!")
@@ -71,9 +95,9 @@ if not st.session_state.token:
 
         if st.button("Create Account"):
             try:
-                res = requests.post(f"{BASE_URL}/register",
-                                    json={"name": name, "email": email, "password": password})
+                res = api.post("/register", json={"name": name, "email": email, "password": password})
                 if res.status_code == 201:
+                    api.invalidate("users")
                     st.success("Account created! Please login now.")
                 else:
                     st.error(res.text)
@@ -89,6 +113,7 @@ st.sidebar.success(f"Logged in as {st.session_state.user['name']}")
 if st.sidebar.button("Logout"):
     st.session_state.token = None
     st.session_state.user = None
+    api.reset()
     st.session_state.filter_customer_id = None
     st.session_state.filter_customer_name = None
     st.session_state.menu = None
@@ -129,25 +154,23 @@ if menu == "Dashboard":
 
     try:
         # Load full summary for Admin always
-        res_sum = requests.get(f"{BASE_URL}/dashboard/summary", headers=headers)
-        res_sum.raise_for_status()
-        data = res_sum.json()
+        data = api.get_cached("/dashboard/summary", depends_on=("tickets",), ttl=api.LIVE_TTL)
 
         by_status = pd.DataFrame(data.get("by_status", []))
         by_priority = pd.DataFrame(data.get("by_priority", []))
 
-        # LOAD user-specific tickets (if agent)
-        res_my = requests.get(
-            f"{BASE_URL}/tickets",
-            params={"assigned_to": st.session_state.user["id"]},
-            headers=headers
-        )
-        my_tickets = res_my.json() if res_my.status_code == 200 else []
-
-        # Count
-        my_df = pd.DataFrame(my_tickets)
+        # Per-agent counts, aggregated server-side (no ticket lists needed)
+        st.session_state.agent_workload = api.get_cached(
+            "/dashboard/agents", depends_on=("tickets", "users"), ttl=api.LIVE_TTL
+        )["agents"]
+        workload = pd.DataFrame(st.session_state.agent_workload)
 
         is_agent = st.session_state.user.get("role") == "agent"
+        me = next(
+            (a for a in st.session_state.agent_workload if a["agent_id"] == st.session_state.user["id"]),
+            {"open": 0, "in_progress": 0, "closed": 0, "oldest_open_age_seconds": None}
+        )
+        my_total = me["open"] + me["in_progress"] + me["closed"]
 
         # ======================
         # TOP SUMMARY COUNTERS
@@ -159,11 +182,8 @@ if menu == "Dashboard":
         col1.metric("Total Tickets (System)", total)
 
         if is_agent:
-            col2.metric("My Tickets", len(my_tickets))
-            col3.metric(
-                "My Open Tickets",
-                len([t for t in my_tickets if t["status"] == "OPEN"])
-            )
+            col2.metric("My Tickets", my_total)
+            col3.metric("My Open Tickets", me["open"])
         else:
             col2.metric("Open Tickets",
                         next((x["count"] for x in data["by_status"] if x["status"] == "OPEN"), 0))
@@ -203,20 +223,62 @@ if menu == "Dashboard":
                 else:
                     st.info("No priority data available")
 
+        # ======================
+        # ADMIN: TRENDS
+        # ======================
+        if not is_agent:
+            st.subheader("📈 Opened vs Closed (last 12 months)")
+            granularity = st.radio("Group by", ["month", "week", "day"], horizontal=True)
+            trend_data = api.get_cached(
+                "/dashboard/trends",
+                {
+                    "from": (datetime.date.today() - datetime.timedelta(days=364)).isoformat(),
+                    "granularity": granularity,
+                },
+                depends_on=("tickets",),
+                ttl=api.LIVE_TTL
+            )
+            trends = pd.DataFrame([
+                {"period": b["period"], "opened": b["opened"]["total"], "closed": b["closed"]["total"]}
+                for b in trend_data["buckets"]
+            ])
+            if not trends.empty:
+                st.line_chart(trends.set_index("period"))
+
+        # ======================
+        # ADMIN: AGENT WORKLOAD
+        # ======================
+        if not is_agent:
+            st.subheader("🧑‍💻 Agent Workload")
+
+            if workload.empty:
+                st.info("No agents yet")
+            else:
+                fig5, ax5 = plt.subplots()
+                workload.set_index("name")[["open", "in_progress", "closed"]].plot.barh(stacked=True, ax=ax5)
+                st.pyplot(fig5)
+
+                oldest = workload[["name", "open", "in_progress", "oldest_open_age_seconds"]].copy()
+                oldest["oldest_open_hours"] = (oldest.pop("oldest_open_age_seconds") / 3600).round(1)
+                st.dataframe(oldest.sort_values("oldest_open_hours", ascending=False))
+
         # ======================
         # AGENT MODE: MY OWN DATA
         # ======================
         if is_agent:
             st.subheader("👤 My Personal Ticket Stats")
 
-            if my_df.empty:
+            if my_total == 0:
                 st.info("No tickets assigned to you yet 😎")
             else:
                 colX, colY = st.columns(2)
 
                 # My status chart
                 with colX:
-                    my_status_counts = my_df['status'].value_counts()
+                    my_status_counts = pd.Series(
+                        {"OPEN": me["open"], "IN_PROGRESS": me["in_progress"], "CLOSED": me["closed"]},
+                        name="count"
+                    )
                     fig3, ax3 = plt.subplots()
                     ax3.bar(my_status_counts.index, my_status_counts.values)
                     st.write("Status Table")
@@ -225,21 +287,12 @@ if menu == "Dashboard":
                     st.write("📍 My Tickets by Status")
                     st.pyplot(fig3)
 
-                # My priority chart
                 with colY:
-                    if 'priority' in my_df.columns:
-                        my_priority_counts = my_df['priority'].value_counts()
-                        fig4, ax4 = plt.subplots()
-                        ax4.pie(
-                            my_priority_counts.values,
-                            labels=my_priority_counts.index,
-                            autopct='%1.1f%%'
-                        )
-                        ax4.axis('equal')
-                        st.write("Priority Table")
-                        st.table(my_priority_counts)
-                        st.write("🎯 My Priority Breakdown")
-                        st.pyplot(fig4)
+                    age = me["oldest_open_age_seconds"]
+                    st.metric(
+                        "Oldest Open Ticket",
+                        f"{age / 3600:.1f} h" if age is not None else "—"
+                    )
 
                 if st.button("Go to Tickets"):
                     st.session_state.menu = "Tickets"
@@ -290,17 +343,16 @@ elif menu == "Tickets":
         params["assigned_to"] = st.session_state.user["id"]
     
     try:
-        res = requests.get(f"{BASE_URL}/tickets", params=params, headers=headers)
-        tickets = res.json()
+        tickets = fetch_tickets(params)
         st.session_state.tickets = tickets  # Store tickets in session state
         # Build a tiny id→name map once
-        agent_map = {a["id"]:  a["email"] for a in st.session_state.agents}
-
-        # Replace assigned_to id with the name
-        for t in tickets:
-            t["assigned_to"] = agent_map.get(t["assigned_to"], "Unassigned")
+        agent_map = {a["id"]:  a["email"] for a in users()}
 
-        st.dataframe(tickets,use_container_width=True)
+        # Replace assigned_to id with the name (on copies: `tickets` is cached)
+        st.dataframe(
+            [dict(t, assigned_to=agent_map.get(t["assigned_to"], "Unassigned")) for t in tickets],
+            use_container_width=True
+        )
     except Exception as e:
         st.error(f"Failed to load tickets: {e}")
 
@@ -328,8 +380,9 @@ elif menu == "Tickets":
             ticket_id_del = ticket_options[selected_ticket_del]
         if st.button("Delete Ticket"):
             try:
-                res_del = requests.delete(f"{BASE_URL}/tickets/{ticket_id_del}", headers=headers)
+                res_del = api.delete(f"/tickets/{ticket_id_del}")
                 if res_del.status_code == 200:
+                    api.invalidate("tickets")
                     st.success(f"Ticket {ticket_id_del} deleted successfully")
                     st.rerun()
                 else:
@@ -347,20 +400,18 @@ elif menu == "Tickets":
 elif menu == "Create Ticket":
     st.header("➕ Create Ticket")
     # st.text(f"Customer Name : ",st.session_state.user['name'])
-    params = {}
-    params['role'] = 'agent'
     with st.form("ticket_form"):
         # customer_id = st.number_input("Customer ID", min_value=1 , value=st.session_state.get("filter_customer_id", 1))
         # customer_id = st.selectbox("Customer", options=list(st.session_state.customer_data.keys()), format_func=lambda x: f"{x} - {st.session_state.customer_data[x]}",index = (len(st.session_state.customer_data) - int(st.session_state.get("filter_customer_id", 5))))
         # customer_id = st.selectbox("Customer", options=list(st.session_state.customer_data.keys()), format_func=lambda x: f"{x} - {st.session_state.customer_data[x]}",index = 0 if not st.session_state.get("filter_customer_id", None) else list(st.session_state.customer_data.keys()).index(st.session_state.get("filter_customer_id")))
-        customer_id = st.selectbox("Customer", options=st.session_state.customers, format_func=lambda x: f"{x['id']} - {x['name']} - {x['email']}", index=0 if not st.session_state.get("filter_customer_id", None) else next((i for i, c in enumerate(st.session_state.customers) if c['id'] == st.session_state.get("filter_customer_id")), 0)).get('id')
+        customer_list = customers()
+        customer_id = st.selectbox("Customer", options=customer_list, format_func=lambda x: f"{x['id']} - {x['name']} - {x['email']}", index=0 if not st.session_state.get("filter_customer_id", None) else next((i for i, c in enumerate(customer_list) if c['id'] == st.session_state.get("filter_customer_id")), 0)).get('id')
         
         title = st.text_input("Title")
         desc = st.text_area("Description")
         priority = st.selectbox("Priority", ["LOW", "MEDIUM", "HIGH"])
         
-        agents_res = requests.get(f"{BASE_URL}/users", params = params,headers=headers)
-        agents = agents_res.json() if agents_res.status_code == 200 else []
+        agents = users(role="agent")
         
         # agent_name = st.selectbox("Assign To", list(agent_dict.keys()),list)
         
@@ -398,8 +449,9 @@ elif menu == "Create Ticket":
                 "assigned_to": assigned_to_id
             }
             
-            r = requests.post(f"{BASE_URL}/tickets", json=payload, headers=headers)
+            r = api.post("/tickets", json=payload)
             if r.status_code == 201:
+                api.invalidate("tickets")
                 st.success("Ticket created")
                 st.session_state.menu = "Tickets"
                 st.rerun()
@@ -412,15 +464,13 @@ elif menu == "Create Ticket":
 elif menu == "Customers":
     st.header("👥 Customers")
     try:
-        name_filter = st.text_input("Search by Name ")
+        name_filter = st.text_input("Search by Name / Email / Company")
 
-        params = {}
         if name_filter:
-            params["customer_name"] = name_filter
-        
-        res = requests.get(f"{BASE_URL}/customers", params=params, headers=headers)
-        res.raise_for_status()
-        customers = res.json()
+            customer_list = api.get_cached("/customers/search", {"q": name_filter, "limit": 100},
+                                           depends_on=("customers",))
+        else:
+            customer_list = api.get_cached("/customers", depends_on=("customers",))
        
         # st.session_state.customer_data = customers 
         # for cust in customers:
@@ -430,7 +480,7 @@ elif menu == "Customers":
 
         # Show table with a View column
         st.dataframe(
-            customers,
+            customer_list,
             use_container_width=True,
            
         )
@@ -438,7 +488,7 @@ elif menu == "Customers":
         # Detect click by row selection
         selected = st.selectbox(
             "Select Customer to View Tickets",
-            [f"{c['id']} - {c['name']} - {c['email']}"  for c in customers]
+            [f"{c['id']} - {c['name']} - {c['email']}"  for c in customer_list]
         )
 
 
@@ -453,8 +503,9 @@ elif menu == "Customers":
         if st.button("Delete This Customer"):
             cust_id = int(selected.split(" - ")[0])
             try:
-                res_del = requests.delete(f"{BASE_URL}/customers/{cust_id}", headers=headers)
+                res_del = api.delete(f"/customers/{cust_id}")
                 if res_del.status_code == 200:
+                    api.invalidate("customers", "tickets")  # tickets cascade
                     st.success(f"Customer {cust_id} deleted successfully")
                     st.session_state.filter_customer_id = None
                     st.rerun()
@@ -485,11 +536,10 @@ elif menu == "Create Customer":
 
         if submit:
             payload = {"name": name, "email": email, "company": company}
-            r = requests.post(f"{BASE_URL}/customers", json=payload, headers=headers)
+            r = api.post("/customers", json=payload)
             if r.status_code == 201:
                 st.session_state.filter_customer_id = None #empty the customer filter
-                res = requests.get(f"{BASE_URL}/customers", headers=headers)
-                st.session_state.customers = res.json() if res.status_code == 200 else []
+                api.invalidate("customers")
                 st.success("Customer created")
                 st.rerun()
             else:
@@ -506,20 +556,15 @@ elif menu == "Update Ticket":
                 "Select a Ticket to Update",
                 list(ticket_options.keys())
             )
-            params = {}
-            params['role'] = 'agent'
             ticket_id = ticket_options[selected_ticket]
-            params['ticket_id'] = ticket_id
-            res = requests.get(f"{BASE_URL}/tickets", params=params, headers=headers)
-            ticket = res.json()
+            ticket = api.get_cached("/tickets", {"ticket_id": ticket_id},
+                                    depends_on=("tickets",), ttl=api.LIVE_TTL)["tickets"]
             for t in ticket:
                 status_current = t['status']
                 current_agent = t['assigned_to']
             new_status = st.selectbox("New Status", ["OPEN", "IN_PROGRESS", "CLOSED"], index=0 if not status_current else next((i for i, c in enumerate(["OPEN", "IN_PROGRESS", "CLOSED"]) if c == status_current), 0))
 
-            agents_res = requests.get(f"{BASE_URL}/users", params = params,headers=headers)
-
-            agents = agents_res.json() if agents_res.status_code == 200 else []
+            agents = users(role="agent")
 
             options = [None] + [f"{a['id']}-{a['name']} - {a['email']}" for a in agents]
 
@@ -543,12 +588,12 @@ elif menu == "Update Ticket":
                 elif new_status.upper() == 'CLOSED':
                     st.warning("you can not assign agent while closing the ticket")
                 else:
-                    r = requests.put(
-                        f"{BASE_URL}/tickets/{ticket_id}/update",
-                        json={"status": new_status, "assigned_to": assigned_to_id},
-                        headers=headers
+                    r = api.put(
+                        f"/tickets/{ticket_id}/update",
+                        json={"status": new_status, "assigned_to": assigned_to_id}
                     )
                     if r.status_code == 200:
+                        api.invalidate("tickets")
                         st.success(f"Ticket {ticket_id} updated!")
                         st.session_state.menu = "Tickets"
                         st.rerun()
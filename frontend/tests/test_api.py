@@ -0,0 +1,98 @@
+# tests/test_api.py
+"""
+get_cached() against a scripted backend: no server and no Streamlit
+runtime (session_state is a plain attribute dict).
+
+    cd frontend
+    python -m pytest tests
+"""
+import os
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("streamlit")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api  # noqa: E402
+
+
+class SessionState(dict):
+    __getattr__ = dict.__getitem__
+    __setattr__ = dict.__setitem__
+    __delattr__ = dict.__delitem__
+
+
+class Response:
+    def __init__(self, status_code, body=None, etag=None):
+        self.status_code = status_code
+        self._body = body
+        self.headers = {"ETag": etag} if etag else {}
+
+    def json(self):
+        return self._body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise api.requests.HTTPError(f"{self.status_code} error")
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Queue responses on backend.responses; sent requests land in backend.sent."""
+    backend = types.SimpleNamespace(responses=[], sent=[])
+
+    def get(path, params=None, headers=None):
+        backend.sent.append((path, params, headers))
+        return backend.responses.pop(0)
+
+    monkeypatch.setattr(api, "st", types.SimpleNamespace(session_state=SessionState()))
+    monkeypatch.setattr(api, "get", get)
+    return backend
+
+
+def test_fresh_entries_are_served_without_a_request(backend):
+    backend.responses = [Response(200, ["a"], etag='W/"1"')]
+    assert api.get_cached("/customers", ttl=60) == ["a"]
+    assert api.get_cached("/customers", ttl=60) == ["a"]
+    assert len(backend.sent) == 1
+
+
+def test_stale_entries_are_revalidated_with_their_etag(backend):
+    backend.responses = [Response(200, ["a"], etag='W/"1"'), Response(304), Response(200, ["b"], etag='W/"2"')]
+    assert api.get_cached("/customers", ttl=0) == ["a"]
+    assert api.get_cached("/customers", ttl=0) == ["a"]
+    assert api.get_cached("/customers", ttl=0) == ["b"]
+    assert [headers for _, _, headers in backend.sent] == [{}, {"If-None-Match": 'W/"1"'}, {"If-None-Match": 'W/"1"'}]
+
+
+def test_params_are_part_of_the_key(backend):
+    backend.responses = [Response(200, ["open"]), Response(200, ["closed"])]
+    assert api.get_cached("/tickets", {"status": "OPEN"}) == ["open"]
+    assert api.get_cached("/tickets", {"status": "CLOSED"}) == ["closed"]
+    assert api.get_cached("/tickets", {"status": "OPEN"}) == ["open"]
+
+
+def test_invalidate_drops_only_dependent_entries(backend):
+    backend.responses = [Response(200, ["t"]), Response(200, ["c"]), Response(200, ["t2"])]
+    api.get_cached("/tickets", depends_on=("tickets",))
+    api.get_cached("/customers", depends_on=("customers",))
+
+    api.invalidate("tickets")
+    assert api.get_cached("/customers", depends_on=("customers",)) == ["c"]
+    assert api.get_cached("/tickets", depends_on=("tickets",)) == ["t2"]
+
+
+def test_collect_runs_on_fresh_bodies_only(backend):
+    backend.responses = [Response(200, {"tickets": [1, 2]}, etag='W/"1"'), Response(304)]
+    collect = lambda body: body["tickets"]   # noqa: E731
+    assert api.get_cached("/tickets", ttl=0, collect=collect) == [1, 2]
+    assert api.get_cached("/tickets", ttl=0, collect=collect) == [1, 2]
+
+
+def test_errors_are_raised_and_not_cached(backend):
+    backend.responses = [Response(503), Response(200, ["a"])]
+    with pytest.raises(api.requests.HTTPError):
+        api.get_cached("/customers")
+    assert api.get_cached("/customers") == ["a"]